@@ -4,10 +4,36 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
 from matplotlib import rcParams, font_manager
 import io
 import os
 import json
+import hashlib
+import sqlite3
+import functools
+import warnings
+import collections
+import threading
+import socket
+import queue
+import time
+import datetime
+import sys
+import argparse
+import contextlib
+import tracemalloc
+import cProfile
+import tempfile
+import itertools
+import gc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import glob
+import re
 from tkinter import simpledialog
 
 # 设置matplotlib全局字体 - 使用系统字体
@@ -29,14 +55,14 @@ def set_matplotlib_font():
             if 'SimSun' in font_name or '宋体' in font_name or 'Song' in font_name.lower():
                 rcParams['font.sans-serif'] = [font_name, 'DejaVu Sans']
                 simsun_found = True
-                print(f"找到中文字体: {font_name}")
+                print(f"找到中文字体: {font_name}", file=sys.stderr)
             
             # 寻找Times New Roman
             if 'Times New Roman' in font_name or 'Times' in font_name:
                 rcParams['mathtext.default'] = 'regular'
                 rcParams['mathtext.fontset'] = 'stix'
                 times_found = True
-                print(f"找到英文字体: {font_name}")
+                print(f"找到英文字体: {font_name}", file=sys.stderr)
         
         # 如果没有找到特定字体，使用通用设置
         if not simsun_found:
@@ -45,7 +71,7 @@ def set_matplotlib_font():
         rcParams['axes.unicode_minus'] = False
         
     except Exception as e:
-        print(f"字体设置出错: {e}")
+        print(f"字体设置出错: {e}", file=sys.stderr)
         # 使用默认设置
         rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'DejaVu Sans']
         rcParams['axes.unicode_minus'] = False
@@ -53,6 +79,4242 @@ def set_matplotlib_font():
 # 初始化matplotlib字体
 set_matplotlib_font()
 
+# 默认规定塑性延伸强度偏移量 (Rp0.05/Rp0.1/Rp0.2/Rp0.5) 与规定总延伸强度 (Rt0.5)
+DEFAULT_PROOF_OFFSETS = [0.0005, 0.001, 0.002, 0.005]
+DEFAULT_TOTAL_OFFSETS = [0.005]
+
+# 规定延伸强度由哪一步拟合求出（按尝试顺序）
+YIELD_METHOD_NAMES = {
+    'elastic_fit': '弹性段拟合',
+    'extended_fit': '扩大范围拟合',
+    'initial_fit': '前段原始数据拟合',
+    'fallback_0.9Rm': '0.9×Rm近似',
+    'moving_average': '移动平均拟合',
+    'fallback_0.88Rm': '0.88×Rm近似',
+    'offset': '单次偏移法',
+    'max_r2': '最大R²弹性段',
+    'derivative': '切线模量法',
+    'timeout': '超时未求出'
+}
+
+def format_offset_label(prefix, offset):
+    """生成强度指标名称，如 ('Rp', 0.002) -> 'Rp0.2'"""
+    return f"{prefix}{offset * 100:g}"
+
+def _first_downward_crossings(diff, start=0):
+    """逐行寻找 diff 从 start 起第一次由正变为非正的位置，返回索引 (未找到为 -1) 和线性插值系数
+
+    start 可以是标量或逐行数组；NaN 填充的位置不会被判为交点。
+    """
+    cross = (diff[:, :-1] > 0) & (diff[:, 1:] <= 0)
+    cross &= np.arange(cross.shape[1]) >= np.reshape(start, (-1, 1))
+    found = cross.any(axis=1)
+    idx = np.where(found, cross.argmax(axis=1), -1)
+
+    rows = np.arange(diff.shape[0])
+    safe_idx = np.maximum(idx, 0)
+    d1 = diff[rows, safe_idx]
+    d2 = diff[rows, safe_idx + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(found, d1 / (d1 - d2), np.nan)
+    return idx, t
+
+def fit_elastic_line(x, y):
+    """最小二乘拟合弹性段直线，返回 (斜率, 截距)"""
+    A = np.vstack([x, np.ones(len(x))]).T
+    m, c = np.linalg.lstsq(A, y, rcond=None)[0]
+    return m, c
+
+def find_offset_crossings(stress, strain, m, c, offsets, start=0):
+    """对同一条弹性拟合线，以 (偏移量 × 样本点) 二维广播一次求出所有偏移线交点
+
+    偏移线为 σ = m·(ε - offset) + c，交点处应力曲线由偏移线上方穿到下方，
+    只在索引 start 之后搜索。返回 (强度数组, 应变数组)，未找到交点的位置为 NaN。
+    """
+    offsets = np.asarray(offsets, dtype=float)
+    diff = stress[np.newaxis, :] - (m * (strain[np.newaxis, :] - offsets[:, np.newaxis]) + c)
+    idx, t = _first_downward_crossings(diff, start)
+
+    safe_idx = np.maximum(idx, 0)
+    x1, x2 = strain[safe_idx], strain[safe_idx + 1]
+    cross_strain = np.where(idx >= 0, x1 + t * (x2 - x1), np.nan)
+    cross_strength = m * (cross_strain - offsets) + c
+    return cross_strength, cross_strain
+
+def find_total_extension_points(stress, strain, total_offsets):
+    """求规定总延伸强度 Rt：应变首次达到给定总延伸时的应力 (线性插值)"""
+    total_offsets = np.asarray(total_offsets, dtype=float)
+    diff = total_offsets[:, np.newaxis] - strain[np.newaxis, :]
+    idx, t = _first_downward_crossings(diff)
+
+    safe_idx = np.maximum(idx, 0)
+    y1, y2 = stress[safe_idx], stress[safe_idx + 1]
+    cross_strength = np.where(idx >= 0, y1 + t * (y2 - y1), np.nan)
+    cross_strain = np.where(idx >= 0, total_offsets, np.nan)
+    return cross_strength, cross_strain
+
+@functools.lru_cache(maxsize=None)
+def savgol_kernels(window_length, polyorder):
+    """计算并缓存 Savitzky-Golay 卷积系数 (平滑/一阶导数) 及边界投影矩阵
+
+    窗口内的数据经最小二乘拟合为 polyorder 阶多项式，中心点的平滑值和导数即拟合系数，
+    边界 (interp 模式) 则由整段窗口多项式在各位置的值/导数给出。系数用 NumPy 计算，
+    与 scipy.signal.savgol_filter(mode='interp') 结果一致，且不依赖 scipy。
+    偶数窗口同 scipy：拟合中心取在窗口正中 (half - 0.5)。
+    """
+    half = window_length // 2
+    x = np.arange(window_length) - (half if window_length % 2 else half - 0.5)
+    vander = np.vander(x, polyorder + 1, increasing=True).astype(float)
+    fit = np.linalg.pinv(vander)  # 窗口数据 -> 多项式系数
+    d_vander = np.zeros_like(vander)
+    d_vander[:, 1:] = np.arange(1, polyorder + 1) * vander[:, :-1]
+
+    kernels = {
+        'smooth': fit[0],
+        'deriv': fit[1],
+        'smooth_edge': vander @ fit,
+        'deriv_edge': d_vander @ fit
+    }
+    for kernel in kernels.values():
+        kernel.setflags(write=False)
+    return kernels
+
+def savgol_smooth(values, window_length, polyorder=2, deriv=0, lengths=None):
+    """用缓存的卷积系数做 Savitzky-Golay 平滑 (deriv=0) 或按样本序号求一阶导数 (deriv=1)
+
+    values 可以是一维数组，也可以是按行填充的二维数组，此时 lengths 给出每行的有效长度，
+    每行尾部的边界按各自的有效长度处理，填充位置输出 NaN。
+    """
+    values = np.asarray(values, dtype=float)
+    single = values.ndim == 1
+    values = np.atleast_2d(values)
+    rows, width = values.shape
+    if lengths is None:
+        lengths = np.full(rows, width)
+
+    kernels = savgol_kernels(window_length, polyorder)
+    key = 'smooth' if deriv == 0 else 'deriv'
+    half = window_length // 2
+
+    out = np.full(values.shape, np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(values, window_length, axis=1)
+    # 偶数窗口时 scipy 把第 i 个输出对齐到从 i-half+1 开始的窗口，第一个窗口的输出落在边界段内
+    out[:, half:width - half] = (windows @ kernels[key])[:, 1 - window_length % 2:]
+
+    # 首尾半个窗口用整段窗口的多项式拟合值
+    edge = kernels[key + '_edge']
+    out[:, :half] = values[:, :window_length] @ edge[:half].T
+    tail_idx = lengths[:, np.newaxis] - window_length + np.arange(window_length)
+    tail = np.take_along_axis(values, tail_idx, axis=1)
+    np.put_along_axis(out, tail_idx[:, -half:], tail @ edge[-half:].T, axis=1)
+
+    out[np.arange(width) >= lengths[:, np.newaxis]] = np.nan
+    return out[0] if single else out
+
+def smooth_stress_and_modulus(stress, strain, window_length, polyorder=2, lengths=None):
+    """平滑阶段：返回平滑后的应力和切线模量 dσ/dε (应力、应变各做一次导数卷积后相除)"""
+    stress_smooth = savgol_smooth(stress, window_length, polyorder, 0, lengths)
+    d_stress = savgol_smooth(stress, window_length, polyorder, 1, lengths)
+    d_strain = savgol_smooth(strain, window_length, polyorder, 1, lengths)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moduli = d_stress / d_strain
+    moduli[~np.isfinite(moduli)] = np.nan
+    return stress_smooth, moduli
+
+def check_savgol_parity(lengths=(48, 64, 100, 101, 1000), windows=range(5, 16), polyorder=2, seed=0):
+    """把 savgol_smooth 与 scipy.signal.savgol_filter(mode='interp') 逐点比较（含偶数窗口和导数），
+    返回最大绝对偏差；未安装 scipy 时返回 None"""
+    try:
+        from scipy.signal import savgol_filter
+    except ImportError:
+        return None
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for n in lengths:
+        values = np.cumsum(rng.normal(size=n))
+        for window in windows:
+            for deriv in (0, 1):
+                expected = savgol_filter(values, window, polyorder, deriv=deriv)
+                worst = max(worst, float(np.max(np.abs(savgol_smooth(values, window, polyorder, deriv) - expected))))
+        # 按行填充的二维输入：每行按各自的有效长度处理边界
+        padded = np.zeros((2, n))
+        padded[0] = values
+        padded[1, :n // 2] = values[:n // 2]
+        for window in windows:
+            if n // 2 <= window:
+                continue
+            smoothed = savgol_smooth(padded, window, polyorder, 0, np.array([n, n // 2]))
+            worst = max(worst, float(np.max(np.abs(smoothed[1, :n // 2] -
+                                                   savgol_filter(values[:n // 2], window, polyorder)))))
+    return worst
+
+def _elastic_end_rows(moduli, lengths):
+    """按行确定弹性阶段结束点：切线模量的滑动窗口均值偏离初始段均值超过3倍标准差处"""
+    width = moduli.shape[1]
+    cols = np.arange(width)
+    valid = (cols < lengths[:, np.newaxis]) & np.isfinite(moduli)
+
+    # 寻找比值相对稳定的区域 - 使用更大的初始窗口
+    initial_window = np.minimum(30, lengths // 3)
+    in_initial = valid & (cols < initial_window[:, np.newaxis])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        count = in_initial.sum(axis=1)
+        ratio_mean = np.where(in_initial, moduli, 0.0).sum(axis=1) / count
+        ratio_std = np.sqrt(np.where(in_initial, (moduli - ratio_mean[:, np.newaxis]) ** 2, 0.0).sum(axis=1)
+                            / count)
+
+        # 滑动窗口均值（累积和，忽略无效点）
+        sliding_window = np.maximum(3, np.minimum(10, lengths // 20))
+        zero = np.zeros((len(moduli), 1))
+        value_sum = np.concatenate([zero, np.cumsum(np.where(valid, moduli, 0.0), axis=1)], axis=1)
+        value_count = np.concatenate([zero, np.cumsum(valid, axis=1)], axis=1)
+        upper = np.minimum(cols[np.newaxis, :] + sliding_window[:, np.newaxis], width)
+        window_mean = ((np.take_along_axis(value_sum, upper, axis=1) - value_sum[:, :-1])
+                       / (np.take_along_axis(value_count, upper, axis=1) - value_count[:, :-1]))
+
+    # 寻找弹性阶段的结束点 - 允许更大的波动，避免过早截断
+    tolerance = 3.0
+    in_range = (cols >= initial_window[:, np.newaxis]) & (cols < (lengths - sliding_window)[:, np.newaxis])
+    departed = in_range & (np.abs(window_mean - ratio_mean[:, np.newaxis]) > tolerance * ratio_std[:, np.newaxis])
+    elastic_end = np.where(departed.any(axis=1), departed.argmax(axis=1), lengths)
+
+    # 确保弹性阶段有足够的数据点
+    return np.where(elastic_end < 10, np.minimum(30, lengths // 2), elastic_end)
+
+def _detect_elastic_end(moduli):
+    """由切线模量序列确定单条曲线的弹性阶段结束点"""
+    return int(_elastic_end_rows(moduli[np.newaxis, :], np.array([len(moduli)]))[0])
+
+def analyze_proof_strengths(stress, strain, offsets=None, total_offsets=None, deadline=None):
+    """鲁棒的规定延伸强度计算 (偏移法)，所有偏移量共用同一次弹性拟合
+
+    返回 (强度结果, 弹性拟合)。强度结果为 {'Rp0.2': (强度, 应变), 'Rt0.5': (...), ...}，
+    数据不足时值为 (None, None)；弹性拟合为 {'modulus': 斜率, 'intercept': 截距}，
+    没有任何偏移量由拟合求出时不含这两项。
+    弹性拟合失败时按原有顺序依次尝试更大范围的拟合，只对仍未求出的偏移量重新计算；
+    每个偏移量由哪一步求出记录在 elastic_fit['methods'] 中（取值见 YIELD_METHOD_NAMES）。
+    deadline (time.perf_counter 时刻) 给出时，超过该时刻后不再尝试后续拟合，未求出的偏移量记为 'timeout'。
+    """
+    if offsets is None:
+        offsets = DEFAULT_PROOF_OFFSETS
+    if total_offsets is None:
+        total_offsets = DEFAULT_TOTAL_OFFSETS
+
+    stress = np.asarray(stress, dtype=float)
+    strain = np.asarray(strain, dtype=float)
+    offsets = np.asarray(offsets, dtype=float)
+    labels = [format_offset_label('Rp', off) for off in offsets]
+    results = {label: (None, None) for label in labels}
+    methods = {}
+    elastic_fit = {'methods': methods}
+    for off in total_offsets:
+        results[format_offset_label('Rt', off)] = (None, None)
+
+    if len(stress) < 20:
+        return results, elastic_fit
+
+    # 规定总延伸强度与弹性拟合无关，直接求
+    if len(total_offsets) > 0:
+        rt_strengths, rt_strains = find_total_extension_points(stress, strain, total_offsets)
+        for off, rt, et in zip(total_offsets, rt_strengths, rt_strains):
+            if not np.isnan(rt):
+                results[format_offset_label('Rt', off)] = (rt, et)
+
+    pending = np.ones(len(offsets), dtype=bool)
+
+    def resolve(method, m, c, start=0):
+        """用一条弹性拟合线求出所有尚未确定的偏移量"""
+        if not pending.any():
+            return
+        strengths, strains = find_offset_crossings(stress, strain, m, c, offsets[pending], start)
+        for j, rp, ep in zip(np.flatnonzero(pending), strengths, strains):
+            if not np.isnan(rp):
+                results[labels[j]] = (rp, ep)
+                methods[labels[j]] = method
+                pending[j] = False
+                elastic_fit.setdefault('modulus', m)
+                elastic_fit.setdefault('intercept', c)
+
+    def timed_out():
+        """超过时间预算时把未求出的偏移量标记为超时"""
+        if deadline is None or not pending.any() or time.perf_counter() <= deadline:
+            return False
+        for j in np.flatnonzero(pending):
+            methods[labels[j]] = 'timeout'
+        return True
+
+    try:
+        # 方法1: 使用整体趋势，容忍局部波动
+        # 对数据进行平滑处理
+        # 增大移动平均窗口，使用更平滑的数据
+        window_size = min(15, len(stress) // 8)
+        if window_size < 5:
+            window_size = 5
+
+        # 使用Savitzky-Golay滤波器进行平滑，保留更多特征；同时得到切线模量 dσ/dε
+        # 平滑结果在后续所有拟合尝试中复用
+        stress_smooth, moduli = smooth_stress_and_modulus(stress, strain, window_size)
+        strain_smooth = strain
+
+        # 方法2: 使用切线模量确定弹性阶段
+        elastic_end = _detect_elastic_end(moduli)
+
+        # 线性拟合弹性阶段
+        x_elastic = strain_smooth[:elastic_end]
+        y_elastic = stress_smooth[:elastic_end]
+
+        if len(x_elastic) < 5:
+            return results, elastic_fit
+
+        # 寻找与偏移线的交点
+        # 从弹性阶段结束点开始找，但使用原始数据点
+        search_start = max(0, elastic_end - window_size + 1)
+        resolve('elastic_fit', *fit_elastic_line(x_elastic, y_elastic), start=search_start)
+
+        # 如果没有找到交点，尝试使用更鲁棒的方法
+        # 方法1: 使用更大范围的数据重新拟合
+        if timed_out():
+            return results, elastic_fit
+        second_try_end = min(len(stress_smooth) // 2, 100)
+        if pending.any() and second_try_end > elastic_end:
+            resolve('extended_fit',
+                    *fit_elastic_line(strain_smooth[:second_try_end], stress_smooth[:second_try_end]),
+                    start=search_start)
+
+        # 方法2: 使用前20-30%的原始数据拟合弹性模量
+        if timed_out():
+            return results, elastic_fit
+        if pending.any() and len(stress) > 50:
+            fit_end = min(int(len(stress) * 0.3), 100)
+            resolve('initial_fit', *fit_elastic_line(strain[:fit_end], stress[:fit_end]))
+
+        # 如果所有方法都失败，返回最大应力的90%作为近似
+        if pending.any():
+            max_stress = np.max(stress)
+            max_strain = strain[np.argmax(stress)]
+            for j in np.flatnonzero(pending):
+                results[labels[j]] = (0.9 * max_stress, max_strain * 0.9)
+                methods[labels[j]] = 'fallback_0.9Rm'
+
+        return results, elastic_fit
+
+    except Exception as e:
+        print(f"屈服强度计算错误: {e}")
+        # 如果平滑或拟合出错，尝试简化版
+        try:
+            # 简化版实现，使用移动平均
+            window_size = min(15, len(stress) // 8)
+            if window_size < 5:
+                window_size = 5
+
+            # 移动平均
+            stress_smooth = np.convolve(stress, np.ones(window_size)/window_size, mode='valid')
+            strain_smooth = strain[window_size-1:]
+
+            # 使用更大的初始窗口和容忍度
+            initial_window = min(30, len(stress_smooth) // 3)
+            if initial_window >= 5:
+                resolve('moving_average',
+                        *fit_elastic_line(strain_smooth[:initial_window], stress_smooth[:initial_window]))
+
+            # 最后尝试：使用最大应力的85-90%作为近似
+            if pending.any():
+                max_stress = np.max(stress)
+                for j in np.flatnonzero(pending):
+                    results[labels[j]] = (0.88 * max_stress, strain[np.argmax(stress)] * 0.88)
+                    methods[labels[j]] = 'fallback_0.88Rm'
+        except Exception as e2:
+            print(f"简化版计算也失败: {e2}")
+
+        return results, elastic_fit
+
+def calculate_proof_strengths(stress, strain, offsets=None, total_offsets=None):
+    """计算规定延伸强度，返回 {'Rp0.2': (强度, 应变), ...}"""
+    return analyze_proof_strengths(stress, strain, offsets, total_offsets)[0]
+
+# 屈服算法注册表: 名称 -> f(stress, strain, offsets, total_offsets, deadline)，返回值与
+# analyze_proof_strengths 相同。deadline 为 time.perf_counter 时刻或 None，算法应在各步骤之间检查并提前结束
+YIELD_METHODS = {}
+
+def register_yield_method(name):
+    """注册屈服算法的装饰器"""
+    def decorator(func):
+        YIELD_METHODS[name] = func
+        return func
+    return decorator
+
+def _proof_results_from_line(stress, strain, offsets, total_offsets, fit, method):
+    """用一条弹性线 (斜率, 截距, 交点搜索起点) 求出所有偏移量，结果格式与 analyze_proof_strengths 相同"""
+    offsets = np.asarray(offsets, dtype=float)
+    labels = [format_offset_label('Rp', off) for off in offsets]
+    results = {label: (None, None) for label in labels}
+    methods = {}
+    elastic_fit = {'methods': methods}
+    for off in total_offsets:
+        results[format_offset_label('Rt', off)] = (None, None)
+    if len(stress) < 20:
+        return results, elastic_fit
+
+    if len(total_offsets) > 0:
+        rt_strengths, rt_strains = find_total_extension_points(stress, strain, total_offsets)
+        for off, rt, et in zip(total_offsets, rt_strengths, rt_strains):
+            if not np.isnan(rt):
+                results[format_offset_label('Rt', off)] = (rt, et)
+
+    if fit is None or not np.all(np.isfinite(fit[:2])):
+        return results, elastic_fit
+    m, c, start = fit
+    strengths, strains = find_offset_crossings(stress, strain, m, c, offsets, start)
+    for label, rp, ep in zip(labels, strengths, strains):
+        if not np.isnan(rp):
+            results[label] = (rp, ep)
+            methods[label] = method
+    if methods:
+        elastic_fit['modulus'] = m
+        elastic_fit['intercept'] = c
+    return results, elastic_fit
+
+@register_yield_method('legacy')
+def legacy_yield_method(stress, strain, offsets, total_offsets, deadline=None):
+    """原有的多级拟合（弹性段 → 扩大范围 → 前段原始数据 → 0.9×Rm）"""
+    return analyze_proof_strengths(stress, strain, offsets, total_offsets, deadline)
+
+@register_yield_method('offset')
+def offset_yield_method(stress, strain, offsets, total_offsets, deadline=None):
+    """单次偏移法: 只在切线模量识别出的弹性段拟合一次，求不出时不再尝试其他拟合"""
+    fit = None
+    if len(stress) >= 20:
+        window_size = max(5, min(15, len(stress) // 8))
+        stress_smooth, moduli = smooth_stress_and_modulus(stress, strain, window_size)
+        elastic_end = _detect_elastic_end(moduli)
+        if elastic_end >= 5:
+            m, c = fit_elastic_line(strain[:elastic_end], stress_smooth[:elastic_end])
+            fit = (m, c, max(0, elastic_end - window_size + 1))
+    return _proof_results_from_line(stress, strain, offsets, total_offsets, fit, 'offset')
+
+@register_yield_method('max_r2')
+def max_r2_yield_method(stress, strain, offsets, total_offsets, deadline=None, min_points=10):
+    """最大R²弹性段: 起点取应力首次达到 0/5/10/20% Rm 处，终点不超过 70% Rm，
+    在所有候选区段中取线性拟合 R² 最大者（用累积和一次算出每个终点的 R²）"""
+    fit = None
+    n = len(stress)
+    if n >= 20:
+        max_idx = int(np.argmax(stress))
+        rm = stress[max_idx]
+        rising = stress[:max_idx + 1]
+        limit = int(np.argmax(rising >= 0.7 * rm)) if np.any(rising >= 0.7 * rm) else max_idx
+        best_r2 = -np.inf
+        for fraction in (0.0, 0.05, 0.1, 0.2):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            start = int(np.argmax(rising >= fraction * rm))
+            if limit - start < min_points:
+                continue
+            x = strain[start:limit + 1]
+            y = stress[start:limit + 1]
+            k = np.arange(1, len(x) + 1, dtype=float)
+            sx, sy = np.cumsum(x), np.cumsum(y)
+            sxx, syy, sxy = np.cumsum(x * x), np.cumsum(y * y), np.cumsum(x * y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cov = k * sxy - sx * sy
+                var_x = k * sxx - sx * sx
+                var_y = k * syy - sy * sy
+                r2 = cov ** 2 / (var_x * var_y)
+            r2[:min_points - 1] = np.nan
+            r2[~np.isfinite(r2)] = np.nan
+            if np.all(np.isnan(r2)):
+                continue
+            end = int(np.nanargmax(r2))
+            if r2[end] > best_r2:
+                best_r2 = r2[end]
+                m = cov[end] / var_x[end]
+                c = (sy[end] - m * sx[end]) / k[end]
+                fit = (m, c, start)
+    return _proof_results_from_line(stress, strain, offsets, total_offsets, fit, 'max_r2')
+
+@register_yield_method('derivative')
+def derivative_yield_method(stress, strain, offsets, total_offsets, deadline=None):
+    """切线模量法: 平滑切线模量不低于其 95 百分位值 90% 的第一段连续区间视为弹性段，
+    模量取区间内切线模量的中位数，截距取 σ - E·ε 的中位数"""
+    fit = None
+    if len(stress) >= 20:
+        window_size = max(5, min(15, len(stress) // 8))
+        stress_smooth, moduli = smooth_stress_and_modulus(stress, strain, window_size)
+        max_idx = int(np.argmax(stress))
+        rising = moduli[:max(max_idx, 5)]
+        finite = np.isfinite(rising)
+        if finite.sum() >= 5:
+            reference = np.percentile(rising[finite], 95)
+            stiff = finite & (rising >= 0.9 * reference)
+            start = int(np.argmax(stiff))
+            end = start + (int(np.argmin(stiff[start:])) if not stiff[start:].all() else len(stiff) - start)
+            if end - start >= 3:
+                modulus = np.median(rising[start:end])
+                intercept = np.median(stress_smooth[start:end] - modulus * strain[start:end])
+                fit = (modulus, intercept, start)
+    return _proof_results_from_line(stress, strain, offsets, total_offsets, fit, 'derivative')
+
+def run_yield_method(name, stress, strain, offsets=None, total_offsets=None, time_budget=None):
+    """按名称运行屈服算法，time_budget 为秒数（None 不限时）
+
+    返回值与 analyze_proof_strengths 相同，弹性拟合中另外记录 'algorithm' 和 'elapsed' (秒)。
+    """
+    if name not in YIELD_METHODS:
+        raise ValueError(f"未知的屈服算法: {name}（可选: {', '.join(YIELD_METHODS)}）")
+    if offsets is None:
+        offsets = DEFAULT_PROOF_OFFSETS
+    if total_offsets is None:
+        total_offsets = DEFAULT_TOTAL_OFFSETS
+    stress = np.asarray(stress, dtype=float)
+    strain = np.asarray(strain, dtype=float)
+    started = time.perf_counter()
+    deadline = started + time_budget if time_budget else None
+    results, elastic_fit = YIELD_METHODS[name](stress, strain, offsets, total_offsets, deadline)
+    elastic_fit['algorithm'] = name
+    elastic_fit['elapsed'] = time.perf_counter() - started
+    return results, elastic_fit
+
+def detect_fracture_index(stress, max_idx, drop_ratio=0.5, step_ratio=0.1):
+    """根据载荷下降检测断裂点：最大应力之后首次跌破 drop_ratio·Rm 或单步骤降超过 step_ratio·Rm 的前一点"""
+    tensile_strength = stress[max_idx]
+    tail = stress[max_idx:]
+    dropped = tail[1:] < drop_ratio * tensile_strength
+    dropped |= (tail[:-1] - tail[1:]) > step_ratio * tensile_strength
+    if dropped.any():
+        return max_idx + int(np.argmax(dropped))
+    return len(stress) - 1
+
+def detect_test_range(load, start_ratio=0.02, drop_ratio=0.5, step_ratio=0.1):
+    """识别试验有效区间 [start, stop)，用于去掉加载前的零载荷段和断裂后的数据
+
+    start 为载荷首次超过 start_ratio·Fm 的前一点，stop 为断裂点（判据同 detect_fracture_index）之后一点。
+    对已截取的数据再次调用返回整个区间。
+    """
+    load = np.asarray(load, dtype=float)
+    if len(load) == 0:
+        return 0, 0
+    max_idx = int(np.argmax(np.where(np.isnan(load), -np.inf, load)))
+    max_load = load[max_idx]
+    if not max_load > 0:
+        return 0, len(load)
+    start = max(int(np.argmax(load[:max_idx + 1] > start_ratio * max_load)) - 1, 0)
+    stop = detect_fracture_index(load, max_idx, drop_ratio, step_ratio) + 1
+    return start, stop
+
+def trim_test_range(load, displacement):
+    """按 detect_test_range 截取载荷/位移，返回 (载荷视图, 位移视图, (start, stop))，不复制数据"""
+    load = np.asarray(load, dtype=float)
+    displacement = np.asarray(displacement, dtype=float)
+    start, stop = detect_test_range(load)
+    return load[start:stop], displacement[start:stop], (start, stop)
+
+def preprocess_units(load, displacement, load_unit='N', displacement_unit='mm', gauge_length=10.0):
+    """单位换算到 N / mm；位移列为应变时（'%' 或 'strain'）乘以标距换算为位移"""
+    if load_unit not in LOAD_UNITS:
+        raise ValueError(f"未知的载荷单位: {load_unit}")
+    load = load * LOAD_UNITS[load_unit]
+    if displacement_unit == '%':
+        displacement = displacement / 100.0 * gauge_length
+    elif displacement_unit == 'strain':
+        displacement = displacement * gauge_length
+    elif displacement_unit in DISPLACEMENT_UNITS:
+        displacement = displacement * DISPLACEMENT_UNITS[displacement_unit]
+    else:
+        raise ValueError(f"未知的位移单位: {displacement_unit}")
+    return load, displacement, None
+
+def preprocess_zero_offset(load, displacement, points=1, zero_load=True, zero_displacement=True):
+    """零点修正：减去开头 points 个点的平均载荷/位移（启用有效区间时即试验开始处）"""
+    points = max(1, min(int(points), len(load)))
+    if zero_load:
+        load = load - load[:points].mean()
+    if zero_displacement:
+        displacement = displacement - displacement[:points].mean()
+    return load, displacement, None
+
+def preprocess_toe_compensation(load, displacement, lower=0.1, upper=0.4):
+    """趾区补偿：在最大力之前 lower~upper 倍最大力的线性段拟合 载荷-位移 直线，
+    把直线与零载荷的交点作为位移零点，并去掉交点之前的点"""
+    max_idx = int(np.argmax(load))
+    peak = load[max_idx]
+    rising = np.arange(max_idx + 1)
+    mask = (load[rising] >= lower * peak) & (load[rising] <= upper * peak)
+    if mask.sum() < 3:
+        return load, displacement, None
+    slope, intercept = np.polyfit(displacement[rising][mask], load[rising][mask], 1)
+    if not np.isfinite(slope) or slope <= 0:
+        return load, displacement, None
+    displacement = displacement + intercept / slope
+    keep = np.flatnonzero(displacement >= 0)
+    if len(keep) == len(load):
+        return load, displacement, None
+    return load[keep], displacement[keep], keep
+
+def preprocess_remove_unload_loops(load, displacement, tolerance=0.0):
+    """去掉卸载-再加载回环：只保留位移达到此前最大值（减去 tolerance）的点"""
+    keep = np.flatnonzero(displacement >= np.maximum.accumulate(displacement) - tolerance)
+    if len(keep) == len(load):
+        return load, displacement, None
+    return load[keep], displacement[keep], keep
+
+def preprocess_smooth(load, displacement, window=11, polyorder=2, smooth_displacement=False):
+    """Savitzky-Golay 平滑载荷（可选同时平滑位移）"""
+    window = int(window) | 1
+    if len(load) <= window:
+        return load, displacement, None
+    load = savgol_smooth(load, window, int(polyorder))
+    if smooth_displacement:
+        displacement = savgol_smooth(displacement, window, int(polyorder))
+    return load, displacement, None
+
+# 预处理步骤: 名称 -> (函数, 默认参数, 从上下文取值的参数, 说明)
+PREPROCESS_STAGES = {
+    'units': (preprocess_units, {'load_unit': 'N', 'displacement_unit': 'mm'}, ('gauge_length',),
+              "单位换算 (kN→N、%应变→位移等)"),
+    'zero_offset': (preprocess_zero_offset, {'points': 1, 'zero_load': True, 'zero_displacement': True}, (),
+                    "零点修正"),
+    'toe_compensation': (preprocess_toe_compensation, {'lower': 0.1, 'upper': 0.4}, (), "趾区补偿"),
+    'remove_unload_loops': (preprocess_remove_unload_loops, {'tolerance': 0.0}, (), "去除卸载-再加载回环"),
+    'smooth': (preprocess_smooth, {'window': 11, 'polyorder': 2, 'smooth_displacement': False}, (),
+               "Savitzky-Golay 平滑"),
+}
+
+def normalize_preprocess_spec(spec):
+    """把预处理配置规整为 [{'stage': 名称, 参数...}, ...]，补全默认参数
+    
+    spec 可以是步骤列表（元素为名称字符串或 {'stage': 名称, 参数...}）、JSON 字符串或 JSON 文件路径。
+    未知的步骤或参数抛出 ValueError。
+    """
+    if spec is None or spec == '':
+        return []
+    if isinstance(spec, str):
+        if os.path.isfile(spec):
+            with open(spec, 'r', encoding='utf-8') as f:
+                spec = json.load(f)
+        else:
+            spec = json.loads(spec)
+    normalized = []
+    for item in spec:
+        item = {'stage': item} if isinstance(item, str) else dict(item)
+        name = item.pop('stage', None)
+        if name not in PREPROCESS_STAGES:
+            raise ValueError(f"未知的预处理步骤: {name}（可选: {', '.join(PREPROCESS_STAGES)}）")
+        _, defaults, _, _ = PREPROCESS_STAGES[name]
+        unknown = set(item) - set(defaults)
+        if unknown:
+            raise ValueError(f"预处理步骤 {name} 没有参数: {', '.join(sorted(unknown))}")
+        normalized.append({'stage': name, **defaults, **item})
+    return normalized
+
+class PreprocessCache:
+    """预处理步骤输出的缓存（按字节数限制大小，最久未用的先淘汰）"""
+    
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # 后台预取线程与界面线程共用
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key, entry):
+        size = sum(array.nbytes for array in entry if array is not None)
+        with self.lock:
+            if key in self.entries or size > self.max_bytes:
+                return
+            self.entries[key] = entry
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, removed = self.entries.popitem(last=False)
+                self.nbytes -= sum(array.nbytes for array in removed if array is not None)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+class PreprocessPipeline:
+    """按顺序执行的预处理步骤，每步输出按 (输入数据哈希, 之前各步及本步参数) 的链式哈希缓存
+    
+    只改最后一步的参数时，前面各步的哈希不变、直接取缓存，只重算最后一步。
+    apply 返回 (载荷, 位移, 行号)：行号为输出各点在输入中的位置，没有步骤去掉点时为 None。
+    """
+    
+    def __init__(self, spec=None, cache=None, context=None):
+        self.stages = normalize_preprocess_spec(spec)
+        self.cache = cache
+        self.context = dict(context or {})
+    
+    def __bool__(self):
+        return bool(self.stages)
+    
+    def apply(self, load, displacement, recorder=None):
+        load = np.asarray(load, dtype=float)
+        displacement = np.asarray(displacement, dtype=float)
+        if not self.stages:
+            return load, displacement, None
+        digest = hashlib.sha1()
+        digest.update(np.ascontiguousarray(load))
+        digest.update(np.ascontiguousarray(displacement))
+        key = digest.hexdigest()
+        rows = None
+        for stage in self.stages:
+            function, _, context_params, _ = PREPROCESS_STAGES[stage['stage']]
+            params = {name: value for name, value in stage.items() if name != 'stage'}
+            params.update({name: self.context[name] for name in context_params if name in self.context})
+            key = hashlib.sha1((key + json.dumps([stage['stage'], params], sort_keys=True)).encode('utf-8')).hexdigest()
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                load, displacement, rows = cached
+                if recorder is not None:
+                    recorder.note('preprocess_cache', 'hit')
+                continue
+            with perf_stage(recorder, 'preprocess', step=stage['stage'], rows=len(load)):
+                load, displacement, keep = function(load, displacement, **params)
+            if keep is not None:
+                rows = keep if rows is None else rows[keep]
+            if self.cache is not None:
+                self.cache.put(key, (load, displacement, rows))
+                if recorder is not None:
+                    recorder.note('preprocess_cache', 'miss')
+        return load, displacement, rows
+
+def calculate_extended_properties(stress, strain, max_idx, yield_strain=None, modulus=None):
+    """基于同一组应力/应变数组和最大应力索引，一次计算 Ag、At、拉伸韧性和应变硬化指数 n
+
+    - Ag: 最大力塑性延伸率 (%)，已知弹性模量时扣除弹性部分
+    - At: 断裂总延伸率 (%)，断裂点由载荷下降检测
+    - toughness: 断裂前应力-应变曲线下面积 (MJ/m³)
+    - n_value: 屈服点至最大力之间真应力-真塑性应变的双对数拟合斜率
+    """
+    results = {
+        'uniform_elongation': None,
+        'fracture_elongation': None,
+        'toughness': None,
+        'n_value': None,
+        'fracture_index': None
+    }
+
+    tensile_strength = stress[max_idx]
+    has_modulus = modulus is not None and modulus > 0
+
+    # 最大力塑性延伸率 Ag
+    uniform_strain = strain[max_idx]
+    if has_modulus:
+        uniform_strain = uniform_strain - tensile_strength / modulus
+    results['uniform_elongation'] = uniform_strain * 100
+
+    # 断裂总延伸率 At
+    fracture_idx = detect_fracture_index(stress, max_idx)
+    results['fracture_index'] = fracture_idx
+    results['fracture_elongation'] = strain[fracture_idx] * 100
+
+    # 拉伸韧性（梯形积分）
+    s = stress[:fracture_idx + 1]
+    e = strain[:fracture_idx + 1]
+    results['toughness'] = float(np.sum(0.5 * (s[1:] + s[:-1]) * np.diff(e)))
+
+    # 应变硬化指数 n（Hollomon: σt = K·εp^n）
+    if yield_strain is not None:
+        s = stress[:max_idx + 1]
+        e = strain[:max_idx + 1]
+        true_stress = s * (1 + e)
+        true_strain = np.log1p(e)
+        if has_modulus:
+            true_strain = true_strain - true_stress / modulus
+        mask = (e >= yield_strain) & (true_strain > 0) & (true_stress > 0)
+        if np.count_nonzero(mask) >= 5:
+            n_value, _ = np.polyfit(np.log(true_strain[mask]), np.log(true_stress[mask]), 1)
+            results['n_value'] = n_value
+
+    return results
+
+# 曲线质量预检：阈值及检查项（代码: 说明），按顺序输出
+QC_THRESHOLDS = {
+    'max_retreat': 0.02,       # 最大力之前位移回退量 / 位移范围
+    'max_jump': 0.05,          # 单步位移跳变 / 位移范围
+    'jump_factor': 50.0,       # 且单步位移超过中位步长的倍数
+    'saturation_points': 10,   # 载荷等于最大值的点数（传感器饱和时为一段平台）
+    'max_noise': 0.05,         # 噪声标准差 / 最大载荷
+    'min_elastic_points': 5,   # 载荷达到最大值 50% 之前的点数
+}
+QC_CHECKS = {
+    'area': "横截面积无效",
+    'non_finite': "数据中有非数值",
+    'monotonic': "最大力之前位移回退",
+    'jump': "位移跳变（引伸计打滑）",
+    'saturation': "载荷饱和（传感器超量程）",
+    'noise': "噪声过大",
+    'elastic_points': "弹性段数据点不足",
+}
+
+def screen_curve_batch(load, displacement, lengths, areas=None, thresholds=None):
+    """对填充为二维数组的多条曲线做质量预检，返回布尔数组 [曲线 × QC_CHECKS]
+
+    只用载荷和位移判断（与面积无关），每项检查对整块数组一次完成：
+    位移单调性（运行最大值减当前值）、承载段的单步位移跳变、等于最大载荷的点数、
+    二阶差分中位数估计的噪声水平、达到 50% 最大载荷前的点数。
+    """
+    limits = {**QC_THRESHOLDS, **(thresholds or {})}
+    batch, width = load.shape
+    cols = np.arange(width)
+    valid = cols < np.asarray(lengths)[:, np.newaxis]
+    finite = np.isfinite(load) & np.isfinite(displacement)
+    flags = {
+        'area': (np.zeros(batch, dtype=bool) if areas is None
+                 else ~(np.isfinite(areas) & (np.asarray(areas, dtype=float) > 0))),
+        'non_finite': (valid & ~finite).any(axis=1),
+    }
+    load = np.where(valid & finite, load, np.nan)
+    displacement = np.where(valid & finite, displacement, np.nan)
+    
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全为 NaN 的行
+        max_load = np.nanmax(load, axis=1)[:, np.newaxis]
+        max_idx = np.where(np.isnan(load), -np.inf, load).argmax(axis=1)
+        span = (np.nanmax(displacement, axis=1) - np.nanmin(displacement, axis=1))[:, np.newaxis]
+        
+        running_max = np.fmax.accumulate(displacement, axis=1)
+        retreat = np.where(cols <= max_idx[:, np.newaxis], running_max - displacement, 0.0)
+        flags['monotonic'] = np.nanmax(retreat, axis=1) > limits['max_retreat'] * span[:, 0]
+        
+        step = np.diff(displacement, axis=1)
+        median_step = np.nanmedian(np.abs(step), axis=1)[:, np.newaxis]
+        loaded = (load[:, :-1] > 0.1 * max_load) & (load[:, 1:] > 0.1 * max_load)
+        flags['jump'] = (loaded & (step > limits['max_jump'] * span)
+                         & (step > limits['jump_factor'] * median_step)).any(axis=1)
+        
+        at_max = load >= max_load - 1e-9 * np.abs(max_load)
+        flags['saturation'] = at_max.sum(axis=1) >= limits['saturation_points']
+        
+        noise = 1.4826 * np.nanmedian(np.abs(np.diff(load, 2, axis=1)), axis=1) / np.sqrt(6)
+        flags['noise'] = noise > limits['max_noise'] * max_load[:, 0]
+        
+        flags['elastic_points'] = (load >= 0.5 * max_load).argmax(axis=1) < limits['min_elastic_points']
+    
+    return np.column_stack([flags[code] for code in QC_CHECKS])
+
+def screen_curve_quality(load, displacement, cross_sectional_area=None, thresholds=None):
+    """单条曲线的质量预检，返回未通过的检查项代码列表"""
+    load = np.asarray(load, dtype=float)[np.newaxis, :]
+    displacement = np.asarray(displacement, dtype=float)[np.newaxis, :]
+    areas = None if cross_sectional_area is None else np.array([cross_sectional_area], dtype=float)
+    flags = screen_curve_batch(load, displacement, [load.shape[1]], areas, thresholds)[0]
+    return [code for code, flagged in zip(QC_CHECKS, flags) if flagged]
+
+def describe_quality_flags(codes):
+    """质量检查项代码转为说明文字"""
+    return "质量预检未通过: " + "；".join(QC_CHECKS.get(code, code) for code in codes)
+
+def empty_results(error_msg=''):
+    """生成空的计算结果字典"""
+    return {
+        'yield_strength': None,
+        'yield_strain': None,
+        'tensile_strength': None,
+        'elongation': None,
+        'proof_strengths': {},
+        'uniform_elongation': None,
+        'fracture_elongation': None,
+        'toughness': None,
+        'n_value': None,
+        'yield_method': '',
+        'yield_algorithm': '',
+        'yield_elapsed': None,
+        'qc_flags': '',
+        'test_range': None,
+        'error_msg': error_msg
+    }
+
+def compute_specimen_properties(load, displacement, cross_sectional_area, gauge_length,
+                                offsets=None, total_offsets=None, yield_method='legacy', time_budget=None,
+                                qc=True, trim=True, preprocess=None):
+    """由载荷/位移数组计算单个试样的全部拉伸性能
+
+    应力、应变数组和最大应力索引只计算一次，规定延伸强度、Ag、At、韧性和 n 值均复用。
+    yield_method 为 YIELD_METHODS 中的算法名称，time_budget 为其时间预算（秒）。
+    trim 为真时只在 detect_test_range 识别的区间（视图）上计算，区间记录在 test_range 中。
+    qc 为真时先做质量预检（给出字典时覆盖 QC_THRESHOLDS 中的阈值），未通过的曲线不再计算，
+    qc_flags 记录未通过的检查项。
+    preprocess (PreprocessPipeline) 给出时在截取有效区间之后、质量预检之前执行。
+    """
+    results = empty_results()
+    try:
+        load = np.asarray(load, dtype=float)
+        displacement = np.asarray(displacement, dtype=float)
+        test_range = (0, len(load))
+        if trim:
+            load, displacement, test_range = trim_test_range(load, displacement)
+        results['test_range'] = test_range
+        if preprocess:
+            load, displacement, _ = preprocess.apply(load, displacement)
+        
+        if qc:
+            codes = screen_curve_quality(load, displacement, cross_sectional_area,
+                                         qc if isinstance(qc, dict) else None)
+            if codes:
+                results = empty_results(describe_quality_flags(codes))
+                results['qc_flags'] = ','.join(codes)
+                results['test_range'] = test_range
+                return results
+        
+        # 计算工程应力和工程应变
+        stress = load / cross_sectional_area  # MPa
+        strain = displacement / gauge_length
+
+        # 抗拉强度（最大应力）
+        max_idx = int(np.argmax(stress))
+        results['tensile_strength'] = stress[max_idx]
+
+        # 规定延伸强度（所有偏移量共用一次弹性拟合）
+        if offsets is None:
+            offsets = DEFAULT_PROOF_OFFSETS
+        if 0.002 not in offsets:
+            offsets = list(offsets) + [0.002]
+        proof_strengths, elastic_fit = run_yield_method(yield_method, stress, strain, offsets, total_offsets,
+                                                        time_budget)
+        yield_strength, yield_strain = proof_strengths['Rp0.2']
+        results['yield_strength'] = yield_strength
+        results['yield_strain'] = yield_strain
+        results['yield_method'] = elastic_fit['methods'].get('Rp0.2', '')
+        results['yield_algorithm'] = yield_method
+        results['yield_elapsed'] = elastic_fit['elapsed']
+        results['proof_strengths'] = {label: value[0] for label, value in proof_strengths.items()}
+
+        # 延伸率（最大应变对应的延伸率）
+        max_strain = np.max(strain)
+        results['elongation'] = max_strain * 100  # 转换为百分比
+
+        # 扩展性能：Ag、At、拉伸韧性、n 值
+        extended = calculate_extended_properties(stress, strain, max_idx, yield_strain,
+                                                 elastic_fit.get('modulus'))
+        for key in ('uniform_elongation', 'fracture_elongation', 'toughness', 'n_value'):
+            results[key] = extended[key]
+
+        if results['yield_method'] == 'timeout':
+            results['error_msg'] = "屈服强度计算超时"
+        elif yield_strength is None:
+            results['error_msg'] = "屈服强度计算失败"
+
+        return results
+
+    except Exception as e:
+        return empty_results(f"计算错误: {str(e)}")
+
+def _masked_line_fit(x, y, mask):
+    """按行对掩码内的点做最小二乘直线拟合，返回 (斜率, 截距)，点数不足的行为 NaN"""
+    n = mask.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.where(mask, x, 0.0).sum(axis=1) / n
+        y_mean = np.where(mask, y, 0.0).sum(axis=1) / n
+        dx = np.where(mask, x - x_mean[:, np.newaxis], 0.0)
+        dy = np.where(mask, y - y_mean[:, np.newaxis], 0.0)
+        m = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+        c = y_mean - m * x_mean
+    return m, c
+
+def _batch_smooth_stage(stress, strain, lengths, window_sizes):
+    """批量平滑阶段：按窗口大小分组，逐行得到平滑应力和切线模量"""
+    stress_smooth = np.full(stress.shape, np.nan)
+    moduli = np.full(stress.shape, np.nan)
+    for window in np.unique(window_sizes):
+        rows = np.flatnonzero(window_sizes == window)
+        stress_smooth[rows], moduli[rows] = smooth_stress_and_modulus(stress[rows], strain[rows], int(window),
+                                                                      lengths=lengths[rows])
+    return stress_smooth, moduli
+
+def _compute_batch_chunk(load, displacement, lengths, areas, gauge_length, offsets, total_offsets):
+    """对一组长度相近、已填充为二维数组的试样执行批量计算"""
+    batch, width = load.shape
+    cols = np.arange(width)
+    valid = cols < lengths[:, np.newaxis]
+    rows = np.arange(batch)
+
+    # 应力/应变
+    stress = load / areas[:, np.newaxis]
+    strain = displacement / gauge_length
+
+    # 抗拉强度与延伸率
+    max_idx = np.where(valid, stress, -np.inf).argmax(axis=1)
+    tensile_strength = stress[rows, max_idx]
+    elongation = np.nanmax(strain, axis=1) * 100
+
+    # 平滑与弹性段识别
+    window_sizes = np.maximum(5, np.minimum(15, lengths // 8))
+    stress_smooth, moduli = _batch_smooth_stage(stress, strain, lengths, window_sizes)
+    elastic_end = _elastic_end_rows(moduli, lengths)
+    search_start = np.maximum(0, elastic_end - window_sizes + 1)
+
+    n_offsets = len(offsets)
+    proof_strength = np.full((batch, n_offsets), np.nan)
+    proof_strain = np.full((batch, n_offsets), np.nan)
+    proof_method = np.full((batch, n_offsets), '', dtype=object)
+    modulus = np.full(batch, np.nan)
+
+    def resolve(method, m, c, fit_rows, start):
+        """对 fit_rows 中仍未求出的偏移量计算交点"""
+        for k, offset in enumerate(offsets):
+            pending = fit_rows & np.isnan(proof_strength[:, k]) & np.isfinite(m)
+            if not pending.any():
+                continue
+            diff = stress[pending] - (m[pending, np.newaxis] * (strain[pending] - offset) + c[pending, np.newaxis])
+            start_rows = start[pending] if np.ndim(start) else start
+            idx, t = _first_downward_crossings(diff, start_rows)
+            found = idx >= 0
+            safe_idx = np.maximum(idx, 0)
+            sub = np.arange(len(idx))
+            x1 = strain[pending][sub, safe_idx]
+            x2 = strain[pending][sub, safe_idx + 1]
+            cross_strain = x1 + t * (x2 - x1)
+            target = np.flatnonzero(pending)[found]
+            proof_strain[target, k] = cross_strain[found]
+            proof_strength[target, k] = m[target] * (cross_strain[found] - offset) + c[target]
+            proof_method[target, k] = method
+            newly = target[np.isnan(modulus[target])]
+            modulus[newly] = m[newly]
+
+    # 第一次拟合：识别出的弹性段（弹性段点数不足5的行不计算）
+    fit_mask = cols < elastic_end[:, np.newaxis]
+    m1, c1 = _masked_line_fit(strain, stress_smooth, fit_mask & valid)
+    enough = np.minimum(elastic_end, lengths) >= 5
+    resolve('elastic_fit', m1, c1, enough, search_start)
+
+    # 第二次拟合：更大范围的平滑数据
+    second_try_end = np.minimum(lengths // 2, 100)
+    m2, c2 = _masked_line_fit(strain, stress_smooth, cols < second_try_end[:, np.newaxis])
+    resolve('extended_fit', m2, c2, enough & (second_try_end > elastic_end), search_start)
+
+    # 第三次拟合：前20-30%的原始数据
+    fit_end = np.minimum((lengths * 0.3).astype(int), 100)
+    m3, c3 = _masked_line_fit(strain, stress, cols < fit_end[:, np.newaxis])
+    resolve('initial_fit', m3, c3, enough & (lengths > 50), 0)
+
+    # 所有方法都失败：最大应力的90%作为近似
+    fallback = enough[:, np.newaxis] & np.isnan(proof_strength)
+    max_strain_at_rm = strain[rows, max_idx]
+    proof_strength = np.where(fallback, 0.9 * tensile_strength[:, np.newaxis], proof_strength)
+    proof_strain = np.where(fallback, 0.9 * max_strain_at_rm[:, np.newaxis], proof_strain)
+    proof_method[fallback] = 'fallback_0.9Rm'
+
+    # 规定总延伸强度
+    total_strength = np.full((batch, len(total_offsets)), np.nan)
+    for k, total in enumerate(total_offsets):
+        idx, t = _first_downward_crossings(total - strain)
+        found = idx >= 0
+        safe_idx = np.maximum(idx, 0)
+        y1, y2 = stress[rows, safe_idx], stress[rows, safe_idx + 1]
+        total_strength[:, k] = np.where(found, y1 + t * (y2 - y1), np.nan)
+
+    # 扩展性能
+    yield_k = list(offsets).index(0.002)
+    yield_strain = proof_strain[:, yield_k]
+    has_modulus = np.isfinite(modulus) & (modulus > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        uniform_elongation = (max_strain_at_rm - np.where(has_modulus, tensile_strength / modulus, 0.0)) * 100
+
+    after_max = valid & (cols > max_idx[:, np.newaxis])
+    step_drop = np.concatenate([np.zeros((batch, 1)), stress[:, :-1] - stress[:, 1:]], axis=1)
+    dropped = after_max & ((stress < 0.5 * tensile_strength[:, np.newaxis])
+                           | (step_drop > 0.1 * tensile_strength[:, np.newaxis]))
+    fracture_idx = np.where(dropped.any(axis=1), dropped.argmax(axis=1) - 1, lengths - 1)
+    fracture_elongation = strain[rows, fracture_idx] * 100
+
+    segment = cols[:-1] < fracture_idx[:, np.newaxis]
+    areas_trapz = 0.5 * (stress[:, 1:] + stress[:, :-1]) * np.diff(strain, axis=1)
+    toughness = np.where(segment, areas_trapz, 0.0).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        true_stress = stress * (1 + strain)
+        true_strain = np.log1p(strain)
+        true_strain = np.where(has_modulus[:, np.newaxis], true_strain - true_stress / modulus[:, np.newaxis],
+                               true_strain)
+        hardening = (valid & (cols <= max_idx[:, np.newaxis]) & (strain >= yield_strain[:, np.newaxis])
+                     & (true_strain > 0) & (true_stress > 0))
+        log_strain = np.log(np.where(hardening, true_strain, 1.0))
+        log_stress = np.log(np.where(hardening, true_stress, 1.0))
+    n_value, _ = _masked_line_fit(log_strain, log_stress, hardening)
+    n_value = np.where(hardening.sum(axis=1) >= 5, n_value, np.nan)
+
+    return {
+        'tensile_strength': tensile_strength,
+        'elongation': elongation,
+        'proof_strength': proof_strength,
+        'total_strength': total_strength,
+        'uniform_elongation': uniform_elongation,
+        'fracture_elongation': fracture_elongation,
+        'toughness': toughness,
+        'n_value': np.where(np.isfinite(yield_strain), n_value, np.nan),
+        'yield_strain': yield_strain,
+        'yield_method': proof_method[:, yield_k]
+    }
+
+def compute_batch_properties(specimens, gauge_length, offsets=None, total_offsets=None, chunk_size=256,
+                             recorder=None, yield_method='legacy', time_budget=None, qc=True, trim=True,
+                             preprocess=None):
+    """批量计算多个试样的拉伸性能，返回结果表 (DataFrame)
+
+    specimens 为 (名称, 载荷数组, 位移数组, 横截面积) 的序列。试样按长度排序后分块，
+    每块填充为二维数组并用长度掩码一次完成应力/应变、Rm、延伸率、平滑和偏移线交点的计算，
+    结果与逐个调用 compute_specimen_properties 一致。
+    recorder (PerfRecorder) 给出时按块记录耗时，并统计屈服强度由哪一步求出。
+    批量内核实现的是 legacy 算法（各步骤均为定长的向量运算，不需要时间预算，yield_elapsed 为块耗时的平均分摊）；
+    选择其他屈服算法时逐个试样调用 compute_specimen_properties。
+    qc 同 compute_specimen_properties：每块填充后先整块预检，未通过的试样不进入批量内核。
+    trim 为真时各试样先截取到试验有效区间（视图），按截取后的长度分块，区间记录在 test_start/test_stop 列。
+    preprocess (PreprocessPipeline) 给出时在截取之后对各试样执行预处理。
+    """
+    if yield_method not in YIELD_METHODS:
+        raise ValueError(f"未知的屈服算法: {yield_method}（可选: {', '.join(YIELD_METHODS)}）")
+    if offsets is None:
+        offsets = DEFAULT_PROOF_OFFSETS
+    if total_offsets is None:
+        total_offsets = DEFAULT_TOTAL_OFFSETS
+    offsets = [float(v) for v in offsets]
+    if 0.002 not in offsets:
+        offsets.append(0.002)
+    total_offsets = [float(v) for v in total_offsets]
+    proof_labels = [format_offset_label('Rp', off) for off in offsets]
+    total_labels = [format_offset_label('Rt', off) for off in total_offsets]
+
+    specimens = list(specimens)
+    rows = []
+    for i, (name, load, displacement, area) in enumerate(specimens):
+        data_points = len(load)
+        if trim:
+            load, displacement, (test_start, test_stop) = trim_test_range(load, displacement)
+            specimens[i] = (name, load, displacement, area)
+        else:
+            test_start, test_stop = 0, data_points
+        if preprocess:
+            load, displacement, _ = preprocess.apply(load, displacement, recorder)
+            specimens[i] = (name, load, displacement, area)
+        rows.append({
+            'sheet_name': name,
+            'data_points': data_points,
+            'test_start': test_start,
+            'test_stop': test_stop,
+            'cross_sectional_area': area,
+            'yield_strength': np.nan,
+            'yield_strain': np.nan,
+            'tensile_strength': np.nan,
+            'elongation': np.nan,
+            **{label: np.nan for label in proof_labels + total_labels},
+            'uniform_elongation': np.nan,
+            'fracture_elongation': np.nan,
+            'toughness': np.nan,
+            'n_value': np.nan,
+            'yield_method': '',
+            'yield_algorithm': yield_method,
+            'yield_elapsed': np.nan,
+            'qc_flags': '',
+            'error_msg': ''
+        })
+
+    lengths = np.array([len(spec[1]) for spec in specimens], dtype=int)
+    eligible = np.flatnonzero(lengths >= 20)
+    for i in np.flatnonzero(lengths < 20):
+        rows[i]['error_msg'] = "数据量不足（至少需要20个数据点）"
+
+    def compute_single(i):
+        """逐个试样计算并填入结果行：非 legacy 算法，或整块计算出错时回退"""
+        name, load, displacement, area = specimens[i]
+        with perf_stage(recorder, 'compute', sheet=name, rows=int(lengths[i])):
+            results = compute_specimen_properties(load, displacement, area, gauge_length, offsets,
+                                                  total_offsets, yield_method, time_budget, qc, trim=False)
+        row = rows[i]
+        for key in ('yield_strength', 'yield_strain', 'tensile_strength', 'elongation', 'uniform_elongation',
+                    'fracture_elongation', 'toughness', 'n_value', 'yield_method', 'yield_elapsed', 'qc_flags',
+                    'error_msg'):
+            row[key] = np.nan if results[key] is None else results[key]
+        for label, value in results['proof_strengths'].items():
+            row[label] = np.nan if value is None else value
+        if recorder is not None:
+            recorder.note('yield_method', row['yield_method'] or 'none')
+
+    if yield_method != 'legacy':
+        for i in eligible:
+            compute_single(i)
+        return pd.DataFrame(rows)
+
+    # 按长度排序后分块，限制填充带来的内存浪费
+    eligible = eligible[np.argsort(lengths[eligible], kind='stable')]
+    for chunk_start in range(0, len(eligible), chunk_size):
+        chunk = eligible[chunk_start:chunk_start + chunk_size]
+        chunk_lengths = lengths[chunk]
+        width = chunk_lengths.max()
+        load = np.full((len(chunk), width), np.nan)
+        displacement = np.full((len(chunk), width), np.nan)
+        for r, i in enumerate(chunk):
+            load[r, :chunk_lengths[r]] = specimens[i][1]
+            displacement[r, :chunk_lengths[r]] = specimens[i][2]
+        areas = np.array([specimens[i][3] for i in chunk], dtype=float)
+
+        # 质量预检：未通过的试样直接给出原因，其余试样进入批量内核
+        if qc:
+            with perf_stage(recorder, 'quality_screen', rows=int(chunk_lengths.sum()), specimens=len(chunk)):
+                flags = screen_curve_batch(load, displacement, chunk_lengths, areas,
+                                           qc if isinstance(qc, dict) else None)
+            rejected = flags.any(axis=1)
+            for r in np.flatnonzero(rejected):
+                codes = [code for code, flagged in zip(QC_CHECKS, flags[r]) if flagged]
+                rows[chunk[r]]['qc_flags'] = ','.join(codes)
+                rows[chunk[r]]['error_msg'] = describe_quality_flags(codes)
+            if rejected.all():
+                continue
+            if rejected.any():
+                keep = ~rejected
+                chunk, chunk_lengths = chunk[keep], chunk_lengths[keep]
+                width = chunk_lengths.max()
+                load, displacement, areas = load[keep, :width], displacement[keep, :width], areas[keep]
+
+        try:
+            started = time.perf_counter()
+            with perf_stage(recorder, 'batch_compute', rows=int(chunk_lengths.sum()), specimens=len(chunk)):
+                out = _compute_batch_chunk(load, displacement, chunk_lengths, areas, gauge_length,
+                                           offsets, total_offsets)
+            elapsed_share = (time.perf_counter() - started) / len(chunk)
+        except Exception as e:
+            # 整块出错时逐个试样重算，出错的曲线只影响自己的结果行
+            print(f"批量计算出错，逐个试样重算 {len(chunk)} 个试样: {e}")
+            for i in chunk:
+                compute_single(i)
+                if np.isnan(rows[i]['yield_strength']) and not rows[i]['error_msg']:
+                    rows[i]['error_msg'] = "屈服强度计算失败"
+            continue
+
+        for r, i in enumerate(chunk):
+            row = rows[i]
+            for key in ('tensile_strength', 'elongation', 'uniform_elongation', 'fracture_elongation',
+                        'toughness', 'n_value', 'yield_strain', 'yield_method'):
+                row[key] = out[key][r]
+            row['yield_elapsed'] = elapsed_share
+            for k, label in enumerate(proof_labels):
+                row[label] = out['proof_strength'][r, k]
+            for k, label in enumerate(total_labels):
+                row[label] = out['total_strength'][r, k]
+            row['yield_strength'] = row['Rp0.2']
+            if np.isnan(row['yield_strength']):
+                row['error_msg'] = "屈服强度计算失败"
+            if recorder is not None:
+                recorder.note('yield_method', row['yield_method'] or 'none')
+
+    return pd.DataFrame(rows)
+
+def resample_to_strain_grid(curves, grid_points=500, strain_max=None):
+    """将多条应力-应变曲线一次性插值到共享的均匀应变网格
+
+    curves 为 (应力数组, 应变数组) 的序列。各曲线应变取累积最大值保证单调，
+    拼接后加上逐条递增的偏移量，只调用一次 np.interp 完成全部插值；
+    超出某条曲线应变范围的网格点为 NaN。返回 (网格, 二维应力数组 [曲线 × 网格点])。
+    """
+    curves = [(np.asarray(stress, dtype=float), np.maximum.accumulate(np.asarray(strain, dtype=float)))
+              for stress, strain in curves]
+    if strain_max is None:
+        strain_max = max(strain[-1] for _, strain in curves)
+    strain_min = min(strain[0] for _, strain in curves)
+    grid = np.linspace(strain_min, strain_max, grid_points)
+
+    # 每条曲线平移到互不重叠的区间，单次插值
+    span = max(strain_max, max(strain[-1] - strain[0] for _, strain in curves)) + 1.0
+    shifts = np.arange(len(curves)) * span
+    xp = np.concatenate([strain + shift for (_, strain), shift in zip(curves, shifts)])
+    fp = np.concatenate([stress for stress, _ in curves])
+    query = grid[np.newaxis, :] + shifts[:, np.newaxis]
+    resampled = np.interp(query.ravel(), xp, fp).reshape(len(curves), grid_points)
+
+    lower = np.array([strain[0] for _, strain in curves])
+    upper = np.array([strain[-1] for _, strain in curves])
+    outside = (grid[np.newaxis, :] < lower[:, np.newaxis]) | (grid[np.newaxis, :] > upper[:, np.newaxis])
+    resampled[outside] = np.nan
+    return grid, resampled
+
+def compute_envelope(resampled):
+    """由重采样后的曲线计算代表曲线：平均值、最小/最大值和 ±σ 包络"""
+    count = np.sum(~np.isnan(resampled), axis=0)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(resampled, axis=0)
+        std = np.nanstd(resampled, axis=0)
+        envelope = {
+            'mean': mean,
+            'min': np.nanmin(resampled, axis=0),
+            'max': np.nanmax(resampled, axis=0),
+            'std': std,
+            'lower': mean - std,
+            'upper': mean + std,
+            'count': count
+        }
+    return envelope
+
+# 批次统计的性能指标: (结果表列名, 显示名称, 单位)
+LOT_STAT_PROPERTIES = [
+    ('yield_strength', 'Rp0.2', 'MPa'),
+    ('tensile_strength', 'Rm', 'MPa'),
+    ('elongation', 'A', '%'),
+]
+LOT_STAT_COLUMNS = {
+    'group': '分组', 'property': '性能', 'unit': '单位', 'n': '样本数', 'mean': '平均值', 'std': '标准差',
+    'min': '最小值', 'max': '最大值', 'ci_lower': '均值CI下限', 'ci_upper': '均值CI上限',
+    'lsl': '规格下限', 'usl': '规格上限', 'cpk': 'Cpk',
+}
+
+def lot_from_name(name, pattern=None):
+    """按正则 pattern 的第一个分组从sheet名称中取批号，不匹配或未给出时返回 None"""
+    if not pattern:
+        return None
+    match = re.search(pattern, str(name))
+    return match.group(1) if match and match.groups() else None
+
+def bootstrap_mean_ci(values, n_resamples=2000, confidence=0.95, seed=0, max_elements=4000000):
+    """多个指标均值的自助法置信区间
+
+    values 为 [样本 × 指标] 数组（NaN 表示该样本缺少该指标）。所有重抽样一次生成下标矩阵，
+    用花式索引得到 [重抽样 × 样本 × 指标] 数组后按轴求均值；数组过大时按重抽样分块。
+    返回 (下限数组, 上限数组)，有效样本少于 2 的指标为 NaN。
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    n, k = values.shape
+    lower = np.full(k, np.nan)
+    upper = np.full(k, np.nan)
+    if n < 2:
+        return lower, upper
+    
+    rng = np.random.default_rng(seed)
+    block = max(1, max_elements // (n * k))
+    means = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 某次重抽样全为 NaN
+        for start in range(0, n_resamples, block):
+            idx = rng.integers(0, n, size=(min(block, n_resamples - start), n))
+            means.append(np.nanmean(values[idx], axis=1))
+        means = np.concatenate(means)
+        alpha = (1 - confidence) / 2
+        bounds = np.nanquantile(means, [alpha, 1 - alpha], axis=0)
+    enough = np.count_nonzero(~np.isnan(values), axis=0) >= 2
+    lower[enough] = bounds[0][enough]
+    upper[enough] = bounds[1][enough]
+    return lower, upper
+
+def process_capability(mean, std, lsl=None, usl=None):
+    """过程能力指数 Cpk，只给出一侧规格限时按单侧计算，都未给出或标准差为 0 时返回 None"""
+    if not std or not np.isfinite(std) or (lsl is None and usl is None):
+        return None
+    sides = []
+    if usl is not None:
+        sides.append((usl - mean) / (3 * std))
+    if lsl is not None:
+        sides.append((mean - lsl) / (3 * std))
+    return float(min(sides))
+
+def compute_lot_statistics(table, group_column=None, spec_limits=None, n_resamples=2000, confidence=0.95,
+                           seed=0):
+    """按分组对结果表计算 Rp0.2/Rm/A 的样本数、均值、标准差、最值、均值置信区间和 Cpk
+
+    table 为 compute_batch_properties 结构的结果表（也可用 DataFrame(all_results)）；
+    group_column 为分组列（如工作簿或批号），None 时整表为一组 '全部'。
+    spec_limits 为 {列名: [下限, 上限]}，缺省一侧用 None。计算失败的试样（NaN）不计入。
+    返回每组每个指标一行的 DataFrame（列见 LOT_STAT_COLUMNS）。
+    """
+    spec_limits = spec_limits or {}
+    columns = [column for column, _, _ in LOT_STAT_PROPERTIES]
+    values = table.reindex(columns=columns).apply(pd.to_numeric, errors='coerce')
+    groups = (table[group_column].fillna('未分组').astype(str) if group_column and group_column in table
+              else pd.Series('全部', index=table.index))
+    
+    rows = []
+    for group, index in groups.groupby(groups, sort=False).groups.items():
+        data = values.loc[index].to_numpy(dtype=float)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            count = np.count_nonzero(~np.isnan(data), axis=0)
+            mean = np.nanmean(data, axis=0)
+            std = np.where(count >= 2, np.nanstd(data, axis=0, ddof=1), np.nan)
+            minimum = np.nanmin(data, axis=0)
+            maximum = np.nanmax(data, axis=0)
+        ci_lower, ci_upper = bootstrap_mean_ci(data, n_resamples, confidence, seed)
+        for k, (column, name, unit) in enumerate(LOT_STAT_PROPERTIES):
+            lsl, usl = (list(spec_limits.get(column) or spec_limits.get(name) or []) + [None, None])[:2]
+            rows.append({
+                'group': group, 'property': name, 'unit': unit, 'n': int(count[k]),
+                'mean': mean[k], 'std': std[k], 'min': minimum[k], 'max': maximum[k],
+                'ci_lower': ci_lower[k], 'ci_upper': ci_upper[k], 'lsl': lsl, 'usl': usl,
+                'cpk': process_capability(mean[k], std[k], lsl, usl) if count[k] >= 2 else None,
+            })
+    return pd.DataFrame(rows, columns=list(LOT_STAT_COLUMNS))
+
+def format_lot_statistics(stats, confidence=0.95):
+    """批次统计表格式化为文本（界面和文本导出共用）"""
+    lines = []
+    for group, rows in stats.groupby('group', sort=False):
+        lines.append(f"分组: {group}")
+        for row in rows.itertuples(index=False):
+            if row.n == 0:
+                lines.append(f"  {row.property}: 无有效数据")
+                continue
+            text = f"  {row.property} ({row.unit}): n={row.n}  均值 {row.mean:.2f}"
+            if row.n >= 2:
+                text += (f"  标准差 {row.std:.2f}  范围 {row.min:.2f}~{row.max:.2f}"
+                         f"  均值{confidence:.0%}CI [{row.ci_lower:.2f}, {row.ci_upper:.2f}]")
+            if row.cpk is not None and not pd.isna(row.cpk):
+                text += f"  Cpk {row.cpk:.2f}"
+            lines.append(text)
+    return "\n".join(lines) + "\n"
+
+class PerfRecorder:
+    """分阶段性能记录: 每个阶段/每个sheet的墙钟时间、行数/秒、峰值内存（tracemalloc）
+
+    用法: with recorder.stage('parse', sheet='Sheet1') as info: ...; info['rows'] = n
+    阶段可以嵌套，外层阶段的峰值内存包含内层。log_path 给出时每条记录追加一行 JSON；
+    profile=True 时在创建记录器的线程中启用 cProfile，save() 时一并保存 .prof 文件。
+    tracemalloc 的峰值是进程全局的，峰值内存只在创建记录器的线程中测量，其他线程
+    （如 SheetPrefetcher 的后台线程）中的阶段 peak_mb 为 None；测得的峰值包含同时运行的
+    后台线程的分配。
+    """
+    
+    def __init__(self, trace_memory=False, profile=False, log_path=None):
+        self.trace_memory = trace_memory
+        self.log_path = log_path
+        self.records = []
+        self.counters = collections.defaultdict(collections.Counter)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.owner = threading.get_ident()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.profiler = cProfile.Profile() if profile else None
+        if self.profiler:
+            self.profiler.enable()
+    
+    @contextlib.contextmanager
+    def stage(self, name, sheet=None, rows=None, **fields):
+        stack = self.local.__dict__.setdefault('stack', [])
+        info = {'sheet': sheet, 'rows': rows, **fields}
+        peak_holder = {'peak': 0}
+        base = 0
+        trace = self.trace_memory and threading.get_ident() == self.owner
+        if trace:
+            current, peak = tracemalloc.get_traced_memory()
+            base = current
+            # reset_peak 会清掉外层阶段到目前为止的峰值，先记入所有未结束的阶段
+            for holder in stack:
+                holder['peak'] = max(holder['peak'], peak)
+            tracemalloc.reset_peak()
+        stack.append(peak_holder)
+        started = time.perf_counter()
+        try:
+            yield info
+        finally:
+            wall = time.perf_counter() - started
+            stack.pop()
+            peak_mb = None
+            if trace:
+                peak = max(tracemalloc.get_traced_memory()[1], peak_holder['peak'])
+                peak_mb = max(peak - base, 0) / 1e6
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            self.add(name, wall, peak_mb=peak_mb, **info)
+    
+    def add(self, stage, wall_s, sheet=None, rows=None, peak_mb=None, **fields):
+        """直接添加一条记录（例如工作进程中测得的时间）"""
+        record = {
+            'stage': stage,
+            'sheet': sheet,
+            'wall_s': round(wall_s, 6),
+            'rows': rows,
+            'rows_per_s': round(rows / wall_s, 1) if rows and wall_s > 0 else None,
+            'peak_mb': round(peak_mb, 3) if peak_mb is not None else None,
+            'timestamp': time.time(),
+            **fields
+        }
+        with self.lock:
+            self.records.append(record)
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(to_json_safe(record), ensure_ascii=False) + '\n')
+        return record
+    
+    def extend(self, records, counters=None, **fields):
+        """合并其他记录器（例如工作进程中）的记录和计数，fields 附加到每条记录"""
+        with self.lock:
+            for record in records:
+                record = {**record, **fields}
+                self.records.append(record)
+                if self.log_path:
+                    with open(self.log_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(to_json_safe(record), ensure_ascii=False) + '\n')
+            for category, counter in (counters or {}).items():
+                self.counters[category].update(counter)
+    
+    def note(self, category, value):
+        """计数类信息，例如屈服强度由哪一步求出"""
+        with self.lock:
+            self.counters[category][value] += 1
+    
+    def summary(self):
+        """按阶段汇总: 次数、总/平均/最大耗时、总行数、行数/秒、最大峰值内存"""
+        with self.lock:
+            records = list(self.records)
+            counters = {key: dict(counter) for key, counter in self.counters.items()}
+        stages = {}
+        for record in records:
+            entry = stages.setdefault(record['stage'], {'count': 0, 'total_s': 0.0, 'max_s': 0.0,
+                                                         'rows': 0, 'peak_mb': None})
+            entry['count'] += 1
+            entry['total_s'] += record['wall_s']
+            entry['max_s'] = max(entry['max_s'], record['wall_s'])
+            entry['rows'] += record['rows'] or 0
+            if record['peak_mb'] is not None:
+                entry['peak_mb'] = max(entry['peak_mb'] or 0.0, record['peak_mb'])
+        for entry in stages.values():
+            entry['mean_s'] = entry['total_s'] / entry['count']
+            entry['rows_per_s'] = entry['rows'] / entry['total_s'] if entry['rows'] and entry['total_s'] > 0 else None
+        return {'stages': stages, 'counters': counters}
+    
+    def save(self, path):
+        """保存全部记录和汇总为 JSON；启用了 cProfile 时同时保存同名 .prof 文件"""
+        with self.lock:
+            records = list(self.records)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(to_json_safe({'records': records, 'summary': self.summary()}), f, ensure_ascii=False, indent=2)
+        if self.profiler:
+            self.profiler.create_stats()
+            self.profiler.dump_stats(os.path.splitext(path)[0] + '.prof')
+            self.profiler.enable()
+    
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.counters.clear()
+
+def print_perf_summary(recorder, file=None):
+    """以文本表格输出分阶段汇总"""
+    summary = recorder.summary()
+    print(f"{'阶段':<16}{'次数':>6}{'总耗时(s)':>12}{'平均(ms)':>10}{'行数/秒':>12}{'峰值(MB)':>10}", file=file)
+    for stage, entry in summary['stages'].items():
+        rate = f"{entry['rows_per_s']:.0f}" if entry['rows_per_s'] else '-'
+        peak = f"{entry['peak_mb']:.1f}" if entry['peak_mb'] is not None else '-'
+        print(f"{stage:<16}{entry['count']:>6}{entry['total_s']:>12.3f}{entry['mean_s'] * 1000:>10.1f}"
+              f"{rate:>12}{peak:>10}", file=file)
+    for category, counter in summary['counters'].items():
+        print(f"{category}: " + ", ".join(f"{key} {count}" for key, count in counter.items()), file=file)
+
+def perf_stage(recorder, name, **fields):
+    """recorder 为 None 时不做任何记录"""
+    if recorder is None:
+        return contextlib.nullcontext({})
+    return recorder.stage(name, **fields)
+
+def find_data_columns(columns):
+    """按列名关键字查找载荷列和引伸计列，未找到的返回 None"""
+    load_col = None
+    extensometer_col = None
+    
+    # 查找载荷列（可能包含'载荷'或'Load'）
+    for col in columns:
+        if isinstance(col, str):
+            col_lower = col.lower()
+            if '载荷' in col or 'load' in col_lower or 'force' in col_lower:
+                load_col = col
+            elif '引伸' in col or 'extenso' in col_lower or 'strain' in col_lower:
+                extensometer_col = col
+    return load_col, extensometer_col
+
+# 列映射模板：表头签名取前几行（数字记为 #），同一台试验机导出的文件签名相同
+TEMPLATE_SIGNATURE_ROWS = 3
+# 单位换算到 N / mm，未识别的单位按 N / mm 处理
+LOAD_UNITS = {'N': 1.0, 'kN': 1000.0, 'kgf': 9.80665, 'lbf': 4.4482216152605}
+DISPLACEMENT_UNITS = {'mm': 1.0, 'cm': 10.0, 'm': 1000.0, 'μm': 0.001, 'um': 0.001, 'in': 25.4}
+
+def header_signature(head):
+    """由sheet前几行（header=None 读取的 DataFrame）计算表头签名：文字单元格原样、数字和空白归一"""
+    rows = []
+    for row in head.itertuples(index=False):
+        cells = []
+        for value in row:
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                cells.append('')
+            elif isinstance(value, (int, float, np.number, datetime.datetime, datetime.date)):
+                cells.append('#')
+            else:
+                cells.append(str(value).strip())
+        while cells and cells[-1] == '':
+            cells.pop()
+        rows.append(cells)
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def excel_column_name(index):
+    """列位置（从 0 开始）对应的 Excel 列名：0 → A，26 → AA"""
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+def detect_unit(text, units):
+    """从列名（如 载荷(kN)、Load [N]）或单位行的单元格中识别单位，返回 units 中的键，未识别返回 None"""
+    if text is None:
+        return None
+    text = str(text).strip()
+    candidates = re.findall(r'[\(\[（【]\s*([^\)\]）】]+?)\s*[\)\]）】]', text) + [text]
+    lookup = {unit.lower(): unit for unit in units}
+    for candidate in reversed(candidates):
+        unit = lookup.get(candidate.strip().lower().replace('µ', 'μ'))
+        if unit is not None:
+            return unit
+    return None
+
+def _template_sample(head):
+    """表头预览：前几行的单元格文字，供编辑模板时选择表头行和列"""
+    return [['' if value is None or (isinstance(value, float) and np.isnan(value)) else str(value)
+             for value in row] for row in head.itertuples(index=False)]
+
+def build_column_template(signature, head, header_row, load_column, extensometer_column, source='auto'):
+    """由识别出的表头行和列位置生成列映射模板，单位从列名或表头下方的单位行识别"""
+    sample = _template_sample(head)
+    
+    def unit_of(column, units):
+        cells = [row[column] for row in sample if column < len(row)]
+        if header_row < len(sample) and column < len(sample[header_row]):
+            cells.insert(0, sample[header_row][column])
+        for cell in cells:
+            unit = detect_unit(cell, units)
+            if unit is not None:
+                return unit
+        return None
+    
+    def label_of(column):
+        if header_row < len(sample) and column < len(sample[header_row]):
+            return sample[header_row][column]
+        return ''
+    
+    return {
+        'signature': signature,
+        'name': f"{label_of(load_column)} / {label_of(extensometer_column)}",
+        'header_row': int(header_row),
+        'load_column': int(load_column),
+        'extensometer_column': int(extensometer_column),
+        'load_unit': unit_of(load_column, LOAD_UNITS) or 'N',
+        'displacement_unit': unit_of(extensometer_column, DISPLACEMENT_UNITS) or 'mm',
+        'sample': sample,
+        'source': source,
+    }
+
+def detect_data_columns(excel_file, sheet_name, recorder=None):
+    """按列名关键字（第一行或第二行表头），再按数据类型和位置识别载荷/引伸计列
+    
+    返回 (header_row, 载荷列位置, 引伸计列位置, DataFrame)，未找到时列位置为 None。
+    """
+    # 读取sheet数据
+    with perf_stage(recorder, 'parse', sheet=sheet_name) as info:
+        df = excel_file.parse(sheet_name)
+        info['rows'] = len(df)
+    header_row = 0
+    
+    with perf_stage(recorder, 'column_detection', sheet=sheet_name, method='header') as detection:
+        # 查找所需的列
+        load_col, extensometer_col = find_data_columns(df.columns)
+        
+        # 如果没找到中文列名，尝试使用第一行数据作为列名
+        if load_col is None or extensometer_col is None:
+            # 使用第二行作为表头（假设第一行可能是单位）
+            df_alternative = excel_file.parse(sheet_name, header=1)
+            alt_load_col, alt_extensometer_col = find_data_columns(df_alternative.columns)
+            if alt_load_col is not None:
+                load_col = alt_load_col
+            if alt_extensometer_col is not None:
+                extensometer_col = alt_extensometer_col
+        
+            if load_col is not None and extensometer_col is not None:
+                df = df_alternative
+                header_row = 1
+                detection['method'] = 'header_row2'
+        
+        # 如果还是没找到，尝试基于位置（假设第1列是载荷，第3列是引伸计）
+        if load_col is None or extensometer_col is None:
+            if len(df.columns) >= 4:
+                # 尝试识别数据列
+                for i, col in enumerate(df.columns):
+                    if df[col].dtype in ['float64', 'int64']:
+                        if load_col is None:
+                            load_col = col
+                        elif extensometer_col is None:
+                            extensometer_col = col
+                            detection['method'] = 'position'
+                            break
+        
+        columns = list(df.columns)
+        load_position = columns.index(load_col) if load_col in columns else None
+        extensometer_position = columns.index(extensometer_col) if extensometer_col in columns else None
+        if load_position is None or extensometer_position is None:
+            detection['method'] = 'not_found'
+    return header_row, load_position, extensometer_position, df
+
+def read_with_template(excel_file, sheet_name, template, recorder=None):
+    """按模板只读取表头行以下的载荷和引伸计两列，换算到 N / mm；列不存在时返回 None"""
+    load_column, extensometer_column = template['load_column'], template['extensometer_column']
+    with perf_stage(recorder, 'parse', sheet=sheet_name, method='template') as info:
+        df = excel_file.parse(sheet_name, header=template['header_row'],
+                              usecols=sorted({load_column, extensometer_column}))
+        info['rows'] = len(df)
+    if len(df.columns) != 2:
+        return None
+    # usecols 按列在表中的先后顺序返回
+    load_position = int(load_column > extensometer_column)
+    return pd.DataFrame({
+        'Load_N': pd.to_numeric(df.iloc[:, load_position], errors='coerce')
+                  * LOAD_UNITS.get(template.get('load_unit'), 1.0),
+        'Displacement_mm': pd.to_numeric(df.iloc[:, 1 - load_position], errors='coerce')
+                           * DISPLACEMENT_UNITS.get(template.get('displacement_unit'), 1.0)
+    })
+
+def extract_sheet_data(excel_file, sheet_name, recorder=None, templates=None, mappings=None):
+    """从一个sheet中识别载荷/引伸计列并提取数据，未找到或数据不足时返回 None
+    
+    templates 为 {表头签名: 列映射模板}：签名已有模板时跳过列识别，只读取映射的两列；
+    否则识别后把新模板加入 templates。mappings 给出时记录 {sheet名称: 表头签名}。
+    """
+    templates = {} if templates is None else templates
+    head = excel_file.parse(sheet_name, header=None, nrows=TEMPLATE_SIGNATURE_ROWS)
+    signature = header_signature(head)
+    if mappings is not None:
+        mappings[sheet_name] = signature
+    
+    extracted_data = None
+    template = templates.get(signature)
+    if template is not None:
+        try:
+            extracted_data = read_with_template(excel_file, sheet_name, template, recorder)
+        except Exception as e:
+            print(f"Sheet '{sheet_name}': 按列映射模板读取失败（{str(e)}），重新识别列")
+        if extracted_data is None:
+            template = None
+    
+    if template is None:
+        header_row, load_position, extensometer_position, df = detect_data_columns(excel_file, sheet_name, recorder)
+        if load_position is None or extensometer_position is None:
+            print(f"Sheet '{sheet_name}': 未找到所需的列")
+            return None
+        template = build_column_template(signature, head, header_row, load_position, extensometer_position)
+        templates[signature] = template
+        # 提取所需的两列数据
+        extracted_data = pd.DataFrame({
+            'Load_N': pd.to_numeric(df.iloc[:, load_position], errors='coerce')
+                      * LOAD_UNITS[template['load_unit']],
+            'Displacement_mm': pd.to_numeric(df.iloc[:, extensometer_position], errors='coerce')
+                               * DISPLACEMENT_UNITS[template['displacement_unit']]
+        })
+    
+    # 删除NaN值
+    extracted_data = extracted_data.dropna()
+    
+    # 确保数据量足够
+    if len(extracted_data) > 10:
+        print(f"Sheet '{sheet_name}': 找到 {len(extracted_data)} 行数据")
+        return extracted_data
+    print(f"Sheet '{sheet_name}': 数据量不足，已跳过")
+    return None
+
+def read_workbook_sheets(source, recorder=None, templates=None, mappings=None):
+    """读取工作簿中所有包含载荷和引伸计数据的sheet，返回 {sheet名称: DataFrame}
+
+    source 可以是文件路径、文件对象或已打开的 pd.ExcelFile。templates 为列映射模板
+    {表头签名: 模板}，新识别的布局会加入其中；未给出时只在本工作簿的各sheet间复用。
+    """
+    templates = {} if templates is None else templates
+    with perf_stage(recorder, 'open_workbook'):
+        excel_file = source if isinstance(source, pd.ExcelFile) else pd.ExcelFile(source)
+    sheets = {}
+    for sheet_name in excel_file.sheet_names:
+        try:
+            data = extract_sheet_data(excel_file, sheet_name, recorder, templates, mappings)
+            if data is not None:
+                sheets[sheet_name] = data
+        except Exception as e:
+            print(f"读取sheet '{sheet_name}'时出错: {str(e)}")
+    return sheets
+
+def area_csv_path(excel_file_path):
+    """与Excel同名的截面尺寸csv文件路径"""
+    return os.path.splitext(excel_file_path)[0] + '.csv'
+
+def read_area_csv(csv_file_path):
+    """读取截面尺寸csv（sheet_name, cross_sectional_area 两列），返回 {sheet名称: 面积}"""
+    df_config = pd.read_csv(csv_file_path)
+    
+    # 检查必要的列
+    if 'sheet_name' not in df_config.columns or 'cross_sectional_area' not in df_config.columns:
+        return {}
+    return {str(name): float(area)
+            for name, area in zip(df_config['sheet_name'], df_config['cross_sectional_area'])}
+
+DIMENSION_FIELDS = ['width', 'thickness', 'diameter', 'cross_sectional_area']
+DIMENSION_ALIASES = {
+    'sheet_name': ('sheet_name', 'sheet', 'name', '名称', 'sheet名称', '试样', '试样编号'),
+    'width': ('width', 'w', 'b0', '宽', '宽度'),
+    'thickness': ('thickness', 't', 'a0', '厚', '厚度'),
+    'diameter': ('diameter', 'd', 'd0', '直径'),
+    'cross_sectional_area': ('cross_sectional_area', 'area', 's0', '面积', '横截面积'),
+}
+
+def _dimension_field(header):
+    """表头对应的尺寸字段（忽略括号中的单位和大小写），不认识返回 None"""
+    key = re.sub(r'[\(（\[].*$', '', str(header)).strip().lower()
+    for field, aliases in DIMENSION_ALIASES.items():
+        if key in aliases:
+            return field
+    return None
+
+def parse_dimension_text(text, single_column='cross_sectional_area'):
+    """解析从表格复制或csv文件中的试样尺寸，返回各列为字符串的 DataFrame
+
+    有表头时按表头识别 sheet名称/宽度/厚度/直径/面积 列；无表头时多于一列且第一列有非数字则为sheet名称，
+    其后两列数字为 宽×厚，一列数字按 single_column（'cross_sectional_area' 或 'diameter'）解释。
+    分隔符依次尝试制表符、逗号，否则按空白分隔。
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("没有可导入的数据")
+    separator = '\t' if '\t' in text else (',' if ',' in text else None)
+    rows = [[cell.strip() for cell in (line.split(separator) if separator else line.split())] for line in lines]
+    width = max(len(row) for row in rows)
+    table = pd.DataFrame([row + [''] * (width - len(row)) for row in rows], dtype=str)
+    
+    header = [_dimension_field(cell) for cell in table.iloc[0]]
+    if any(header):
+        table = table.iloc[1:, [i for i, field in enumerate(header) if field]]
+        table.columns = [field for field in header if field]
+        return table.reset_index(drop=True)
+    
+    names = None
+    if table.shape[1] > 1 and pd.to_numeric(table[0], errors='coerce').isna().any():
+        names = table.pop(0)
+    numeric = table.loc[:, (table != '').any()]
+    if numeric.shape[1] == 2:
+        numeric.columns = ['width', 'thickness']
+    elif numeric.shape[1] == 1:
+        numeric.columns = [single_column]
+    else:
+        raise ValueError("无法识别尺寸列：应为 宽度、厚度 两列，或直径/横截面积 一列")
+    if names is not None:
+        numeric.insert(0, 'sheet_name', names)
+    return numeric.reset_index(drop=True)
+
+def compute_cross_sectional_areas(table):
+    """由尺寸表计算横截面积并校验，返回 (面积数组, 错误信息数组)，有错误的行面积为 NaN
+
+    宽×厚（矩形）或直径（圆形）优先于直接给出的面积；所有行一次按数组计算。
+    """
+    n = len(table)
+    raw = {field: (table[field].astype(str).str.strip().replace('nan', '') if field in table
+                   else pd.Series([''] * n, index=table.index))
+           for field in DIMENSION_FIELDS}
+    values = {field: pd.to_numeric(column, errors='coerce').to_numpy(dtype=float)
+              for field, column in raw.items()}
+    width, thickness, diameter, area = (values[field] for field in DIMENSION_FIELDS)
+    
+    invalid = np.zeros(n, dtype=bool)
+    for field in DIMENSION_FIELDS:
+        invalid |= (raw[field] != '').to_numpy() & np.isnan(values[field])
+    has_rect = ~np.isnan(width) | ~np.isnan(thickness)
+    has_round = ~np.isnan(diameter)
+    with np.errstate(invalid='ignore'):
+        areas = np.where(has_round, np.pi / 4 * diameter ** 2, np.where(has_rect, width * thickness, area))
+        bad_size = (has_rect & ~((width > 0) & (thickness > 0))) | (has_round & ~(diameter > 0))
+        errors = np.select(
+            [invalid, has_rect & has_round, has_rect & (np.isnan(width) | np.isnan(thickness)),
+             bad_size, np.isnan(areas), ~(areas > 0)],
+            ["无效的数值", "同时给出了宽×厚和直径", "宽度和厚度需同时给出",
+             "尺寸必须大于0", "未输入尺寸或横截面积", "横截面积必须大于0"],
+            default='')
+    areas[errors != ''] = np.nan
+    return areas, errors
+
+def workbook_fingerprint(path, chunk_size=1 << 20):
+    """工作簿内容指纹（文件内容的 SHA-1），文件改名或移动后仍能找到之前的参数"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# 试样内容哈希的量化步长：载荷 (N)、位移 (mm)，吸收重新导出时的浮点和格式误差
+CONTENT_HASH_STEPS = (1e-3, 1e-6)
+# 近似重复判定：轮廓采样点数、分桶宽度（峰值载荷/最大位移取对数后的宽度、行数）和相对容差
+PROFILE_POINTS = 32
+PROFILE_BUCKET = (0.01, 8)
+PROFILE_TOLERANCE = 5e-3
+
+def specimen_content_span(load):
+    """内容指纹所用的区间：detect_test_range 识别的区间，从载荷首次超过阈值处（与 start_ratio 一致）开始
+
+    区间开头保留的空载点随导出时多出的空载行而不同，不计入指纹。
+    """
+    load = np.asarray(load, dtype=float)
+    start, stop = detect_test_range(load)
+    if stop > start:
+        start += int(np.argmax(load[start:stop] > 0.02 * np.nanmax(load[start:stop])))
+    return start, stop
+
+def specimen_content_hash(load, displacement, steps=CONTENT_HASH_STEPS):
+    """试样内容指纹：有效区间内量化后的载荷/位移数组的 SHA-1
+
+    只取 specimen_content_span 的区间，同一试验重新导出到其他工作簿时，即使前后多出或少了
+    空载数据，指纹也相同。量化只能吸收大部分舍入误差：数值恰好落在量化边界附近时
+    （如 float32 往返、保留两位小数导出）指纹会不同，这类近似重复由 specimen_profile 识别。
+    """
+    load = np.asarray(load, dtype=float)
+    displacement = np.asarray(displacement, dtype=float)
+    start, stop = specimen_content_span(load)
+    digest = hashlib.sha1()
+    for values, step in ((load[start:stop], steps[0]), (displacement[start:stop], steps[1])):
+        quantized = np.rint(values / step).astype('<i8')
+        digest.update(len(quantized).to_bytes(8, 'little'))
+        digest.update(quantized.tobytes())
+    return digest.hexdigest()
+
+def specimen_profile(load, displacement, points=PROFILE_POINTS):
+    """试样内容轮廓：指纹区间的行数、峰值载荷、最大位移，以及按行号等距插值的载荷/位移采样
+
+    用于识别指纹不同但内容近似的重复试样（见 profiles_match），可直接存为 JSON。
+    """
+    load = np.asarray(load, dtype=float)
+    displacement = np.asarray(displacement, dtype=float)
+    start, stop = specimen_content_span(load)
+    load = load[start:stop]
+    displacement = displacement[start:stop]
+    if len(load) == 0:
+        return {'rows': 0, 'load_max': 0.0, 'displacement_max': 0.0, 'load': [], 'displacement': []}
+    positions = np.linspace(0, len(load) - 1, points)
+    index = np.arange(len(load))
+    return {
+        'rows': len(load),
+        'load_max': float(np.nanmax(np.abs(load))),
+        'displacement_max': float(np.nanmax(np.abs(displacement))),
+        'load': np.interp(positions, index, load).tolist(),
+        'displacement': np.interp(positions, index, displacement).tolist(),
+    }
+
+def profile_buckets(profile, neighbours=False, bucket=PROFILE_BUCKET):
+    """轮廓所在的粗网格桶（行数、峰值载荷和最大位移的对数分段）；neighbours 为真时返回自身及相邻的 27 个桶
+
+    容差内近似的两个轮廓必定落在相同或相邻的桶中，查找时只需比较这些桶里的候选。
+    """
+    width, rows_step = bucket
+    cell = (profile['rows'] // rows_step,
+            *(int(np.floor(np.log(max(profile[name], 1e-12)) / width)) for name in ('load_max', 'displacement_max')))
+    if not neighbours:
+        return f"{cell[0]}:{cell[1]}:{cell[2]}"
+    return [f"{cell[0] + i}:{cell[1] + j}:{cell[2] + k}"
+            for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)]
+
+def profiles_match(first, second, tolerance=PROFILE_TOLERANCE):
+    """两个试样轮廓是否近似：行数最多差 1，峰值和各采样点的偏差都在满量程的 tolerance 以内"""
+    if not first['rows'] or not second['rows'] or abs(first['rows'] - second['rows']) > 1:
+        return False
+    for name, samples in (('load_max', 'load'), ('displacement_max', 'displacement')):
+        limit = tolerance * max(first[name], second[name])
+        if abs(first[name] - second[name]) > limit or len(first[samples]) != len(second[samples]):
+            return False
+        if np.max(np.abs(np.subtract(first[samples], second[samples])), initial=0.0) > limit:
+            return False
+    return True
+
+def specimen_result_key(rows, area, gauge_length, offsets=None, total_offsets=None, yield_method='legacy',
+                        time_budget=None, qc=True, trim=True, test_range=None, preprocess=None):
+    """计算结果的缓存键（JSON 文本）：数据行数、面积、标距、偏移量、算法设置、有效区间和预处理配置"""
+    return json.dumps(to_json_safe([
+        rows, None if area is None else float(area), float(gauge_length),
+        DEFAULT_PROOF_OFFSETS if offsets is None else list(offsets),
+        DEFAULT_TOTAL_OFFSETS if total_offsets is None else list(total_offsets),
+        yield_method, time_budget, qc, trim, test_range, preprocess or []
+    ]))
+
+class ConfigStore:
+    """试样参数库（SQLite）：按 (工作簿指纹, sheet名称) 保存横截面积、引伸计标距和图例文本
+
+    每次确认参数只更新改动的行，按主键查找，不随历史数据增多而变慢。旧版 json 配置中
+    只按sheet名称保存的面积/图例迁移到指纹为 '' 的行，仅在工作簿没有自己的参数时作为备选。
+    另按表头签名保存列映射模板（表头行、载荷/引伸计列位置和单位），按内容指纹登记见过的试样
+    （首次出现的工作簿和sheet）及其最近一次的计算结果，用于识别重复试样并复用结果。
+    """
+    
+    LEGACY_FINGERPRINT = ''
+    FIELDS = ('area', 'gauge_length', 'legend')
+    TEMPLATE_FIELDS = ('name', 'header_row', 'load_column', 'extensometer_column', 'load_unit',
+                       'displacement_unit', 'sample', 'source', 'uses', 'updated', 'preprocess')
+    
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS workbooks ("
+                " fingerprint TEXT PRIMARY KEY, path TEXT, last_opened REAL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS workbooks_path ON workbooks(path)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS specimens ("
+                " fingerprint TEXT NOT NULL, sheet TEXT NOT NULL,"
+                " area REAL, gauge_length REAL, legend TEXT, updated REAL,"
+                " PRIMARY KEY (fingerprint, sheet)) WITHOUT ROWID")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS column_templates ("
+                " signature TEXT PRIMARY KEY, name TEXT, header_row INTEGER,"
+                " load_column INTEGER, extensometer_column INTEGER, load_unit TEXT, displacement_unit TEXT,"
+                " sample TEXT, source TEXT, uses INTEGER DEFAULT 0, updated REAL) WITHOUT ROWID")
+            # 旧版参数库的模板表没有预处理配置列
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(column_templates)")}
+            if 'preprocess' not in columns:
+                self.conn.execute("ALTER TABLE column_templates ADD COLUMN preprocess TEXT")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS specimen_index ("
+                " content_hash TEXT PRIMARY KEY, workbook TEXT, path TEXT, sheet TEXT, rows INTEGER,"
+                " first_seen REAL, last_seen REAL, result_key TEXT, results TEXT) WITHOUT ROWID")
+            # 旧版参数库的试样索引没有内容轮廓（近似重复查找）列
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(specimen_index)")}
+            for column in ('bucket', 'profile'):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE specimen_index ADD COLUMN {column} TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS specimen_index_bucket ON specimen_index(bucket)")
+    
+    def close(self):
+        self.conn.close()
+    
+    def register_workbook(self, fingerprint, path):
+        """记录工作簿最近一次打开的路径"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO workbooks (fingerprint, path, last_opened) VALUES (?, ?, ?)"
+                " ON CONFLICT(fingerprint) DO UPDATE SET path=excluded.path, last_opened=excluded.last_opened",
+                (fingerprint, os.path.abspath(path), time.time()))
+    
+    def previous_fingerprint(self, path, fingerprint):
+        """同一路径上次打开时的指纹（工作簿被修改过内容时用来找回原参数），没有返回 None"""
+        row = self.conn.execute(
+            "SELECT fingerprint FROM workbooks WHERE path = ? AND fingerprint != ?"
+            " ORDER BY last_opened DESC LIMIT 1", (os.path.abspath(path), fingerprint)).fetchone()
+        return row[0] if row else None
+    
+    def load(self, fingerprint):
+        """返回 {sheet名称: {'area': ..., 'gauge_length': ..., 'legend': ...}}，未保存的字段为 None"""
+        rows = self.conn.execute(
+            "SELECT sheet, area, gauge_length, legend FROM specimens WHERE fingerprint = ?", (fingerprint,))
+        return {sheet: dict(zip(self.FIELDS, values)) for sheet, *values in rows}
+    
+    def get(self, fingerprint, sheet):
+        row = self.conn.execute(
+            "SELECT area, gauge_length, legend FROM specimens WHERE fingerprint = ? AND sheet = ?",
+            (fingerprint, sheet)).fetchone()
+        return dict(zip(self.FIELDS, row)) if row else None
+    
+    def upsert_many(self, fingerprint, rows):
+        """rows: {sheet名称: {字段: 值}}，只写给出的字段，其余字段保持原值；整批在一个事务中提交"""
+        now = time.time()
+        with self.conn:
+            for sheet, fields in rows.items():
+                fields = {key: value for key, value in fields.items() if key in self.FIELDS}
+                if not fields:
+                    continue
+                columns = ', '.join(fields)
+                placeholders = ', '.join('?' for _ in fields)
+                updates = ', '.join(f"{key}=excluded.{key}" for key in fields)
+                self.conn.execute(
+                    f"INSERT INTO specimens (fingerprint, sheet, {columns}, updated) VALUES (?, ?, {placeholders}, ?)"
+                    f" ON CONFLICT(fingerprint, sheet) DO UPDATE SET {updates}, updated=excluded.updated",
+                    (fingerprint, sheet, *fields.values(), now))
+    
+    def upsert(self, fingerprint, sheet, **fields):
+        self.upsert_many(fingerprint, {sheet: fields})
+    
+    def migrate_legacy(self, cross_sectional_areas=None, legend_texts=None):
+        """导入旧版 json 配置中按sheet名称保存的面积和图例，返回导入的行数"""
+        rows = collections.defaultdict(dict)
+        for sheet, area in (cross_sectional_areas or {}).items():
+            rows[str(sheet)]['area'] = float(area)
+        for sheet, legend in (legend_texts or {}).items():
+            rows[str(sheet)]['legend'] = str(legend)
+        self.upsert_many(self.LEGACY_FINGERPRINT, rows)
+        return len(rows)
+    
+    def load_templates(self):
+        """返回所有列映射模板 {表头签名: 模板}"""
+        rows = self.conn.execute(f"SELECT signature, {', '.join(self.TEMPLATE_FIELDS)} FROM column_templates")
+        templates = {}
+        for signature, *values in rows:
+            template = dict(zip(self.TEMPLATE_FIELDS, values), signature=signature)
+            template['sample'] = json.loads(template['sample'] or '[]')
+            template['preprocess'] = json.loads(template['preprocess'] or '[]')
+            templates[signature] = template
+        return templates
+    
+    def save_templates(self, templates, overwrite_manual=False):
+        """保存模板；自动识别的模板不覆盖手工修改过的（source 为 'manual'）"""
+        now = time.time()
+        with self.conn:
+            for template in templates:
+                values = (template['signature'], template.get('name', ''), template['header_row'],
+                          template['load_column'], template['extensometer_column'], template.get('load_unit'),
+                          template.get('displacement_unit'), json.dumps(template.get('sample', []), ensure_ascii=False),
+                          template.get('source', 'auto'), now,
+                          json.dumps(template.get('preprocess') or [], ensure_ascii=False))
+                guard = "" if overwrite_manual else " WHERE column_templates.source != 'manual'"
+                self.conn.execute(
+                    "INSERT INTO column_templates (signature, name, header_row, load_column, extensometer_column,"
+                    " load_unit, displacement_unit, sample, source, updated, preprocess)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(signature) DO UPDATE SET name=excluded.name, header_row=excluded.header_row,"
+                    " load_column=excluded.load_column, extensometer_column=excluded.extensometer_column,"
+                    " load_unit=excluded.load_unit, displacement_unit=excluded.displacement_unit,"
+                    " sample=excluded.sample, source=excluded.source, updated=excluded.updated,"
+                    " preprocess=excluded.preprocess" + guard, values)
+    
+    def record_template_use(self, signatures):
+        """累加模板的使用次数"""
+        with self.conn:
+            self.conn.executemany("UPDATE column_templates SET uses = uses + 1 WHERE signature = ?",
+                                  [(signature,) for signature in signatures])
+    
+    def delete_template(self, signature):
+        with self.conn:
+            self.conn.execute("DELETE FROM column_templates WHERE signature = ?", (signature,))
+    
+    def find_specimens(self, content_hashes):
+        """按内容指纹查找已登记的试样，返回 {指纹: {'workbook', 'path', 'sheet', 'rows', 'result_key', 'results'}}"""
+        found = {}
+        for content_hash in content_hashes:
+            row = self.conn.execute(
+                "SELECT workbook, path, sheet, rows, result_key, results FROM specimen_index WHERE content_hash = ?",
+                (content_hash,)).fetchone()
+            if row:
+                entry = dict(zip(('workbook', 'path', 'sheet', 'rows', 'result_key', 'results'), row))
+                entry['results'] = json.loads(entry['results']) if entry['results'] else None
+                found[content_hash] = entry
+        return found
+    
+    def find_similar_specimens(self, profiles):
+        """按内容轮廓查找指纹不同但内容近似的已登记试样 {指纹: 轮廓}
+
+        只取轮廓相同或相邻桶中的候选（按 bucket 索引查找）再逐个比较，返回
+        {指纹: {'content_hash', 'workbook', 'path', 'sheet', 'rows'}}，有多个时取最早登记的。
+        """
+        found = {}
+        for content_hash, profile in profiles.items():
+            buckets = profile_buckets(profile, neighbours=True)
+            rows = self.conn.execute(
+                "SELECT content_hash, workbook, path, sheet, rows, profile FROM specimen_index"
+                f" WHERE bucket IN ({', '.join('?' * len(buckets))}) AND content_hash != ?"
+                " ORDER BY first_seen", (*buckets, content_hash)).fetchall()
+            for row in rows:
+                if row[5] and profiles_match(profile, json.loads(row[5])):
+                    found[content_hash] = dict(zip(('content_hash', 'workbook', 'path', 'sheet', 'rows'), row))
+                    break
+        return found
+    
+    def index_specimens(self, entries):
+        """登记试样 [(指纹, 工作簿指纹, 路径, sheet名称, 行数, 内容轮廓)]；已登记的只更新最近出现时间，保留首次来源"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO specimen_index (content_hash, workbook, path, sheet, rows, first_seen, last_seen,"
+                " bucket, profile) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(content_hash) DO UPDATE SET last_seen=excluded.last_seen,"
+                " bucket=COALESCE(bucket, excluded.bucket), profile=COALESCE(profile, excluded.profile)",
+                [(content_hash, workbook, os.path.abspath(path) if path else None, sheet, rows, now, now,
+                  profile_buckets(profile), json.dumps(profile))
+                 for content_hash, workbook, path, sheet, rows, profile in entries])
+    
+    def store_specimen_results(self, rows):
+        """保存试样的计算结果 [(指纹, 计算条件, 结果字典)]，每个试样只保留最近一次的计算条件
+
+        计算条件由 specimen_result_key 生成，不含行数和有效区间位置：指纹只覆盖有效区间，
+        与工作簿中前后多出的空载行无关。
+        """
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE specimen_index SET result_key = ?, results = ? WHERE content_hash = ?",
+                [(key, json.dumps(to_json_safe(results), ensure_ascii=False), content_hash)
+                 for content_hash, key, results in rows])
+
+# 工作区文件：魔数 + 头长度 (uint64) + JSON 头，之后为按 64 字节对齐的原始数组数据，可直接内存映射
+WORKSPACE_MAGIC = b'TTAWKSP1'
+WORKSPACE_ALIGN = 64
+
+def _workspace_align(offset):
+    return -(-offset // WORKSPACE_ALIGN) * WORKSPACE_ALIGN
+
+def write_workspace(path, header, arrays):
+    """把 JSON 头和 {名称: 一维/多维数组} 写入单个工作区文件
+
+    数组按原字节顺序依次写入（不压缩、不序列化），偏移量和 dtype/shape 记录在头中。
+    先写临时文件再替换，保存中断时不会损坏原有的工作区文件。
+    """
+    layout = {}
+    offset = 0
+    contiguous = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        contiguous[name] = array
+        layout[name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset = _workspace_align(offset + array.nbytes)
+    header_bytes = json.dumps(to_json_safe({**header, 'arrays': layout}), ensure_ascii=False).encode('utf-8')
+    data_offset = _workspace_align(len(WORKSPACE_MAGIC) + 8 + len(header_bytes))
+    
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(WORKSPACE_MAGIC)
+        f.write(len(header_bytes).to_bytes(8, 'little'))
+        f.write(header_bytes)
+        for name, array in contiguous.items():
+            f.write(b'\0' * (data_offset + layout[name]['offset'] - f.tell()))
+            f.write(memoryview(array).cast('B'))
+    os.replace(temp_path, path)
+    return data_offset + offset
+
+def read_workspace(path):
+    """读取工作区文件，返回 (头, {名称: 数组})；数组为只读的内存映射视图，按需从磁盘读入"""
+    with open(path, 'rb') as f:
+        if f.read(len(WORKSPACE_MAGIC)) != WORKSPACE_MAGIC:
+            raise ValueError("不是工作区文件")
+        header_length = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    data_offset = _workspace_align(len(WORKSPACE_MAGIC) + 8 + header_length)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, entry in header.pop('arrays').items():
+        dtype = np.dtype(entry['dtype'])
+        start = data_offset + entry['offset']
+        size = int(np.prod(entry['shape'])) * dtype.itemsize
+        arrays[name] = buffer[start:start + size].view(dtype).reshape(entry['shape'])
+    return header, arrays
+
+def generate_synthetic_curve(n_points=2000, modulus=130000.0, yield_strength=500.0, tensile_strength=600.0,
+                             uniform_strain=0.08, fracture_strain=0.18, noise=0.5,
+                             cross_sectional_area=2.0, gauge_length=10.0, seed=None,
+                             hardening_exponent=0.4, necking_drop=0.3, fracture_points=0,
+                             preload=0.0, slip_strain=None, slip_size=0.0):
+    """生成合成的拉伸曲线 (载荷 N / 位移 mm)，用于实时采集模拟、测试和基准测试
+
+    弹性段斜率为 modulus，之后按幂律硬化到 tensile_strength (在 uniform_strain 处)，
+    再颈缩下降 necking_drop·Rm 到断裂应变。可选:
+    fracture_points  断裂后载荷骤降到接近零的点数（从 n_points 中划出）
+    preload          预加载应力 (MPa)，曲线从该应力开始，位移零点不变
+    slip_strain      引伸计打滑发生的应变，之后的位移读数整体偏移 slip_size (mm)
+    """
+    rng = np.random.default_rng(seed)
+    n_curve = n_points - fracture_points
+    strain = np.linspace(0.0, fracture_strain, n_curve)
+    yield_strain = yield_strength / modulus
+
+    # 硬化段：σ = Rp + (Rm - Rp)·((ε-εy)/(εu-εy))^n
+    hardening = np.clip((strain - yield_strain) / (uniform_strain - yield_strain), 0.0, 1.0)
+    stress = np.where(strain <= yield_strain, modulus * strain,
+                      yield_strength + (tensile_strength - yield_strength) * hardening ** hardening_exponent)
+    # 颈缩段：按二次曲线下降
+    necking = np.clip((strain - uniform_strain) / (fracture_strain - uniform_strain), 0.0, 1.0)
+    stress = stress - necking_drop * tensile_strength * necking ** 2
+    if preload > 0:
+        stress = np.maximum(stress, preload)
+
+    # 断裂：载荷在几个点内降到接近零，应变基本不变（弹性回缩）
+    if fracture_points > 0:
+        drop = np.linspace(stress[-1], 0.02 * tensile_strength, fracture_points + 1)[1:]
+        stress = np.concatenate([stress, drop])
+        strain = np.concatenate([strain, fracture_strain - (stress[n_curve - 1] - drop) / modulus])
+
+    stress = stress + rng.normal(0.0, noise, n_points)
+    displacement = strain * gauge_length
+    if slip_strain is not None:
+        displacement = displacement + np.where(strain >= slip_strain, slip_size, 0.0)
+    return pd.DataFrame({
+        'Load_N': stress * cross_sectional_area,
+        'Displacement_mm': displacement
+    })
+
+class LiveTensileStream:
+    """实时采集数据流：样本追加到可增长缓冲区，增量维护 Rm、弹性段拟合统计量和偏移线交点
+
+    每个样本的处理为 O(1)（对偏移量个数线性）。弹性段拟合统计量持续累加，直到最近
+    fit_window 个点的局部斜率低于整体斜率的 departure_ratio 倍时冻结；之后逐点检测
+    各偏移线的交点。这些只是采集过程中的预览值，采集结束后数据作为新sheet加入，
+    最终结果按界面当前的计算设置重新计算。
+    """
+
+    def __init__(self, cross_sectional_area, gauge_length, offsets=None, total_offsets=None,
+                 capacity=4096, fit_window=20, min_elastic_points=30, departure_ratio=0.5):
+        self.cross_sectional_area = cross_sectional_area
+        self.gauge_length = gauge_length
+        self.offsets = list(DEFAULT_PROOF_OFFSETS if offsets is None else offsets)
+        self.total_offsets = list(DEFAULT_TOTAL_OFFSETS if total_offsets is None else total_offsets)
+        self.min_elastic_points = min_elastic_points
+        self.departure_ratio = departure_ratio
+
+        # 可增长缓冲区（容量不足时翻倍，追加均摊 O(1)）
+        self._load = np.empty(capacity)
+        self._displacement = np.empty(capacity)
+        self.count = 0
+
+        # 运行最大值
+        self.max_stress = -np.inf
+        self.max_index = -1
+        self.max_strain = -np.inf
+
+        # 弹性段累积统计量
+        self._n = 0
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self.elastic_fit = None  # 冻结后为 (斜率, 截距)
+
+        # 局部斜率滑动窗口
+        self._window = collections.deque(maxlen=fit_window)
+        self._wx = self._wy = self._wxx = self._wxy = 0.0
+
+        # 偏移线交点检测
+        self._prev_point = None
+        self._prev_diff = {}
+        self.proof_strengths = {format_offset_label('Rp', off): None for off in self.offsets}
+
+    @staticmethod
+    def _slope(n, sx, sy, sxx, sxy):
+        """由累积和计算最小二乘斜率和截距"""
+        denominator = n * sxx - sx * sx
+        if n < 2 or denominator <= 0:
+            return None
+        m = (n * sxy - sx * sy) / denominator
+        return m, (sy - m * sx) / n
+
+    def append(self, load, displacement):
+        """追加一个样本并增量更新所有实时指标"""
+        if self.count == len(self._load):
+            self._load = np.resize(self._load, 2 * len(self._load))
+            self._displacement = np.resize(self._displacement, 2 * len(self._displacement))
+        self._load[self.count] = load
+        self._displacement[self.count] = displacement
+        self.count += 1
+
+        stress = load / self.cross_sectional_area
+        strain = displacement / self.gauge_length
+
+        if stress > self.max_stress:
+            self.max_stress = stress
+            self.max_index = self.count - 1
+        self.max_strain = max(self.max_strain, strain)
+
+        # 局部斜率窗口
+        if len(self._window) == self._window.maxlen:
+            old_x, old_y = self._window[0]
+            self._wx -= old_x
+            self._wy -= old_y
+            self._wxx -= old_x * old_x
+            self._wxy -= old_x * old_y
+        self._window.append((strain, stress))
+        self._wx += strain
+        self._wy += stress
+        self._wxx += strain * strain
+        self._wxy += strain * stress
+
+        if self.elastic_fit is None:
+            self._n += 1
+            self._sx += strain
+            self._sy += stress
+            self._sxx += strain * strain
+            self._sxy += strain * stress
+            self._update_elastic_fit()
+        else:
+            self._update_crossings(strain, stress)
+        self._prev_point = (strain, stress)
+
+    def extend(self, samples):
+        """追加多个 (载荷, 位移) 样本"""
+        for load, displacement in samples:
+            self.append(load, displacement)
+
+    def _update_elastic_fit(self):
+        """局部斜率明显低于弹性段整体斜率时冻结弹性拟合"""
+        if self._n < self.min_elastic_points or len(self._window) < self._window.maxlen:
+            return
+        overall = self._slope(self._n, self._sx, self._sy, self._sxx, self._sxy)
+        local = self._slope(len(self._window), self._wx, self._wy, self._wxx, self._wxy)
+        if overall is None or local is None or overall[0] <= 0:
+            return
+        if local[0] < self.departure_ratio * overall[0]:
+            # 弹性拟合不含局部窗口内已进入屈服的点
+            w = len(self._window)
+            elastic = self._slope(self._n - w, self._sx - self._wx, self._sy - self._wy,
+                                  self._sxx - self._wxx, self._sxy - self._wxy)
+            self.elastic_fit = elastic if elastic is not None and elastic[0] > 0 else overall
+            # 冻结前的局部窗口内可能已越过偏移线，补查一次
+            self._prev_point = None
+            for strain, stress in self._window:
+                self._update_crossings(strain, stress)
+                self._prev_point = (strain, stress)
+
+    def _update_crossings(self, strain, stress):
+        """检测尚未求出的偏移线交点"""
+        m, c = self.elastic_fit
+        for off in self.offsets:
+            label = format_offset_label('Rp', off)
+            if self.proof_strengths[label] is not None:
+                continue
+            diff = stress - (m * (strain - off) + c)
+            prev_diff = self._prev_diff.get(label)
+            if prev_diff is not None and prev_diff > 0 and diff <= 0:
+                t = prev_diff / (prev_diff - diff)
+                prev_strain = self._prev_point[0]
+                cross_strain = prev_strain + t * (strain - prev_strain)
+                self.proof_strengths[label] = m * (cross_strain - off) + c
+            self._prev_diff[label] = diff
+
+    @property
+    def load(self):
+        """已采集的载荷（视图，不复制）"""
+        return self._load[:self.count]
+
+    @property
+    def displacement(self):
+        """已采集的位移（视图，不复制）"""
+        return self._displacement[:self.count]
+
+    def snapshot(self):
+        """当前的实时指标"""
+        return {
+            'count': self.count,
+            'tensile_strength': self.max_stress if self.count else None,
+            'elongation': self.max_strain * 100 if self.count else None,
+            'modulus': self.elastic_fit[0] if self.elastic_fit else None,
+            'proof_strengths': dict(self.proof_strengths)
+        }
+
+    def to_dataframe(self):
+        """以与Excel导入相同的列格式返回已采集数据"""
+        return pd.DataFrame({
+            'Load_N': self.load.copy(),
+            'Displacement_mm': self.displacement.copy()
+        })
+
+LIVE_END_MARKER = 'END'
+
+def parse_live_line(line):
+    """解析一行实时数据 "载荷,位移"（也接受空白或分号分隔），无法解析时返回 None"""
+    parts = line.replace(';', ',').replace('\t', ',').replace(' ', ',').split(',')
+    parts = [part for part in parts if part]
+    if len(parts) < 2:
+        return None
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+
+class LiveSourceReader(threading.Thread):
+    """后台读取实时数据源，将样本块放入队列；数据流结束时放入 None
+
+    数据源格式: udp://主机:端口、tcp://主机:端口（本程序监听，模拟器连接）或命名管道/文件路径。
+    """
+
+    def __init__(self, source, sample_queue, timeout=0.5):
+        super().__init__(daemon=True)
+        self.source = source
+        self.sample_queue = sample_queue
+        self.timeout = timeout
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """请求停止读取"""
+        self._stop_event.set()
+
+    def _handle_lines(self, lines):
+        """解析若干行，遇到结束标记时返回 True"""
+        samples = []
+        finished = False
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line.upper() == LIVE_END_MARKER:
+                finished = True
+                break
+            sample = parse_live_line(line)
+            if sample is not None:
+                samples.append(sample)
+        if samples:
+            self.sample_queue.put(samples)
+        return finished
+
+    def run(self):
+        try:
+            if self.source.startswith('udp://'):
+                self._run_udp(*split_host_port(self.source))
+            elif self.source.startswith('tcp://'):
+                self._run_tcp(*split_host_port(self.source))
+            else:
+                self._run_pipe(self.source)
+        except Exception as e:
+            print(f"实时数据源读取出错: {e}")
+        finally:
+            self.sample_queue.put(None)
+
+    def _run_udp(self, host, port):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind((host, port))
+            sock.settimeout(self.timeout)
+            while not self._stop_event.is_set():
+                try:
+                    datagram, _ = sock.recvfrom(65536)
+                except socket.timeout:
+                    continue
+                if self._handle_lines(datagram.decode('utf-8', errors='ignore').splitlines()):
+                    return
+
+    def _run_tcp(self, host, port):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((host, port))
+            server.listen(1)
+            server.settimeout(self.timeout)
+            while not self._stop_event.is_set():
+                try:
+                    conn, _ = server.accept()
+                    break
+                except socket.timeout:
+                    continue
+            else:
+                return
+            with conn:
+                conn.settimeout(self.timeout)
+                pending = ''
+                while not self._stop_event.is_set():
+                    try:
+                        chunk = conn.recv(65536)
+                    except socket.timeout:
+                        continue
+                    if not chunk:
+                        self._handle_lines([pending])
+                        return
+                    pending += chunk.decode('utf-8', errors='ignore')
+                    *lines, pending = pending.split('\n')
+                    if self._handle_lines(lines):
+                        return
+
+    def _run_pipe(self, path):
+        if not os.path.exists(path) and hasattr(os, 'mkfifo'):
+            os.mkfifo(path)
+        with open(path, 'r', encoding='utf-8') as pipe:
+            for line in pipe:
+                if self._stop_event.is_set() or self._handle_lines([line]):
+                    return
+
+def split_host_port(address):
+    """解析 'udp://127.0.0.1:9750' 形式的地址"""
+    host, _, port = address.split('://', 1)[1].rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+def run_live_simulator(target, data=None, rate=500.0, chunk_size=10, seed=None):
+    """实时采集模拟器：按给定采样率把曲线逐块发送到数据源，最后发送结束标记"""
+    if data is None:
+        data = generate_synthetic_curve(seed=seed)
+    lines = [f"{load:.6f},{displacement:.8f}\n"
+             for load, displacement in zip(data['Load_N'].values, data['Displacement_mm'].values)]
+    chunks = [''.join(lines[i:i + chunk_size]) for i in range(0, len(lines), chunk_size)]
+    interval = chunk_size / rate
+
+    if target.startswith('udp://'):
+        address = split_host_port(target)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for chunk in chunks:
+                sock.sendto(chunk.encode('utf-8'), address)
+                time.sleep(interval)
+            sock.sendto(LIVE_END_MARKER.encode('utf-8'), address)
+    elif target.startswith('tcp://'):
+        with socket.create_connection(split_host_port(target)) as sock:
+            for chunk in chunks:
+                sock.sendall(chunk.encode('utf-8'))
+                time.sleep(interval)
+            sock.sendall(f"{LIVE_END_MARKER}\n".encode('utf-8'))
+    else:
+        with open(target, 'w', encoding='utf-8') as pipe:
+            for chunk in chunks:
+                pipe.write(chunk)
+                pipe.flush()
+                time.sleep(interval)
+            pipe.write(f"{LIVE_END_MARKER}\n")
+    print(f"模拟器已发送 {len(lines)} 个样本到 {target}")
+
+def iter_batch_results(table):
+    """将批量结果表逐行转换为与 compute_specimen_properties 相同结构的结果字典"""
+    labels = [col for col in table.columns if col.startswith(('Rp', 'Rt'))]
+
+    def clean(value):
+        return None if pd.isna(value) else value
+
+    for record in table.to_dict('records'):
+        results = empty_results(record['error_msg'])
+        for key in ('yield_strength', 'tensile_strength', 'elongation', 'uniform_elongation',
+                    'fracture_elongation', 'toughness', 'n_value'):
+            results[key] = clean(record[key])
+        results['yield_strain'] = clean(record.get('yield_strain'))
+        results['yield_method'] = record.get('yield_method') or ''
+        results['yield_algorithm'] = record.get('yield_algorithm') or ''
+        results['yield_elapsed'] = clean(record.get('yield_elapsed'))
+        results['qc_flags'] = record.get('qc_flags') or ''
+        if 'test_start' in record:
+            results['test_range'] = (record['test_start'], record['test_stop'])
+        results['proof_strengths'] = {label: clean(record[label]) for label in labels}
+        yield record['sheet_name'], results
+
+SERVICE_CHUNK_SIZE = 64
+
+def to_json_safe(value):
+    """将结果中的 numpy 数值和 NaN 转换为可 JSON 序列化的值"""
+    if isinstance(value, dict):
+        return {str(k): to_json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return [to_json_safe(v) for v in value.tolist()]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+def analyze_specimens_task(specimens, gauge_length, offsets=None, total_offsets=None, recorder=None,
+                           yield_method='legacy', time_budget=None, qc=True, preprocess=None):
+    """工作进程中执行的批量计算，返回 [{'name': 名称, 结果...}, ...]；preprocess 为预处理配置"""
+    pipeline = PreprocessPipeline(preprocess, context={'gauge_length': gauge_length})
+    table = compute_batch_properties(specimens, gauge_length, offsets, total_offsets, recorder=recorder,
+                                     yield_method=yield_method, time_budget=time_budget, qc=qc,
+                                     preprocess=pipeline)
+    return [to_json_safe({'name': name, **results}) for name, results in iter_batch_results(table)]
+
+def analyze_workbook_task(content, gauge_length, default_area=None, areas=None,
+                          offsets=None, total_offsets=None, yield_method='legacy', time_budget=None, qc=True,
+                          preprocess=None):
+    """工作进程中解析上传的工作簿并计算所有sheet"""
+    areas = areas or {}
+    sheets = read_workbook_sheets(io.BytesIO(content))
+    specimens = []
+    missing = []
+    for sheet_name, data in sheets.items():
+        area = areas.get(sheet_name, default_area)
+        if area is None:
+            missing.append(sheet_name)
+            continue
+        specimens.append((sheet_name, data['Load_N'].to_numpy(), data['Displacement_mm'].to_numpy(), float(area)))
+    results = analyze_specimens_task(specimens, gauge_length, offsets, total_offsets,
+                                     yield_method=yield_method, time_budget=time_budget, qc=qc,
+                                     preprocess=preprocess) if specimens else []
+    for sheet_name in missing:
+        results.append(to_json_safe({'name': sheet_name, **empty_results("缺少横截面积")}))
+    return results
+
+def specimen_from_frame(df, name, area):
+    """从 CSV/Arrow 表中识别载荷和位移列，返回 (名称, 载荷, 位移, 面积)"""
+    load_col, extensometer_col = find_data_columns(df.columns)
+    if 'Load_N' in df.columns and 'Displacement_mm' in df.columns:
+        load_col, extensometer_col = 'Load_N', 'Displacement_mm'
+    if load_col is None or extensometer_col is None:
+        numeric_cols = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+        if len(numeric_cols) < 2:
+            raise ValueError("未找到所需的载荷和引伸计数据列")
+        load_col, extensometer_col = numeric_cols[0], numeric_cols[1]
+    data = pd.DataFrame({
+        'Load_N': pd.to_numeric(df[load_col], errors='coerce'),
+        'Displacement_mm': pd.to_numeric(df[extensometer_col], errors='coerce')
+    }).dropna()
+    return name, data['Load_N'].to_numpy(), data['Displacement_mm'].to_numpy(), area
+
+def specimens_from_json(payload):
+    """解析 JSON 请求体: 单个试样 {load, displacement, cross_sectional_area} 或 {"specimens": [...]}"""
+    items = payload.get('specimens', [payload])
+    if not isinstance(items, list) or not items:
+        raise ValueError("specimens 必须是非空列表")
+    specimens = []
+    for i, item in enumerate(items):
+        try:
+            load = np.asarray(item['load'], dtype=float)
+            displacement = np.asarray(item['displacement'], dtype=float)
+            area = float(item.get('cross_sectional_area', item.get('area')))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"第{i + 1}个试样缺少 load、displacement 或 cross_sectional_area")
+        if load.ndim != 1 or load.shape != displacement.shape:
+            raise ValueError(f"第{i + 1}个试样的 load 和 displacement 长度不一致")
+        if area <= 0:
+            raise ValueError(f"第{i + 1}个试样的横截面积必须大于0")
+        valid = np.isfinite(load) & np.isfinite(displacement)
+        specimens.append((str(item.get('name', f"specimen_{i + 1}")), load[valid], displacement[valid], area))
+    return specimens
+
+class ServiceError(Exception):
+    """带 HTTP 状态码的请求错误"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """分析服务的请求处理: GET /health, POST /analyze, POST /analyze/workbook"""
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self.send_json(200, self.server.status())
+        else:
+            self.send_json(404, {'error': "未知路径"})
+    
+    def do_POST(self):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+            if url.path == '/analyze':
+                tasks, gauge_length = self.parse_analyze(body, query)
+            elif url.path == '/analyze/workbook':
+                tasks, gauge_length = self.parse_workbook(body, query)
+            else:
+                raise ServiceError(404, "未知路径")
+            results = self.server.run_tasks(tasks)
+        except ServiceError as e:
+            headers = {'Retry-After': '1'} if e.status == 503 else None
+            self.send_json(e.status, {'error': str(e)}, headers)
+            return
+        except Exception as e:
+            self.send_json(500, {'error': f"计算失败: {str(e)}"})
+            return
+        
+        self.send_json(200, {
+            'gauge_length': gauge_length,
+            'specimens': results,
+            'elapsed_s': round(time.perf_counter() - started, 4)
+        })
+    
+    def parse_options(self, query, payload=None):
+        """读取标距、偏移量、屈服算法、质量预检和预处理设置，JSON 请求体中的值优先于查询参数，未给出时用服务启动参数
+
+        返回 (标距, 计算任务的关键字参数)
+        """
+        payload = payload or {}
+        try:
+            gauge_length = float(payload.get('gauge_length', query.get('gauge_length', self.server.gauge_length)))
+            offsets = payload.get('offsets', json.loads(query['offsets']) if 'offsets' in query else None)
+            total_offsets = payload.get('total_offsets',
+                                        json.loads(query['total_offsets']) if 'total_offsets' in query else None)
+            time_budget = payload.get('time_budget', query.get('time_budget', self.server.time_budget))
+            time_budget = float(time_budget) if time_budget is not None else None
+        except (TypeError, ValueError):
+            raise ServiceError(400, "gauge_length、offsets、total_offsets 或 time_budget 格式错误")
+        if gauge_length <= 0:
+            raise ServiceError(400, "标距必须大于0")
+        if time_budget is not None and time_budget <= 0:
+            raise ServiceError(400, "time_budget 必须大于0")
+        yield_method = payload.get('yield_method', query.get('yield_method', self.server.yield_method))
+        if yield_method not in YIELD_METHODS:
+            raise ServiceError(400, f"未知的屈服算法: {yield_method}（可选: {', '.join(YIELD_METHODS)}）")
+        qc = payload.get('qc', query.get('qc', self.server.qc))
+        if isinstance(qc, str):
+            qc = qc.strip().lower() not in ('0', 'false', 'no', 'off')
+        preprocess = payload.get('preprocess', query.get('preprocess', self.server.preprocess))
+        try:
+            # 请求中的预处理配置只接受步骤列表或 JSON 字符串，不按文件路径读取
+            if isinstance(preprocess, str):
+                preprocess = json.loads(preprocess)
+            preprocess = normalize_preprocess_spec(preprocess)
+        except (TypeError, ValueError) as e:
+            raise ServiceError(400, f"preprocess 格式错误: {e}")
+        return gauge_length, dict(offsets=offsets, total_offsets=total_offsets, yield_method=yield_method,
+                                  time_budget=time_budget, qc=qc, preprocess=preprocess)
+    
+    def parse_area(self, query, required=True):
+        if 'area' not in query:
+            if required:
+                raise ServiceError(400, "缺少查询参数 area（横截面积 mm²）")
+            return None
+        try:
+            area = float(query['area'])
+        except ValueError:
+            raise ServiceError(400, "area 必须是数字")
+        if area <= 0:
+            raise ServiceError(400, "横截面积必须大于0")
+        return area
+    
+    def parse_analyze(self, body, query):
+        """按 Content-Type 解析 JSON、CSV 或 Arrow 请求体，按块拆分为计算任务"""
+        content_type = (self.headers.get('Content-Type') or 'application/json').split(';')[0].strip().lower()
+        payload = None
+        try:
+            if content_type == 'application/json':
+                payload = json.loads(body.decode('utf-8'))
+                if not isinstance(payload, dict):
+                    raise ServiceError(400, "JSON 请求体必须是对象")
+                specimens = specimens_from_json(payload)
+            elif content_type in ('text/csv', 'application/csv'):
+                df = pd.read_csv(io.BytesIO(body))
+                specimens = [specimen_from_frame(df, query.get('name', 'specimen_1'), self.parse_area(query))]
+            elif content_type in ('application/vnd.apache.arrow.stream', 'application/vnd.apache.arrow.file'):
+                try:
+                    import pyarrow as pa
+                except ImportError:
+                    raise ServiceError(415, "未安装 pyarrow，无法解析 Arrow 数据")
+                if content_type.endswith('stream'):
+                    table = pa.ipc.open_stream(body).read_all()
+                else:
+                    table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+                specimens = [specimen_from_frame(table.to_pandas(), query.get('name', 'specimen_1'),
+                                                 self.parse_area(query))]
+            else:
+                raise ServiceError(415, f"不支持的 Content-Type: {content_type}")
+        except ServiceError:
+            raise
+        except ValueError as e:
+            raise ServiceError(400, str(e))
+        
+        gauge_length, options = self.parse_options(query, payload)
+        tasks = [(analyze_specimens_task, (specimens[i:i + SERVICE_CHUNK_SIZE], gauge_length), options)
+                 for i in range(0, len(specimens), SERVICE_CHUNK_SIZE)]
+        return tasks, gauge_length
+    
+    def parse_workbook(self, body, query):
+        """上传的工作簿: 请求体为 xlsx 文件，面积由 area（统一值）和/或 areas（JSON: {sheet: 面积}）给出"""
+        if not body:
+            raise ServiceError(400, "请求体为空")
+        try:
+            areas = json.loads(query['areas']) if 'areas' in query else {}
+        except ValueError:
+            raise ServiceError(400, "areas 必须是 JSON 对象")
+        if not isinstance(areas, dict):
+            raise ServiceError(400, "areas 必须是 JSON 对象")
+        default_area = self.parse_area(query, required=not areas)
+        gauge_length, options = self.parse_options(query)
+        return [(analyze_workbook_task, (body, gauge_length, default_area, areas), options)], gauge_length
+
+class AnalysisService(ThreadingHTTPServer):
+    """本地 HTTP/JSON 分析服务
+
+    请求线程只负责解析和响应，计算提交到进程池；同时在途的计算任务数受 max_pending 限制，
+    超出时立即返回 503 和 Retry-After，由客户端稍后重试，避免请求无限排队。
+    """
+    daemon_threads = True
+    
+    def __init__(self, host='127.0.0.1', port=8765, workers=None, max_pending=None,
+                 gauge_length=10.0, verbose=False, yield_method='legacy', time_budget=None, qc=True,
+                 preprocess=None):
+        super().__init__((host, port), AnalysisRequestHandler)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.gauge_length = gauge_length
+        self.yield_method = yield_method
+        self.time_budget = time_budget
+        self.qc = qc
+        self.preprocess = preprocess
+        self.verbose = verbose
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+    
+    def status(self):
+        with self.lock:
+            return {'status': 'ok', 'workers': self.workers, 'max_pending': self.max_pending,
+                    'pending': self.pending, 'completed': self.completed, 'rejected': self.rejected}
+    
+    def release(self, future):
+        with self.lock:
+            self.pending -= 1
+            self.completed += 1
+        self.slots.release()
+    
+    def run_tasks(self, tasks):
+        """提交一个请求的全部任务 [(函数, 位置参数, 关键字参数), ...] 并等待结果；无法一次取得全部槽位时拒绝整个请求"""
+        acquired = 0
+        for _ in tasks:
+            if not self.slots.acquire(blocking=False):
+                break
+            acquired += 1
+        if acquired < len(tasks):
+            for _ in range(acquired):
+                self.slots.release()
+            with self.lock:
+                self.rejected += 1
+            raise ServiceError(503, "服务繁忙，请稍后重试")
+        
+        futures = []
+        for func, args, kwargs in tasks:
+            with self.lock:
+                self.pending += 1
+            future = self.executor.submit(func, *args, **kwargs)
+            future.add_done_callback(self.release)
+            futures.append(future)
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+def run_service(host='127.0.0.1', port=8765, workers=None, max_pending=None, gauge_length=10.0, verbose=False,
+                yield_method='legacy', time_budget=None, qc=True, preprocess=None):
+    """启动分析服务，Ctrl+C 停止
+
+    yield_method / time_budget / qc / preprocess 为请求未指定时使用的屈服算法、时间预算、质量预检和预处理配置。
+    """
+    if yield_method not in YIELD_METHODS:
+        print(f"未知的屈服算法: {yield_method}（可选: {', '.join(YIELD_METHODS)}）", file=sys.stderr)
+        return 2
+    try:
+        preprocess = normalize_preprocess_spec(preprocess)
+    except ValueError as e:
+        print(f"预处理配置有误: {e}", file=sys.stderr)
+        return 2
+    service = AnalysisService(host, port, workers, max_pending, gauge_length, verbose, yield_method, time_budget,
+                              qc, preprocess)
+    print(f"分析服务已启动: http://{host}:{service.server_address[1]} "
+          f"(进程数 {service.workers}, 最大在途任务 {service.max_pending})")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        print("分析服务已停止")
+    finally:
+        service.server_close()
+    return 0
+
+def _stdout_to_stderr():
+    """工作进程初始化: 诊断输出改到 stderr，保证 stdout 只有 JSON 行"""
+    sys.stdout = sys.stderr
+
+def load_workbook_task(path, trace_memory=False, templates=None):
+    """工作进程中读取工作簿，返回 ({sheet名称: (载荷数组, 位移数组)}, 性能记录, 用到的列映射模板列表,
+    {sheet名称: 表头签名})"""
+    recorder = PerfRecorder(trace_memory)
+    templates = dict(templates or {})
+    mappings = {}
+    sheets = {name: (data['Load_N'].to_numpy(), data['Displacement_mm'].to_numpy())
+              for name, data in read_workbook_sheets(path, recorder, templates, mappings).items()}
+    used = [templates[signature] for signature in set(mappings.values()) if signature in templates]
+    return sheets, recorder.records, used, mappings
+
+def analyze_specimen_task(specimen, gauge_length, offsets=None, total_offsets=None, trace_memory=False,
+                          yield_method='legacy', time_budget=None, qc=True, preprocess=None):
+    """工作进程中计算单个试样，返回 (结果, 性能记录, 计数)"""
+    recorder = PerfRecorder(trace_memory)
+    with recorder.stage('specimen', sheet=specimen[0], rows=len(specimen[1])) as info:
+        results = analyze_specimens_task([specimen], gauge_length, offsets, total_offsets, recorder,
+                                         yield_method, time_budget, qc, preprocess)[0]
+        info['yield_method'] = results['yield_method']
+    return results, recorder.records, recorder.counters
+
+def expand_input_paths(patterns):
+    """展开文件路径和通配符（支持 **），去重并保持顺序"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isfile(path) and path not in paths:
+                paths.append(path)
+    return paths
+
+def run_batch(patterns, area_csvs=(), default_area=None, gauge_length=10.0, workers=None,
+              offsets=None, total_offsets=None, output=None, perf_log=None, trace_memory=False,
+              yield_method='legacy', time_budget=None, qc=True, stats=None, lot_pattern=None, config_db=None,
+              preprocess=None):
+    """命令行批量计算，每完成一个试样向 output 写一行 JSON
+
+    工作簿读取和每个试样的计算都提交到进程池，哪个先完成先输出，顺序不固定。
+    面积优先级: --areas 指定的csv > 工作簿同名csv > --area 统一值。
+    perf_log 给出时，工作进程中测得的各阶段记录逐行写入该文件，结束时在 stderr 输出分阶段汇总。
+    yield_method / time_budget 选择屈服算法及每个试样的时间预算（秒），qc 为假时跳过质量预检。
+    stats 给出时，结束后把成功试样按批号（lot_pattern）或工作簿分组的批次统计写入该csv。
+    config_db 为参数库路径：已保存的列映射模板用于跳过列识别，新识别的布局写回参数库；
+    各试样按内容指纹登记，与已登记试样内容相同或近似的记录带 duplicate_of（首次出现的 工作簿#sheet）
+    和 duplicate_match（'exact' 指纹相同，'similar' 内容近似）；指纹相同且计算条件也相同时
+    直接复用保存的结果（reused 为真），不再提交计算。
+    preprocess 为预处理配置（见 normalize_preprocess_spec），列映射模板自带预处理配置时以模板为准。
+    返回退出码: 0 全部成功，1 有试样失败，2 没有可计算的输入。
+    """
+    started = time.perf_counter()
+    output = output or sys.stdout
+    if yield_method not in YIELD_METHODS:
+        print(f"未知的屈服算法: {yield_method}（可选: {', '.join(YIELD_METHODS)}）", file=sys.stderr)
+        return 2
+    try:
+        preprocess = normalize_preprocess_spec(preprocess)
+    except ValueError as e:
+        print(f"预处理配置有误: {e}", file=sys.stderr)
+        return 2
+    paths = expand_input_paths(patterns)
+    if not paths:
+        print("未找到输入文件", file=sys.stderr)
+        return 2
+    
+    explicit_areas = {}
+    for csv_file_path in area_csvs:
+        explicit_areas.update(read_area_csv(csv_file_path))
+    
+    counts = {'ok': 0, 'error': 0}
+    recorder = PerfRecorder(log_path=perf_log) if perf_log else None
+    collected = []
+    store = ConfigStore(config_db) if config_db else None
+    templates = store.load_templates() if store is not None else {}
+    indexed = {}  # {计算任务: (内容指纹, 结果缓存键)}，完成后把结果写入参数库
+    
+    def emit(record):
+        counts[record['status']] += 1
+        if stats and record['status'] == 'ok':
+            collected.append(batch_statistics_row(record, lot_pattern))
+        output.write(json.dumps(to_json_safe(record), ensure_ascii=False) + '\n')
+        output.flush()
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_stdout_to_stderr) as executor:
+        pending = {executor.submit(load_workbook_task, path, trace_memory, templates): (path, None)
+                   for path in paths}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, sheet_name = pending.pop(future)
+                if sheet_name is None:
+                    try:
+                        sheets, records, used_templates, mappings = future.result()
+                    except Exception as e:
+                        emit({'workbook': path, 'name': None, 'status': 'error',
+                              'error_msg': f"读取工作簿失败: {str(e)}"})
+                        continue
+                    if recorder is not None:
+                        recorder.extend(records, workbook=path)
+                    if store is not None:
+                        store.save_templates([t for t in used_templates if t['signature'] not in templates])
+                        store.record_template_use([t['signature'] for t in used_templates])
+                        templates.update((t['signature'], t) for t in used_templates)
+                    if not sheets:
+                        emit({'workbook': path, 'name': None, 'status': 'error',
+                              'error_msg': "未在任何sheet中找到所需的载荷和引伸计数据列"})
+                        continue
+                    
+                    areas = {}
+                    csv_file_path = area_csv_path(path)
+                    if os.path.exists(csv_file_path):
+                        areas.update(read_area_csv(csv_file_path))
+                    areas.update(explicit_areas)
+                    fingerprint = workbook_fingerprint(path) if store is not None else None
+                    for name, (load, displacement) in sheets.items():
+                        area = areas.get(name, default_area)
+                        if area is None or area <= 0:
+                            emit({'workbook': path, 'name': name, 'status': 'error',
+                                  **empty_results("缺少横截面积")})
+                            continue
+                        template = next((t for t in used_templates if t['signature'] == mappings.get(name)), {})
+                        spec = template.get('preprocess') or preprocess
+                        duplicate = {}
+                        if store is not None:
+                            content_hash = specimen_content_hash(load, displacement)
+                            profile = specimen_profile(load, displacement)
+                            # 指纹只覆盖有效区间，计算条件不含行数和区间位置
+                            key = specimen_result_key(None, area, gauge_length, offsets, total_offsets,
+                                                      yield_method, time_budget, qc, True, None, spec)
+                            entry = store.find_specimens([content_hash]).get(content_hash)
+                            similar = None
+                            if entry is None:
+                                similar = store.find_similar_specimens({content_hash: profile}).get(content_hash)
+                            store.index_specimens([(content_hash, fingerprint, path, name, len(load), profile)])
+                            if entry is not None and (entry['workbook'], entry['sheet']) != (fingerprint, name):
+                                duplicate['duplicate_of'] = f"{entry['path']}#{entry['sheet']}"
+                                duplicate['duplicate_match'] = 'exact'
+                            elif similar is not None and (similar['workbook'], similar['sheet']) != (fingerprint, name):
+                                duplicate['duplicate_of'] = f"{similar['path']}#{similar['sheet']}"
+                                duplicate['duplicate_match'] = 'similar'
+                            # 只有指纹相同的试样复用结果，近似的仍重新计算
+                            if entry is not None and entry['result_key'] == key and entry['results']:
+                                results = {**entry['results'], 'test_range': detect_test_range(load)}
+                                emit({'workbook': path, 'status': 'error' if results['error_msg'] else 'ok',
+                                      **results, 'name': name, **duplicate, 'reused': True})
+                                continue
+                        task = executor.submit(analyze_specimen_task, (name, load, displacement, area),
+                                               gauge_length, offsets, total_offsets, trace_memory,
+                                               yield_method, time_budget, qc, spec)
+                        pending[task] = (path, name)
+                        if store is not None:
+                            indexed[task] = (content_hash, key, duplicate)
+                else:
+                    content_hash, key, duplicate = indexed.pop(future, (None, None, {}))
+                    try:
+                        results, records, counters = future.result()
+                        if recorder is not None:
+                            recorder.extend(records, counters, workbook=path)
+                    except Exception as e:
+                        results = {'name': sheet_name, **empty_results(f"计算失败: {str(e)}")}
+                    else:
+                        if content_hash is not None:
+                            store.store_specimen_results(
+                                [(content_hash, key, {k: v for k, v in results.items() if k != 'name'})])
+                    emit({'workbook': path, 'name': sheet_name, 'status': 'error' if results['error_msg'] else 'ok',
+                          **results, **duplicate})
+    
+    if store is not None:
+        store.close()
+    elapsed = time.perf_counter() - started
+    total = counts['ok'] + counts['error']
+    print(f"完成: {len(paths)} 个工作簿, 成功 {counts['ok']}, 失败 {counts['error']}, "
+          f"用时 {elapsed:.2f} s ({counts['ok'] / elapsed:.1f} 个试样/秒)", file=sys.stderr)
+    if recorder is not None:
+        print_perf_summary(recorder, sys.stderr)
+    if stats and collected:
+        write_batch_statistics(collected, stats)
+    if total == 0:
+        return 2
+    return 0 if counts['error'] == 0 else 1
+
+def batch_statistics_row(record, lot_pattern=None):
+    """批量计算的成功记录 → 批次统计的一行：按批号（lot_pattern）分组，取不到批号时按工作簿分组"""
+    workbook = os.path.splitext(os.path.basename(record['workbook']))[0]
+    return {'group': lot_from_name(record['name'], lot_pattern) or workbook,
+            **{column: record[column] for column, _, _ in LOT_STAT_PROPERTIES}}
+
+def write_batch_statistics(rows, stats):
+    """计算批次统计并写入 stats csv，同时在 stderr 输出"""
+    statistics = compute_lot_statistics(pd.DataFrame(rows), 'group')
+    statistics.rename(columns=LOT_STAT_COLUMNS).to_csv(stats, index=False, encoding='utf-8-sig')
+    print(format_lot_statistics(statistics), file=sys.stderr)
+
+# 共享目录批量队列：queue.json 为计算设置，pending/ 待处理、claimed/ 已认领（文件名带认领标记，
+# 修改时间即心跳）、done/ 已完成、failed/ 多次中断后放弃；results/ 为各工作进程的结果分片，
+# workers/ 为各工作进程的心跳文件，attempts/ 记录各项被认领的次数
+QUEUE_DIRS = ('pending', 'claimed', 'done', 'failed', 'results', 'workers', 'attempts')
+
+def _queue_path(queue_dir, *parts):
+    return os.path.join(queue_dir, *parts)
+
+def _queue_relative_path(queue_dir, path):
+    """工作簿路径尽量保存为相对队列目录的路径，各机器挂载点不同时仍能找到"""
+    path = os.path.abspath(path)
+    try:
+        return os.path.relpath(path, os.path.abspath(queue_dir))
+    except ValueError:  # Windows 下不在同一驱动器
+        return path
+
+def _queue_resolve_path(queue_dir, path):
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(os.path.abspath(queue_dir), path))
+
+def load_queue_settings(queue_dir):
+    """读取队列的计算设置，队列不存在时返回 None"""
+    try:
+        with open(_queue_path(queue_dir, 'queue.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def submit_queue(queue_dir, patterns, area_csvs=(), default_area=None, gauge_length=10.0, offsets=None,
+                 yield_method='legacy', time_budget=None, qc=True, preprocess=None):
+    """创建队列或向已有队列追加工作簿：计算设置写入 queue.json，每个工作簿一个待处理项
+
+    已在队列中（任一状态）的工作簿不重复加入；已有队列的计算设置不同时拒绝追加。
+    返回退出码: 0 成功，2 设置有误、与已有队列不一致或没有输入文件。
+    """
+    if yield_method not in YIELD_METHODS:
+        print(f"未知的屈服算法: {yield_method}（可选: {', '.join(YIELD_METHODS)}）", file=sys.stderr)
+        return 2
+    try:
+        preprocess = normalize_preprocess_spec(preprocess)
+    except ValueError as e:
+        print(f"预处理配置有误: {e}", file=sys.stderr)
+        return 2
+    paths = expand_input_paths(patterns)
+    if not paths:
+        print("未找到输入文件", file=sys.stderr)
+        return 2
+    
+    settings = to_json_safe({
+        'area_csvs': [_queue_relative_path(queue_dir, path) for path in area_csvs],
+        'default_area': default_area,
+        'gauge_length': gauge_length,
+        'offsets': offsets,
+        'yield_method': yield_method,
+        'time_budget': time_budget,
+        'qc': qc,
+        'preprocess': preprocess
+    })
+    for name in QUEUE_DIRS:
+        os.makedirs(_queue_path(queue_dir, name), exist_ok=True)
+    existing = load_queue_settings(queue_dir)
+    if existing is None:
+        temp_path = _queue_path(queue_dir, 'queue.json.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, _queue_path(queue_dir, 'queue.json'))
+    elif existing != settings:
+        print("队列已有不同的计算设置，请使用新的队列目录", file=sys.stderr)
+        return 2
+    
+    known = {name.split('@', 1)[0].split('.', 1)[0]
+             for state in ('pending', 'claimed', 'done', 'failed')
+             for name in os.listdir(_queue_path(queue_dir, state))}
+    added = 0
+    for path in paths:
+        relative = _queue_relative_path(queue_dir, path)
+        item_id = hashlib.sha1(relative.replace(os.sep, '/').encode('utf-8')).hexdigest()[:16]
+        if item_id in known:
+            continue
+        known.add(item_id)
+        temp_path = _queue_path(queue_dir, 'pending', f".{item_id}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'id': item_id, 'path': relative, 'submitted': time.time()}, f, ensure_ascii=False)
+        os.replace(temp_path, _queue_path(queue_dir, 'pending', f"{item_id}.json"))
+        added += 1
+    print(f"已加入 {added} 个工作簿（跳过 {len(paths) - added} 个已在队列中的）: {queue_dir}", file=sys.stderr)
+    return 0
+
+def queue_clock(queue_dir, worker_id):
+    """共享目录所在文件系统的当前时间：更新本进程的心跳文件并读取其修改时间，不依赖各机器的时钟一致"""
+    path = _queue_path(queue_dir, 'workers', worker_id)
+    with open(path, 'a'):
+        pass
+    os.utime(path)
+    return os.stat(path).st_mtime
+
+def claim_queue_item(queue_dir, worker_id):
+    """把一个待处理项改名到 claimed/ 认领，返回认领文件路径；没有可认领的项时返回 None
+
+    改名是原子操作，多个进程（包括其他机器）同时认领同一项时只有一个成功。
+    """
+    pending_dir = _queue_path(queue_dir, 'pending')
+    for name in sorted(os.listdir(pending_dir)):
+        if not name.endswith('.json'):
+            continue
+        claim_path = _queue_path(queue_dir, 'claimed', f"{name[:-5]}@{worker_id}.{time.time_ns():x}")
+        try:
+            os.rename(os.path.join(pending_dir, name), claim_path)
+            # 改名保留原修改时间，立即更新心跳，以免被当作超时的认领回收
+            os.utime(claim_path)
+        except OSError:  # 已被其他进程认领或回收
+            continue
+        return claim_path
+    return None
+
+def recover_stale_claims(queue_dir, stale_after, now):
+    """把心跳超过 stale_after 秒未更新的认领改回待处理，返回回收的项编号列表"""
+    recovered = []
+    claimed_dir = _queue_path(queue_dir, 'claimed')
+    for name in os.listdir(claimed_dir):
+        path = os.path.join(claimed_dir, name)
+        item_id = name.split('@', 1)[0]
+        try:
+            if now - os.stat(path).st_mtime <= stale_after:
+                continue
+            os.rename(path, _queue_path(queue_dir, 'pending', f"{item_id}.json"))
+        except OSError:  # 认领方刚完成，或其他进程已回收
+            continue
+        recovered.append(item_id)
+    return recovered
+
+class QueueHeartbeat(threading.Thread):
+    """处理队列项期间定期更新认领文件的修改时间；认领已被其他进程回收时 lost 为真"""
+    
+    def __init__(self, claim_path, interval):
+        super().__init__(daemon=True)
+        self.claim_path = claim_path
+        self.interval = interval
+        self.lost = False
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                os.utime(self.claim_path)
+            except FileNotFoundError:
+                self.lost = True
+                return
+    
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def process_queue_item(queue_dir, settings, claim_path, worker_id, shard, workers=None, config_db=None,
+                       heartbeat=10.0, max_attempts=3):
+    """处理一个已认领的工作簿，返回写入的记录列表；认领已被回收时返回 None
+
+    读取和计算沿用 run_batch。记录先追加到本进程的结果分片，再把认领改名到 done/ 作为提交，
+    合并时只取提交该项的那次认领写入的记录。同一项被认领超过 max_attempts 次（处理进程多次中断）时放弃，
+    记为失败并移到 failed/。
+    """
+    claim_name = os.path.basename(claim_path)
+    item_id, claim = claim_name.split('@', 1)
+    try:
+        with open(claim_path, encoding='utf-8') as f:
+            item = json.load(f)
+    except FileNotFoundError:
+        return None
+    path = _queue_resolve_path(queue_dir, item['path'])
+    with open(_queue_path(queue_dir, 'attempts', item_id), 'ab') as f:
+        f.write(b'.')
+        attempts = f.tell()
+    
+    target = 'done'
+    if attempts > max_attempts:
+        target = 'failed'
+        records = [{'workbook': path, 'name': None, 'status': 'error',
+                    'error_msg': f"处理已中断 {attempts - 1} 次，放弃该工作簿"}]
+    else:
+        beat = QueueHeartbeat(claim_path, heartbeat)
+        beat.start()
+        buffer = io.StringIO()
+        try:
+            run_batch([glob.escape(path)], [_queue_resolve_path(queue_dir, csv) for csv in settings['area_csvs']],
+                      settings['default_area'], settings['gauge_length'], workers, settings['offsets'],
+                      output=buffer, yield_method=settings['yield_method'], time_budget=settings['time_budget'],
+                      qc=settings['qc'], config_db=config_db, preprocess=settings['preprocess'])
+            records = [json.loads(line) for line in buffer.getvalue().splitlines()]
+        except Exception as e:
+            records = [{'workbook': path, 'name': None, 'status': 'error', 'error_msg': f"处理失败: {str(e)}"}]
+        finally:
+            beat.stop()
+        if not records:
+            records = [{'workbook': path, 'name': None, 'status': 'error', 'error_msg': "未找到工作簿"}]
+        if beat.lost:
+            return None
+    
+    for record in records:
+        shard.write(json.dumps({**record, 'queue_item': item_id, 'worker': worker_id, 'claim': claim},
+                               ensure_ascii=False) + '\n')
+    shard.flush()
+    os.fsync(shard.fileno())
+    try:
+        os.rename(claim_path, _queue_path(queue_dir, target, claim_name))
+    except OSError:  # 处理期间认领超时被回收，结果由重新认领的进程提交
+        return None
+    return records
+
+def run_queue_worker(queue_dir, worker_id=None, workers=None, config_db=None, heartbeat=10.0, stale_after=60.0,
+                     max_attempts=3, wait_for_claims=True):
+    """队列工作进程：回收超时的认领，逐个认领并处理工作簿
+
+    wait_for_claims 为真时待处理项取完后继续等待其他进程手中的项，它们超时被回收时接手处理，队列全部完成才退出；
+    为假时没有待处理项即退出。可在多台机器上同时运行，只需挂载同一队列目录。
+    返回退出码: 0 本进程处理的试样全部成功，1 有失败，2 队列不存在或参数有误。
+    """
+    settings = load_queue_settings(queue_dir)
+    if settings is None:
+        print(f"不是队列目录（缺少 queue.json）: {queue_dir}", file=sys.stderr)
+        return 2
+    if stale_after <= 2 * heartbeat:
+        print("超时时间应大于两倍心跳间隔", file=sys.stderr)
+        return 2
+    worker_id = re.sub(r'[^\w.-]', '_', worker_id or f"{socket.gethostname()}-{os.getpid()}")
+    
+    started = time.perf_counter()
+    counts = {'ok': 0, 'error': 0}
+    items = 0
+    with open(_queue_path(queue_dir, 'results', f"{worker_id}.jsonl"), 'a', encoding='utf-8') as shard:
+        while True:
+            for item_id in recover_stale_claims(queue_dir, stale_after, queue_clock(queue_dir, worker_id)):
+                print(f"[{worker_id}] 回收超时的认领: {item_id}", file=sys.stderr)
+            claim_path = claim_queue_item(queue_dir, worker_id)
+            if claim_path is None:
+                if not wait_for_claims or not os.listdir(_queue_path(queue_dir, 'claimed')):
+                    break
+                time.sleep(heartbeat)
+                continue
+            records = process_queue_item(queue_dir, settings, claim_path, worker_id, shard, workers, config_db,
+                                         heartbeat, max_attempts)
+            if records is None:
+                print(f"[{worker_id}] 认领已被回收，放弃本次结果: {os.path.basename(claim_path)}", file=sys.stderr)
+                continue
+            items += 1
+            for record in records:
+                counts[record['status']] += 1
+    print(f"[{worker_id}] 完成: {items} 个工作簿, 成功 {counts['ok']}, 失败 {counts['error']}, "
+          f"用时 {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 0 if counts['error'] == 0 else 1
+
+def queue_status(queue_dir, file=None):
+    """输出队列各状态的项数和各工作进程最近一次心跳距今的时间，返回 {状态: 项数}"""
+    file = file or sys.stdout
+    counts = {state: sum(1 for name in os.listdir(_queue_path(queue_dir, state)) if not name.startswith('.'))
+              for state in ('pending', 'claimed', 'done', 'failed')}
+    print("  ".join(f"{state}: {count}" for state, count in counts.items()), file=file)
+    probe = f".status-{os.getpid()}"
+    now = queue_clock(queue_dir, probe)
+    os.remove(_queue_path(queue_dir, 'workers', probe))
+    workers_dir = _queue_path(queue_dir, 'workers')
+    for name in sorted(name for name in os.listdir(workers_dir) if not name.startswith('.')):
+        print(f"  {name}: {now - os.stat(os.path.join(workers_dir, name)).st_mtime:.0f} s 前", file=file)
+    return counts
+
+def merge_queue_results(queue_dir, output=None, stats=None, lot_pattern=None):
+    """合并各工作进程的结果分片，每个已完成（或放弃）的项只取提交它的那次认领写入的记录
+
+    中断的进程写了一半的行、被回收的认领写入的记录都会跳过。stats 给出时同 run_batch 写入批次统计。
+    返回退出码: 0 全部完成且成功，1 有失败或未完成的项，2 没有结果。
+    """
+    output = output or sys.stdout
+    committed = {}
+    for state in ('done', 'failed'):
+        for name in os.listdir(_queue_path(queue_dir, state)):
+            item_id, claim = name.split('@', 1)
+            committed[item_id] = claim
+    
+    records = []
+    results_dir = _queue_path(queue_dir, 'results')
+    for name in sorted(os.listdir(results_dir)):
+        if not name.endswith('.jsonl'):
+            continue
+        with open(os.path.join(results_dir, name), encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if committed.get(record.get('queue_item')) == record.pop('claim', None):
+                    records.append(record)
+    records.sort(key=lambda record: (os.path.basename(record['workbook']), str(record['name'])))
+    for record in records:
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+    output.flush()
+    
+    counts = queue_status(queue_dir, sys.stderr)
+    errors = sum(1 for record in records if record['status'] != 'ok')
+    print(f"合并: {len(committed)} 个工作簿, {len(records)} 个试样, 失败 {errors}", file=sys.stderr)
+    if stats:
+        rows = [batch_statistics_row(record, lot_pattern) for record in records if record['status'] == 'ok']
+        if rows:
+            write_batch_statistics(rows, stats)
+    if not records:
+        return 2
+    return 0 if errors == 0 and counts['pending'] == counts['claimed'] == 0 else 1
+
+# 报告曲线的颜色和线型（与界面中的多曲线对比图一致）
+PLOT_COLORS = ['blue', 'green', 'red', 'cyan', 'magenta', 'orange', 'purple', 'brown']
+PLOT_LINESTYLES = ['-', '--', '-.', ':']
+
+def downsample_minmax(x, y, max_points=2000):
+    """绘图用的降采样：按点序分桶，每桶保留 y 最小和最大的点（保持先后顺序），峰值和断裂骤降不会丢失
+
+    点数不超过 max_points 时原样返回。
+    """
+    n = len(x)
+    buckets = max_points // 2
+    if n <= max_points or buckets < 1:
+        return x, y
+    size = -(-n // buckets)
+    full = n // size * size
+    blocks = np.asarray(y[:full]).reshape(-1, size)
+    starts = np.arange(0, full, size)
+    indices = [starts + blocks.argmin(axis=1), starts + blocks.argmax(axis=1), [0, n - 1]]
+    if full < n:
+        tail = np.asarray(y[full:])
+        indices.append([full + int(tail.argmin()), full + int(tail.argmax())])
+    keep = np.unique(np.concatenate(indices))
+    return x[keep], y[keep]
+
+def predict_next_sheets(sheet_names, current, previous=None, skip=(), count=3):
+    """预测接下来可能查看的sheet：先沿上次切换方向的下一个，再取反方向的，之后按距离取其余sheet
+
+    skip 中的sheet（结果已缓存）不再返回。
+    """
+    names = list(sheet_names)
+    if current not in names:
+        return [name for name in names if name not in skip][:count]
+    i = names.index(current)
+    step = -1 if previous in names and names.index(previous) > i else 1
+    order = [i + step, i - step] + sorted(range(len(names)), key=lambda j: (abs(j - i), (j - i) * step < 0))
+    predicted = []
+    for j in order:
+        if 0 <= j < len(names) and j != i and names[j] not in skip and names[j] not in predicted:
+            predicted.append(names[j])
+            if len(predicted) >= count:
+                break
+    return predicted
+
+class SheetPrefetcher(threading.Thread):
+    """空闲时在后台执行预取任务的工作线程
+
+    schedule() 用新的一批任务替换尚未执行的任务；最近一次 schedule 之后 idle_delay 秒内没有新请求
+    才开始执行，连续切换sheet时不与界面抢占。任务为 (名称, 可调用对象)，返回值以 (名称, 返回值)
+    放入 results 队列，由界面线程取走。
+    """
+    
+    def __init__(self, idle_delay=0.2):
+        super().__init__(daemon=True)
+        self.idle_delay = idle_delay
+        self.results = queue.Queue()
+        self._lock = threading.Lock()
+        self._jobs = []
+        self._scheduled = 0.0
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._running = threading.Lock()  # 执行任务期间持有，drain() 借此等待当前任务结束
+    
+    def schedule(self, jobs):
+        with self._lock:
+            self._jobs = list(jobs)
+            self._scheduled = time.monotonic()
+        self._wakeup.set()
+    
+    def stop(self):
+        self._stop_event.set()
+        self._wakeup.set()
+    
+    def drain(self):
+        """丢弃尚未执行的任务和尚未取走的结果，等正在执行的任务结束后返回"""
+        with self._lock:
+            self._jobs = []
+        with self._running:
+            pass
+        while True:
+            try:
+                self.results.get_nowait()
+            except queue.Empty:
+                return
+    
+    def run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait()
+            with self._lock:
+                delay = self._scheduled + self.idle_delay - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+            with self._running:
+                with self._lock:
+                    if not self._jobs:
+                        self._wakeup.clear()
+                        continue
+                    name, job = self._jobs.pop(0)
+                try:
+                    self.results.put((name, job()))
+                except Exception as e:
+                    print(f"预取 '{name}' 失败: {e}")
+
+class CurveIndex:
+    """曲线点的查找索引：应变取累积最大值后单调，按应变二分查找 (O(log n))，再在附近几个点中取最近点
+
+    建立索引只需一次 O(n) 的累积最大值，之后每次查找与曲线点数基本无关，适合百万点曲线上的光标跟随。
+    """
+    
+    def __init__(self, x, y, window=8):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.sorted_x = np.fmax.accumulate(self.x)
+        self.window = window
+    
+    def __len__(self):
+        return len(self.x)
+    
+    def nearest(self, x, y=None, x_scale=1.0, y_scale=1.0, stop=None):
+        """返回离 (x, y) 最近的点的索引；y 为 None 时只按 x 查找
+        
+        x_scale / y_scale 为两个方向的归一化尺度（通常取坐标轴范围），stop 限制只在前 stop 个点中查找。
+        """
+        stop = len(self.x) if stop is None else min(stop, len(self.x))
+        if stop <= 0:
+            return None
+        i = int(np.searchsorted(self.sorted_x[:stop], x))
+        lo, hi = max(i - self.window, 0), min(i + self.window + 1, stop)
+        dx = (self.x[lo:hi] - x) / x_scale
+        distance = dx * dx
+        if y is not None:
+            dy = (self.y[lo:hi] - y) / y_scale
+            distance = distance + dy * dy
+        distance = np.where(np.isnan(distance), np.inf, distance)
+        return lo + int(np.argmin(distance))
+
+def locate_yield_marker(strain, stress, yield_strain, yield_strength, index=None):
+    """在最大应力点之前的曲线上找到离计算屈服点最近的数据点，返回其索引
+
+    按应变二分查找（见 CurveIndex），不再对每个数据点计算距离；index 可传入已建立的 CurveIndex。
+    """
+    max_stress_idx = int(np.argmax(stress))
+    if index is None:
+        index = CurveIndex(strain[:max_stress_idx + 1], stress[:max_stress_idx + 1])
+    return index.nearest(yield_strain, yield_strength, stop=max_stress_idx + 1)
+
+class CurveCursor:
+    """图上的十字光标：鼠标移动时吸附到最近的曲线点并显示应变/应力/载荷，左键单击拾取该点
+
+    曲线查找用 CurveIndex；光标为 animated 图元，背景在每次完整重绘后缓存，鼠标移动时只恢复背景
+    并重画光标（blit），不重绘曲线，也不会出现在保存的图中。鼠标事件合并到每 interval 毫秒最多处理一次。
+    on_hover 给出时读数交给它显示（如界面上的标签），图中只画十字线，省去每帧的文字渲染。
+    每次重新绘图 (ax.clear) 后需调用 reset()。
+    """
+    
+    def __init__(self, canvas, ax, on_pick=None, on_hover=None, interval=16):
+        self.canvas = canvas
+        self.ax = ax
+        self.on_pick = on_pick
+        self.on_hover = on_hover
+        self.pending_event = None
+        self.current = None
+        self.timer = canvas.new_timer(interval=interval)
+        self.timer.single_shot = True
+        self.timer.add_callback(self.update)
+        self.curves = []  # {'legend': 图例文本, 'index': CurveIndex, 'load': 载荷数组或 None, ...}
+        self.background = None
+        self.artists = []
+        canvas.mpl_connect('draw_event', self.on_draw)
+        canvas.mpl_connect('motion_notify_event', self.on_move)
+        canvas.mpl_connect('button_press_event', self.on_click)
+        self.reset()
+    
+    def reset(self):
+        """清空曲线并重新创建光标图元（ax.clear() 会移除之前的图元）"""
+        self.curves = []
+        self.background = None
+        self.current = None
+        style = dict(color='gray', linewidth=0.8, linestyle='--', animated=True, label='_cursor')
+        self.vline = self.ax.axvline(0.0, **style)
+        self.hline = self.ax.axhline(0.0, **style)
+        self.point, = self.ax.plot([], [], 'o', color='black', markersize=6, animated=True, label='_cursor')
+        self.label = self.ax.annotate('', xy=(0, 0), xytext=(12, 12), textcoords='offset points', fontsize=10,
+                                      bbox=dict(boxstyle='round', facecolor='white', alpha=0.85), animated=True)
+        self.artists = [self.vline, self.hline, self.point]
+        if self.on_hover is None:
+            self.artists.append(self.label)
+        for artist in self.artists:
+            artist.set_visible(False)
+    
+    def add_curve(self, legend_text, x, y, load=None, x_label='应变', y_label='应力 (MPa)', row_offset=0,
+                  rows=None):
+        """登记一条可被光标吸附的曲线，返回其 CurveIndex；row_offset 为 x[0] 在原始数据中的行号，
+        预处理去掉过点时 rows 给出各点相对 row_offset 的位置"""
+        index = CurveIndex(x, y)
+        self.curves.append({'legend': legend_text, 'index': index, 'load': load,
+                            'x_label': x_label, 'y_label': y_label, 'row_offset': row_offset, 'rows': rows})
+        return index
+    
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+    
+    def find(self, x, y):
+        """在所有曲线中找离 (x, y) 最近的点（按坐标轴范围归一化），返回 (曲线序号, 点索引)"""
+        x_low, x_high = self.ax.get_xlim()
+        y_low, y_high = self.ax.get_ylim()
+        x_scale, y_scale = abs(x_high - x_low) or 1.0, abs(y_high - y_low) or 1.0
+        best = None
+        for k, curve in enumerate(self.curves):
+            index = curve['index']
+            i = index.nearest(x, y, x_scale, y_scale)
+            if i is None:
+                continue
+            distance = ((index.x[i] - x) / x_scale) ** 2 + ((index.y[i] - y) / y_scale) ** 2
+            if best is None or distance < best[0]:
+                best = (distance, k, i)
+        return best[1:] if best else None
+    
+    def describe(self, k, i):
+        curve = self.curves[k]
+        index = curve['index']
+        text = f"{curve['legend']}\n{curve['x_label']}: {index.x[i]:.5g}\n{curve['y_label']}: {index.y[i]:.5g}"
+        if curve['load'] is not None:
+            text += f"\n载荷 (N): {curve['load'][i]:.5g}"
+        return text
+    
+    def blit(self):
+        if self.background is None:
+            return
+        self.canvas.restore_region(self.background)
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.ax.bbox)
+    
+    def on_move(self, event):
+        # 只记下最新的事件，由定时器统一处理
+        if self.pending_event is None:
+            self.timer.start()
+        self.pending_event = event
+    
+    def update(self):
+        event, self.pending_event = self.pending_event, None
+        if event is None:
+            return
+        found = self.find(event.xdata, event.ydata) if event.inaxes is self.ax and self.curves else None
+        if found == self.current:
+            return
+        self.current = found
+        if found is None:
+            for artist in self.artists:
+                artist.set_visible(False)
+            self.blit()
+            if self.on_hover is not None:
+                self.on_hover('')
+            return
+        k, i = found
+        index = self.curves[k]['index']
+        x, y = index.x[i], index.y[i]
+        self.vline.set_xdata([x, x])
+        self.hline.set_ydata([y, y])
+        self.point.set_data([x], [y])
+        text = self.describe(k, i)
+        self.label.xy = (x, y)
+        self.label.set_text(text)
+        for artist in self.artists:
+            artist.set_visible(True)
+        self.blit()
+        if self.on_hover is not None:
+            self.on_hover(text)
+    
+    def on_click(self, event):
+        if event.button != 1 or event.inaxes is not self.ax or not self.curves:
+            return
+        found = self.find(event.xdata, event.ydata)
+        if found is None:
+            return
+        k, i = found
+        curve = self.curves[k]
+        index = curve['index']
+        self.ax.plot(index.x[i], index.y[i], 'kx', markersize=10, markeredgewidth=2, label='_picked')
+        self.canvas.draw_idle()
+        if self.on_pick is not None:
+            row = curve['rows'][i] if curve['rows'] is not None else i
+            self.on_pick(curve, curve['row_offset'] + int(row), self.describe(k, i))
+
+def safe_file_name(name):
+    """去掉文件名中不允许的字符"""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(name)).strip('_') or 'sheet'
+
+def _new_report_figure():
+    """不经过 pyplot 直接创建 Agg 画布的图形，工作进程中用完即释放"""
+    fig = Figure(figsize=(10, 7))
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot(111)
+
+def _finish_report_axes(ax, legend_fontsize):
+    ax.set_xlabel('应变', fontsize=14)
+    ax.set_ylabel('应力 (MPa)', fontsize=14)
+    ax.tick_params(axis='both', which='major', labelsize=12)
+    ax.grid(True, alpha=0.3, linestyle='--')
+    ax.legend(loc='best', fontsize=legend_fontsize)
+
+def _save_report_figure(fig, base_path, formats, dpi, rasterized):
+    """按格式保存图形；rasterized 时 PDF/SVG 中的曲线以 dpi 栅格化，坐标轴和文字仍为矢量"""
+    fig.tight_layout()
+    if rasterized:
+        for ax in fig.axes:
+            for line in ax.get_lines():
+                line.set_rasterized(True)
+    paths = []
+    for fmt in formats:
+        path = f"{base_path}.{fmt}"
+        fig.savefig(path, dpi=dpi, bbox_inches='tight', facecolor='white', edgecolor='none')
+        paths.append(path)
+    return paths
+
+def render_specimen_figure(base_path, legend_text, load, displacement, cross_sectional_area, gauge_length,
+                           yield_point=None, formats=('png',), dpi=200, rasterized=False):
+    """工作进程中绘制单个试样的应力-应变曲线（标注抗拉强度和屈服强度），返回文件路径列表
+
+    yield_point 为计算结果中的 (屈服强度, 屈服应变)，只负责标注，不在这里重新计算；为 None 时不标屈服点。
+    """
+    stress = np.asarray(load, dtype=float) / cross_sectional_area
+    strain = np.asarray(displacement, dtype=float) / gauge_length
+    fig, ax = _new_report_figure()
+    ax.plot(strain, stress, 'b-', linewidth=2.5, label=legend_text)
+    
+    max_stress_idx = np.argmax(stress)
+    ax.plot(strain[max_stress_idx], stress[max_stress_idx], 'ro',
+            markersize=10, label=f'抗拉强度: {stress[max_stress_idx]:.1f} MPa')
+    
+    yield_strength, yield_strain = yield_point or (None, None)
+    if yield_strength and yield_strain:
+        idx = locate_yield_marker(strain, stress, yield_strain, yield_strength)
+        ax.plot(strain[idx], stress[idx], 'go', markersize=10, label=f'屈服强度: {yield_strength:.1f} MPa')
+    
+    _finish_report_axes(ax, 12)
+    return _save_report_figure(fig, base_path, formats, dpi, rasterized)
+
+def render_overlay_figure(base_path, curves, formats=('png',), dpi=200, rasterized=False):
+    """工作进程中绘制多条曲线对比图，curves 为 (图例文本, 应变, 应力) 列表"""
+    fig, ax = _new_report_figure()
+    for i, (legend_text, strain, stress) in enumerate(curves):
+        ax.plot(strain, stress, color=PLOT_COLORS[i % len(PLOT_COLORS)],
+                linestyle=PLOT_LINESTYLES[(i // len(PLOT_COLORS)) % len(PLOT_LINESTYLES)],
+                linewidth=2, label=legend_text, alpha=0.8)
+    _finish_report_axes(ax, 11)
+    return _save_report_figure(fig, base_path, formats, dpi, rasterized)
+
+def assemble_pdf_report(image_paths, pdf_path):
+    """将各页PNG依次放入多页PDF，每次只载入一页图像"""
+    with PdfPages(pdf_path) as pdf:
+        for image_path in image_paths:
+            image = plt.imread(image_path)
+            height, width = image.shape[:2]
+            fig = Figure(figsize=(10, 10 * height / width))
+            FigureCanvasAgg(fig)
+            ax = fig.add_axes([0, 0, 1, 1])
+            ax.imshow(image, interpolation='none')
+            ax.axis('off')
+            pdf.savefig(fig)
+            del image, fig
+    return pdf_path
+
+def render_report(specimens, output_dir, gauge_length, legend_texts=None, formats=('png',), dpi=200,
+                  rasterized=False, pdf_path=None, workers=None, results=None, trim=True):
+    """批量生成报告图: 每个试样一张图，外加一张全部曲线对比图
+
+    specimens 为 (名称, 载荷数组, 位移数组, 横截面积) 的序列，trim 为真时只绘制试验有效区间
+    （只有区间内的数据传给工作进程）。results 为 {名称: 结果字典}，图中的屈服点取自其中的
+    yield_strength/yield_strain，与结果表一致；没有结果或未通过质量预检（qc_flags 非空）的试样
+    不标屈服点。各图在进程池中用 Agg 独立渲染，
+    同一时刻内存中只有工作进程数张图；pdf_path 给出时把各页PNG按顺序合成多页PDF。
+    返回 {名称: [文件路径...]}，对比图的名称为 '全部曲线'。
+    """
+    legend_texts = legend_texts or {}
+    results = results or {}
+    formats = list(formats)
+    if pdf_path and 'png' not in formats:
+        formats.append('png')
+    os.makedirs(output_dir, exist_ok=True)
+    
+    curves = []
+    jobs = []
+    for i, (name, load, displacement, area) in enumerate(specimens):
+        if trim:
+            load, displacement, _ = trim_test_range(load, displacement)
+        legend_text = legend_texts.get(name, name)
+        curves.append((legend_text, np.asarray(displacement, dtype=float) / gauge_length,
+                       np.asarray(load, dtype=float) / area))
+        base_path = os.path.join(output_dir, f"{i + 1:03d}_{safe_file_name(name)}")
+        result = results.get(name) or {}
+        yield_point = None if result.get('qc_flags') else (result.get('yield_strength'), result.get('yield_strain'))
+        jobs.append((name, render_specimen_figure,
+                     (base_path, legend_text, load, displacement, area, gauge_length, yield_point,
+                      formats, dpi, rasterized)))
+    overlay_path = os.path.join(output_dir, "000_全部曲线")
+    jobs.insert(0, ('全部曲线', render_overlay_figure, (overlay_path, curves, formats, dpi, rasterized)))
+    
+    outputs = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(name, executor.submit(func, *args)) for name, func, args in jobs]
+        for name, future in futures:
+            try:
+                outputs[name] = future.result()
+            except Exception as e:
+                print(f"绘制 '{name}' 失败: {e}")
+                outputs[name] = []
+    
+    if pdf_path:
+        pages = [path for paths in outputs.values() for path in paths if path.endswith('.png')]
+        assemble_pdf_report(pages, pdf_path)
+    return outputs
+
+def run_report(patterns, output_dir, area_csvs=(), default_area=None, gauge_length=10.0, formats=('png',),
+               dpi=200, rasterized=False, pdf=False, workers=None):
+    """命令行生成报告图，每个工作簿输出到 output_dir 下的同名子目录"""
+    paths = expand_input_paths(patterns)
+    if not paths:
+        print("未找到输入文件", file=sys.stderr)
+        return 2
+    
+    explicit_areas = {}
+    for csv_file_path in area_csvs:
+        explicit_areas.update(read_area_csv(csv_file_path))
+    
+    started = time.perf_counter()
+    for path in paths:
+        areas = read_area_csv(area_csv_path(path)) if os.path.exists(area_csv_path(path)) else {}
+        areas.update(explicit_areas)
+        specimens = []
+        for name, data in read_workbook_sheets(path).items():
+            area = areas.get(name, default_area)
+            if area is None:
+                print(f"Sheet '{name}': 缺少横截面积，已跳过")
+                continue
+            specimens.append((name, data['Load_N'].to_numpy(), data['Displacement_mm'].to_numpy(), area))
+        if not specimens:
+            continue
+        
+        stem = os.path.splitext(os.path.basename(path))[0]
+        report_dir = os.path.join(output_dir, safe_file_name(stem))
+        pdf_path = os.path.join(output_dir, f"{safe_file_name(stem)}.pdf") if pdf else None
+        results = dict(iter_batch_results(compute_batch_properties(specimens, gauge_length)))
+        render_report(specimens, report_dir, gauge_length, formats=formats, dpi=dpi,
+                      rasterized=rasterized, pdf_path=pdf_path, workers=workers, results=results)
+        print(f"{path}: 已生成 {len(specimens) + 1} 张图 -> {report_dir}")
+    print(f"报告生成用时 {time.perf_counter() - started:.2f} s")
+    return 0
+
+# 基准测试规模: (每个sheet的点数, sheet数)。xlsx 单个sheet最多约 100 万行，
+# 超过 BENCH_MAX_XLSX_ROWS 的规模只测内存中的计算和绘图，跳过读取和导出
+BENCH_SUITES = {
+    'smoke': [(1000, 1), (10000, 10)],
+    'standard': [(1000, 1), (10000, 10), (100000, 10), (1000, 500)],
+    'full': [(1000, 1), (10000, 10), (100000, 50), (1000, 500), (10000, 500), (1000000, 1), (10000000, 1)]
+}
+BENCH_MAX_XLSX_ROWS = 1000000
+
+def generate_bench_specimens(n_points, n_sheets, seed=0):
+    """生成一组材料参数和缺陷各不相同的合成试样 [(名称, DataFrame, 面积), ...]
+
+    参数在铍铜常见范围内随机取值；约三分之一带断裂骤降，五分之一带预加载，十分之一带引伸计打滑。
+    """
+    rng = np.random.default_rng(seed)
+    specimens = []
+    for i in range(n_sheets):
+        yield_strength = rng.uniform(400, 900)
+        fracture_strain = rng.uniform(0.1, 0.3)
+        area = rng.uniform(1.5, 4.0)
+        data = generate_synthetic_curve(
+            n_points=n_points,
+            modulus=rng.uniform(115000, 135000),
+            yield_strength=yield_strength,
+            tensile_strength=yield_strength * rng.uniform(1.05, 1.3),
+            uniform_strain=fracture_strain * rng.uniform(0.4, 0.7),
+            fracture_strain=fracture_strain,
+            noise=rng.uniform(0.2, 2.0),
+            cross_sectional_area=area,
+            seed=int(rng.integers(1 << 31)),
+            hardening_exponent=rng.uniform(0.2, 0.6),
+            necking_drop=rng.uniform(0.1, 0.4),
+            fracture_points=min(n_points // 100, 20) if i % 3 == 0 else 0,
+            preload=rng.uniform(5, 30) if i % 5 == 0 else 0.0,
+            slip_strain=fracture_strain * 0.5 if i % 10 == 0 else None,
+            slip_size=0.005
+        )
+        specimens.append((f"试样{i + 1}", data, area))
+    return specimens
+
+def _best_time(func, repeat):
+    """运行 repeat 次取最短耗时，返回 (秒, 最后一次的返回值)"""
+    best = float('inf')
+    result = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def run_benchmark_case(n_points, n_sheets, work_dir, repeat=3, seed=0, dpi=100):
+    """对一个规模计时: 读取 (ingest)、屈服强度 (yield, 逐个试样)、批量内核 (batch)、绘图 (plot)、导出 (export)"""
+    specimens = generate_bench_specimens(n_points, n_sheets, seed)
+    rows = n_points * n_sheets
+    timings = {}
+    gauge_length = 10.0
+    
+    if n_points <= BENCH_MAX_XLSX_ROWS:
+        # 按示例表格的列名写入工作簿（不计时）
+        workbook_path = os.path.join(work_dir, f"bench_{n_points}_{n_sheets}.xlsx")
+        with pd.ExcelWriter(workbook_path, engine='openpyxl') as writer:
+            for name, data, _ in specimens:
+                data.rename(columns={'Load_N': '载荷(N)', 'Displacement_mm': '引伸计(mm)'}).to_excel(
+                    writer, sheet_name=name, index=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings['ingest'], _ = _best_time(lambda: read_workbook_sheets(workbook_path), repeat)
+    
+    curves = [(data['Load_N'].to_numpy() / area, data['Displacement_mm'].to_numpy() / gauge_length)
+              for _, data, area in specimens]
+    
+    # 与界面中 calculate_yield_strength_robust 相同的调用
+    timings['yield'], _ = _best_time(
+        lambda: [calculate_proof_strengths(stress, strain, offsets=[0.002], total_offsets=[])
+                 for stress, strain in curves], repeat)
+    
+    batch_input = [(name, data['Load_N'].to_numpy(), data['Displacement_mm'].to_numpy(), area)
+                   for name, data, area in specimens]
+    timings['batch'], table = _best_time(lambda: compute_batch_properties(batch_input, gauge_length), repeat)
+    
+    plot_base = os.path.join(work_dir, 'bench_plot')
+    timings['plot'], _ = _best_time(
+        lambda: render_overlay_figure(plot_base, [(name, strain, stress) for (name, _, _), (stress, strain)
+                                                  in zip(specimens, curves)], dpi=dpi), repeat)
+    
+    if n_points <= BENCH_MAX_XLSX_ROWS:
+        export_path = os.path.join(work_dir, 'bench_export.xlsx')
+        
+        def export():
+            # 与"导出所有结果"相同: 结果汇总加每个sheet前1000行原始数据
+            with pd.ExcelWriter(export_path, engine='openpyxl') as writer:
+                table.to_excel(writer, sheet_name='计算结果汇总', index=False)
+                for name, data, _ in specimens:
+                    data.head(1000).to_excel(writer, sheet_name=f'{name[:30]}_原始数据', index=False)
+        
+        timings['export'], _ = _best_time(export, repeat)
+    
+    return {
+        'points': n_points,
+        'sheets': n_sheets,
+        'rows': rows,
+        'seconds': {stage: round(value, 6) for stage, value in timings.items()},
+        'rows_per_s': {stage: round(rows / value, 1) for stage, value in timings.items() if value > 0}
+    }
+
+def compare_with_baseline(report, baseline, tolerance=0.25, min_delta=0.005):
+    """与基线比较，耗时增加超过 tolerance 且绝对增加超过 min_delta 秒的记为回归
+
+    返回 [(规模, 阶段, 基线秒, 当前秒, 比值, 是否回归), ...]
+    """
+    comparisons = []
+    for case, result in report['cases'].items():
+        reference = baseline.get('cases', {}).get(case)
+        if reference is None:
+            continue
+        for stage, seconds in result['seconds'].items():
+            base_seconds = reference['seconds'].get(stage)
+            if not base_seconds:
+                continue
+            ratio = seconds / base_seconds
+            regressed = ratio > 1 + tolerance and seconds - base_seconds > min_delta
+            comparisons.append((case, stage, base_seconds, seconds, ratio, regressed))
+    return comparisons
+
+def run_benchmarks(suite='smoke', repeat=3, seed=0, output=None, baseline=None, save_baseline=None,
+                   tolerance=0.25):
+    """运行基准测试并与基线比较；有回归时返回 1，否则返回 0"""
+    cases = BENCH_SUITES[suite]
+    report = {
+        'suite': suite,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'seed': seed,
+        'cases': {}
+    }
+    
+    with tempfile.TemporaryDirectory() as work_dir, warnings.catch_warnings():
+        # 缺少中文字体时 matplotlib 对每个字形都会告警，基准测试中忽略
+        warnings.simplefilter('ignore', UserWarning)
+        for n_points, n_sheets in cases:
+            case = f"{n_points}x{n_sheets}"
+            print(f"运行 {case} ...", file=sys.stderr)
+            result = run_benchmark_case(n_points, n_sheets, work_dir, repeat, seed)
+            report['cases'][case] = result
+            print("  " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in result['seconds'].items()),
+                  file=sys.stderr)
+    
+    for path in (output, save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    if not baseline:
+        return 0
+    with open(baseline, 'r', encoding='utf-8') as f:
+        comparisons = compare_with_baseline(report, json.load(f), tolerance)
+    
+    print(f"{'规模':<14}{'阶段':<8}{'基线(s)':>10}{'当前(s)':>10}{'比值':>8}", file=sys.stderr)
+    regressions = 0
+    for case, stage, base_seconds, seconds, ratio, regressed in comparisons:
+        flag = "  <-- 回归" if regressed else ""
+        regressions += regressed
+        print(f"{case:<14}{stage:<8}{base_seconds:>10.3f}{seconds:>10.3f}{ratio:>8.2f}{flag}", file=sys.stderr)
+    if regressions:
+        print(f"发现 {regressions} 项性能回归（容差 {tolerance:.0%}）", file=sys.stderr)
+        return 1
+    print("未发现性能回归", file=sys.stderr)
+    return 0
+
+def legacy_yield(stress, strain):
+    """当前算法（与 calculate_yield_strength_robust 相同），返回 (Rp0.2, 对应应变, 求出的步骤)"""
+    results, elastic_fit = analyze_proof_strengths(stress, strain, offsets=[0.002], total_offsets=[])
+    strength, strain_at = results['Rp0.2']
+    return strength, strain_at, elastic_fit['methods'].get('Rp0.2', '')
+
+def batch_kernel_yield(stress, strain):
+    """批量内核计算单条曲线的 Rp0.2（面积和标距取 1，直接输入应力和应变）"""
+    table = compute_batch_properties([('curve', stress, strain, 1.0)], 1.0, offsets=[0.002], total_offsets=[])
+    return table['Rp0.2'][0], None, table['yield_method'][0]
+
+def registered_yield(name, stress, strain):
+    """用注册表中的屈服算法计算单条曲线的 Rp0.2"""
+    results, elastic_fit = run_yield_method(name, stress, strain, offsets=[0.002], total_offsets=[])
+    strength, strain_at = results['Rp0.2']
+    return strength, strain_at, elastic_fit['methods'].get('Rp0.2', '')
+
+# compare 中可直接用名称指定的算法（YIELD_METHODS 中的名称也可以使用）
+YIELD_CANDIDATES = {
+    'legacy': legacy_yield,
+    'batch': batch_kernel_yield
+}
+
+@functools.lru_cache(maxsize=None)
+def resolve_yield_function(spec):
+    """按名称或 "模块:函数" / "文件.py:函数" 取得屈服强度算法
+
+    函数签名为 f(stress, strain)，返回 Rp0.2、(Rp0.2, 应变) 或 (Rp0.2, 应变, 方法名)，也可以返回
+    calculate_proof_strengths 形式的字典。
+    """
+    if spec in YIELD_CANDIDATES:
+        return YIELD_CANDIDATES[spec]
+    if spec in YIELD_METHODS:
+        return functools.partial(registered_yield, spec)
+    module_name, sep, function_name = spec.rpartition(':')
+    if not sep or not module_name:
+        raise ValueError(f"无法识别的算法: {spec}（应为已注册名称或 模块:函数）")
+    if module_name.endswith('.py'):
+        import importlib.util
+        module_spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(module_name))[0],
+                                                             module_name)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        import importlib
+        module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
+def _normalize_yield_output(value):
+    """把各种返回形式统一为 (强度, 应变, 方法名)，无结果时强度为 None"""
+    if isinstance(value, dict):
+        value = value.get('Rp0.2', (None, None))
+    if not isinstance(value, (tuple, list)):
+        value = (value,)
+    strength = value[0] if len(value) > 0 else None
+    strain_at = value[1] if len(value) > 1 else None
+    method = value[2] if len(value) > 2 else ''
+    if strength is not None and not np.isfinite(strength):
+        strength = None
+    return strength, strain_at, method or ''
+
+def compare_yield_task(specimens, reference, candidate, abs_tol, rel_tol, repeat):
+    """工作进程中对一组曲线运行两种算法并比较，返回每条曲线一行的结果"""
+    reference_func = resolve_yield_function(reference)
+    candidate_func = resolve_yield_function(candidate)
+    rows = []
+    for name, source, stress, strain in specimens:
+        row = {'name': name, 'source': source, 'points': len(stress)}
+        outputs = {}
+        for key, func in (('reference', reference_func), ('candidate', candidate_func)):
+            try:
+                seconds, value = _best_time(lambda: func(stress, strain), repeat)
+                outputs[key] = _normalize_yield_output(value)
+                row[f'{key}_ms'] = seconds * 1000
+                row[f'{key}_error'] = ''
+            except Exception as e:
+                outputs[key] = (None, None, '')
+                row[f'{key}_ms'] = None
+                row[f'{key}_error'] = str(e)
+        ref_value, _, ref_method = outputs['reference']
+        cand_value, _, cand_method = outputs['candidate']
+        row.update({
+            'reference_rp02': ref_value,
+            'candidate_rp02': cand_value,
+            'reference_method': ref_method,
+            'candidate_method': cand_method
+        })
+        if ref_value is None or cand_value is None:
+            row['abs_diff'] = None
+            row['rel_diff'] = None
+            row['match'] = ref_value is None and cand_value is None
+        else:
+            diff = abs(cand_value - ref_value)
+            row['abs_diff'] = diff
+            row['rel_diff'] = diff / abs(ref_value) if ref_value else None
+            row['match'] = diff <= max(abs_tol, rel_tol * abs(ref_value))
+        if row['reference_ms'] and row['candidate_ms']:
+            row['speedup'] = row['reference_ms'] / row['candidate_ms']
+        else:
+            row['speedup'] = None
+        rows.append(row)
+    return rows
+
+def build_comparison_corpus(patterns=(), area_csvs=(), default_area=None, gauge_length=10.0,
+                            synthetic=0, synthetic_points=5000, seed=0):
+    """组装比较用曲线 [(名称, 来源, 应力, 应变), ...]: 工作簿中的真实曲线加合成曲线"""
+    corpus = []
+    explicit_areas = {}
+    for csv_file_path in area_csvs:
+        explicit_areas.update(read_area_csv(csv_file_path))
+    for path in expand_input_paths(patterns):
+        areas = read_area_csv(area_csv_path(path)) if os.path.exists(area_csv_path(path)) else {}
+        areas.update(explicit_areas)
+        with contextlib.redirect_stdout(io.StringIO()):
+            sheets = read_workbook_sheets(path)
+        for name, data in sheets.items():
+            area = areas.get(name, default_area)
+            if area is None:
+                print(f"{path} / {name}: 缺少横截面积，已跳过", file=sys.stderr)
+                continue
+            corpus.append((name, os.path.basename(path), data['Load_N'].to_numpy() / area,
+                           data['Displacement_mm'].to_numpy() / gauge_length))
+    for name, data, area in generate_bench_specimens(synthetic_points, synthetic, seed):
+        corpus.append((name, 'synthetic', data['Load_N'].to_numpy() / area,
+                       data['Displacement_mm'].to_numpy() / 10.0))
+    return corpus
+
+def run_yield_comparison(corpus, reference='legacy', candidate='batch', abs_tol=0.5, rel_tol=1e-3,
+                         repeat=3, workers=None, chunk_size=8):
+    """并行比较两种屈服强度算法，返回按输入顺序排列的逐曲线结果表 (DataFrame)"""
+    # 先在主进程中解析一次，算法名称写错时立即报错
+    resolve_yield_function(reference)
+    resolve_yield_function(candidate)
+    chunks = [corpus[i:i + chunk_size] for i in range(0, len(corpus), chunk_size)]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_rows in executor.map(compare_yield_task, chunks, itertools.repeat(reference),
+                                       itertools.repeat(candidate), itertools.repeat(abs_tol),
+                                       itertools.repeat(rel_tol), itertools.repeat(repeat)):
+            rows.extend(chunk_rows)
+    return pd.DataFrame(rows)
+
+def run_compare(patterns, reference='legacy', candidate='batch', area_csvs=(), default_area=None,
+                gauge_length=10.0, synthetic=0, synthetic_points=5000, seed=0, abs_tol=0.5, rel_tol=1e-3,
+                repeat=3, workers=None, output=None):
+    """compare 子命令: 输出逐曲线速度/精度表和汇总；有超出容差的曲线时返回 1"""
+    corpus = build_comparison_corpus(patterns, area_csvs, default_area, gauge_length,
+                                     synthetic, synthetic_points, seed)
+    if not corpus:
+        print("没有可比较的曲线（指定工作簿或 --synthetic 数量）", file=sys.stderr)
+        return 2
+    
+    table = run_yield_comparison(corpus, reference, candidate, abs_tol, rel_tol, repeat, workers)
+    if output:
+        if output.endswith('.xlsx'):
+            table.to_excel(output, index=False)
+        else:
+            table.to_csv(output, index=False, encoding='utf-8-sig')
+    
+    columns = ['source', 'name', 'points', 'reference_rp02', 'candidate_rp02', 'abs_diff',
+               'reference_ms', 'candidate_ms', 'speedup', 'reference_method', 'match']
+    with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.float_format', '{:.3f}'.format):
+        print(table[columns].to_string(index=False))
+    
+    mismatches = int((~table['match']).sum())
+    speedup = table['speedup'].dropna()
+    print(f"\n{reference} vs {candidate}: {len(table)} 条曲线，超出容差 {mismatches} 条"
+          f"（容差 {abs_tol} MPa 或 {rel_tol:.2%}）", file=sys.stderr)
+    if len(table['abs_diff'].dropna()):
+        print(f"最大偏差 {table['abs_diff'].max():.4f} MPa，速度比中位数 {speedup.median():.2f}×"
+              f"，总耗时 {table['reference_ms'].sum():.1f} ms -> {table['candidate_ms'].sum():.1f} ms", file=sys.stderr)
+    branches = table['reference_method'].replace('', 'none').value_counts()
+    print("当前算法的求出步骤: " + ", ".join(f"{YIELD_METHOD_NAMES.get(method, method)} {count}"
+                                    for method, count in branches.items()), file=sys.stderr)
+    
+    # 平滑内核与 scipy 的一致性（奇数和偶数窗口）
+    savgol_diff = check_savgol_parity()
+    if savgol_diff is None:
+        print("未安装 scipy，跳过 Savitzky-Golay 一致性检查", file=sys.stderr)
+    else:
+        print(f"Savitzky-Golay 与 scipy 最大偏差 {savgol_diff:.2e}（窗口 5-15）", file=sys.stderr)
+        if savgol_diff > 1e-8:
+            mismatches += 1
+    return 1 if mismatches else 0
+
 class TensileTestAnalyzer:
     def __init__(self, root):
         self.root = root
@@ -68,21 +4330,89 @@ class TensileTestAnalyzer:
         # 测试参数
         self.cross_sectional_areas = {}  # 存储每个sheet的横截面积
         self.gauge_length = 10.0  # 引伸计标距 (mm)
+        self.proof_offsets = list(DEFAULT_PROOF_OFFSETS)  # 规定塑性延伸强度偏移量
+        self.total_offsets = list(DEFAULT_TOTAL_OFFSETS)  # 规定总延伸强度
         
         # 数据存储
         self.data = None
         self.excel_data = {}  # 存储从Excel读取的所有sheet数据
         self.current_sheet_name = None  # 当前选中的sheet名称
         self.current_excel_path = None  # 当前加载的Excel文件路径
+        self.sheet_results = {}  # 计算结果缓存 {sheet名称: (计算条件, 结果字典)}
+        self.plot_mode = None  # 当前图形: 'sheet' / 'all' / 'envelope'
+        self.workspace_path = None  # 当前打开的工作区文件（数组为其内存映射）
         
         # 图例文本存储
         self.legend_texts = {}
         
-        # 配置文件路径
+        # 实时采集
+        self.live_source = "udp://127.0.0.1:9750"
+        self.live_frame_interval = 100  # 实时曲线刷新间隔 (ms)
+        self.live_stream = None
+        self.live_reader = None
+        
+        # 重采样曲线缓存（包络曲线重绘时直接复用）
+        self.resample_cache = {}
+        self.envelope_grid_points = 500
+        
+        # 图表保存与报告
+        self.plot_dpi = 300  # 保存图表和报告的分辨率
+        self.report_rasterized = True  # PDF/SVG 中的曲线栅格化，避免大数据量时文件过大
+        
+        # 屈服算法（YIELD_METHODS 中的名称）及每个试样的时间预算（秒，None 不限时）
+        self.yield_method = 'legacy'
+        self.yield_time_budget = None
+        
+        # 曲线质量预检（加载后即检查，未通过的sheet不再计算屈服强度）
+        self.qc_enabled = True
+        self.qc_flags = {}  # {sheet名称: 未通过的检查项代码列表}
+        
+        # 批次统计：lot_pattern 为从sheet名称中取批号的正则（第一个分组），未给出时按工作簿分组；
+        # spec_limits 为 {'yield_strength' 或 'Rp0.2': [下限, 上限]}，用于计算 Cpk
+        self.lot_pattern = None
+        self.spec_limits = {}
+        self.stat_resamples = 2000
+        self.stat_confidence = 0.95
+        self.lot_statistics = None
+        
+        # 试验有效区间（去掉加载前和断裂后的数据，计算和绘图只用区间内的数组视图）
+        self.trim_enabled = True
+        self.test_ranges = {}  # {sheet名称: (start, stop)}
+        
+        # 预处理：在有效区间上依次执行的修正步骤（列映射模板自带配置时以模板为准），各步输出按输入哈希缓存
+        self.preprocess = []
+        self.preprocess_cache = PreprocessCache()
+        self.preprocess_rows = {}  # {sheet名称: 预处理后各点在区间内的位置}，没有去掉点时不记录
+        
+        # 切换sheet时在后台预取相邻sheet的结果和降采样曲线；绘图时每条曲线最多画 plot_max_points 个点
+        self.prefetch_sheets = 3
+        self.plot_max_points = 2000
+        self.plot_cache = {}  # {sheet名称: (计算条件, 应变, 应力)} 降采样后的显示曲线
+        self.previous_sheet_name = None
+        self.data_generation = 0  # 每次载入数据加一，丢弃载入前提交的预取结果
+        self.prefetcher = SheetPrefetcher()
+        self.prefetcher.start()
+        
+        # 性能记录（内存跟踪和 cProfile 会拖慢计算，默认关闭）
+        self.perf_trace_memory = False
+        self.perf_profile = False
+        self.perf_log_path = None  # 设置后每条性能记录追加一行 JSON
+        
+        # 配置文件路径（试样参数保存在同名 .db 参数库中）
         self.config_file = "tensile_test_config.json"
+        self.config_db = os.path.splitext(self.config_file)[0] + '.db'
+        self.config_store = None
+        self.workbook_fingerprint = None  # 当前工作簿的内容指纹
+        self.column_templates = {}  # 列映射模板 {表头签名: 模板}
+        self.sheet_signatures = {}  # 当前工作簿各sheet的表头签名
+        self.sheet_hashes = {}  # 当前工作簿各sheet的内容指纹
+        self.duplicate_sheets = {}  # {sheet名称: 重复来源说明}，与已登记试样内容相同或近似的sheet
+        self.specimen_index = {}  # {内容指纹: (计算条件, 结果字典)}，内容相同的试样复用结果
         
         # 加载配置
         self.load_config()
+        self.open_config_store()
+        self.perf = PerfRecorder(self.perf_trace_memory, self.perf_profile, self.perf_log_path)
         
         # 配置样式
         self.setup_styles()
@@ -149,6 +4479,9 @@ class TensileTestAnalyzer:
         
         ttk.Button(sheet_frame, text="加载Excel数据", command=self.load_excel_data, 
                   style="Large.TButton").grid(row=0, column=2, padx=(10, 0))
+        self.live_button = ttk.Button(sheet_frame, text="实时采集", command=self.toggle_live_acquisition,
+                                      style="Large.TButton")
+        self.live_button.grid(row=0, column=3, padx=(10, 0))
         
         # 数据预览区域
         preview_frame = ttk.LabelFrame(main_frame, text="数据预览", padding="15")
@@ -206,6 +4539,13 @@ class TensileTestAnalyzer:
         self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
         self.canvas.get_tk_widget().grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # 十字光标读数（显示在图下方）与单击拾取
+        self.cursor_label = ttk.Label(plot_frame, text="", style="Small.TLabel")
+        self.cursor_label.grid(row=2, column=0, sticky=tk.W)
+        self.curve_cursor = CurveCursor(
+            self.canvas, self.ax, self.on_curve_pick,
+            on_hover=lambda text: self.cursor_label.config(text="   ".join(text.split("\n"))))
+        
         # 图例文本编辑按钮
         legend_frame = ttk.Frame(plot_frame)
         legend_frame.grid(row=1, column=0, pady=(10, 0), sticky=(tk.W, tk.E))
@@ -214,6 +4554,8 @@ class TensileTestAnalyzer:
                   style="Medium.TButton").pack(side=tk.LEFT, padx=5)
         ttk.Button(legend_frame, text="重置图例", command=self.reset_legend_texts,
                   style="Medium.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(legend_frame, text="绘制包络曲线", command=self.plot_envelope,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
         
         # 底部按钮
         bottom_frame = ttk.Frame(main_frame)
@@ -229,6 +4571,23 @@ class TensileTestAnalyzer:
                   style="Large.TButton", width=15).pack(side=tk.LEFT, padx=10)
         ttk.Button(bottom_frame, text="退出程序", command=self.root.quit, 
                   style="Large.TButton", width=10).pack(side=tk.LEFT, padx=10)
+        
+        # 辅助功能按钮（第二行）
+        tools_frame = ttk.Frame(main_frame)
+        tools_frame.grid(row=5, column=0, columnspan=4, pady=(10, 0))
+        
+        ttk.Button(tools_frame, text="打开工作区", command=self.load_workspace,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(tools_frame, text="保存工作区", command=self.save_workspace,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(tools_frame, text="列映射模板", command=self.show_column_templates,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(tools_frame, text="预处理", command=self.edit_preprocess,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(tools_frame, text="生成报告", command=self.generate_report,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(tools_frame, text="性能统计", command=self.show_perf_panel,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
     
     def set_plot_font(self):
         """设置图形字体"""
@@ -250,8 +4609,8 @@ class TensileTestAnalyzer:
             print(f"字体设置警告: {e}")
     
     def create_parameter_inputs(self):
-        """为每个sheet创建横截面积输入框"""
-        # 清除现有的输入框
+        """创建各sheet试样尺寸/横截面积表格（Treeview 只绘制可见行，双击单元格编辑）"""
+        # 清除现有的输入控件
         for widget in self.param_frame.winfo_children():
             widget.destroy()
         
@@ -261,72 +4620,200 @@ class TensileTestAnalyzer:
                      style="Medium.TLabel").pack()
             return
         
-        # 创建标题
-        title_frame = ttk.Frame(self.param_frame)
-        title_frame.pack(fill=tk.X, pady=(0, 10))
+        # 表格数据：每个sheet一行，尺寸以输入的文本保存，确认时统一按数组计算
+        self.param_table = pd.DataFrame('', index=pd.Index(list(self.excel_data.keys()), name='sheet_name'),
+                                        columns=DIMENSION_FIELDS)
+        for sheet_name, area in self.cross_sectional_areas.items():
+            if sheet_name in self.param_table.index:
+                self.param_table.at[sheet_name, 'cross_sectional_area'] = f"{area:g}"
+        self.param_errors = {}
         
-        ttk.Label(title_frame, text="Sheet名称", width=20, 
-                 style="Medium.TLabel").pack(side=tk.LEFT, padx=5)
-        ttk.Label(title_frame, text="横截面积 (mm²)", width=15, 
-                 style="Medium.TLabel").pack(side=tk.LEFT, padx=5)
+        table_frame = ttk.Frame(self.param_frame)
+        table_frame.pack(fill=tk.X)
+        columns = ('sheet_name', *DIMENSION_FIELDS, 'status')
+        headings = ('Sheet名称', '宽度 (mm)', '厚度 (mm)', '直径 (mm)', '横截面积 (mm²)', '状态')
+        self.param_tree = ttk.Treeview(table_frame, columns=columns, show='headings',
+                                       height=min(8, len(self.excel_data)), selectmode='extended')
+        for column, heading in zip(columns, headings):
+            self.param_tree.heading(column, text=heading)
+            self.param_tree.column(column, width=200 if column in ('sheet_name', 'status') else 110,
+                                   anchor=tk.W if column in ('sheet_name', 'status') else tk.E)
+        param_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.param_tree.yview)
+        self.param_tree.configure(yscrollcommand=param_scrollbar.set)
+        self.param_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        param_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.param_tree.bind("<Double-1>", self.edit_parameter_cell)
+        self.param_tree.bind("<Control-v>", lambda event: self.paste_parameters())
+        self.refresh_parameter_table()
         
-        # 为每个sheet创建输入行
-        self.area_entries = {}
-        for i, sheet_name in enumerate(self.excel_data.keys()):
-            row_frame = ttk.Frame(self.param_frame)
-            row_frame.pack(fill=tk.X, pady=2)
-            
-            ttk.Label(row_frame, text=sheet_name, width=20, 
-                     style="Small.TLabel").pack(side=tk.LEFT, padx=5)
-            
-            entry_var = tk.StringVar()
-            # 如果有之前的值，恢复它
-            if sheet_name in self.cross_sectional_areas:
-                entry_var.set(str(self.cross_sectional_areas[sheet_name]))
-            
-            entry = ttk.Entry(row_frame, textvariable=entry_var, width=15,
-                             style="Small.TEntry")
-            entry.pack(side=tk.LEFT, padx=5)
-            
-            self.area_entries[sheet_name] = entry
+        # 导入按钮
+        import_frame = ttk.Frame(self.param_frame)
+        import_frame.pack(pady=(10, 0))
+        ttk.Label(import_frame, text="单列数据为:", style="Small.TLabel").pack(side=tk.LEFT, padx=5)
+        self.single_column_combobox = ttk.Combobox(import_frame, values=["横截面积", "直径"], width=8,
+                                                   state="readonly")
+        self.single_column_combobox.set("横截面积")
+        self.single_column_combobox.pack(side=tk.LEFT, padx=5)
+        ttk.Button(import_frame, text="粘贴尺寸", 
+                  command=self.paste_parameters,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(import_frame, text="导入尺寸csv", 
+                  command=self.import_parameter_csv,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
         
-        # 添加确认按钮
-        ttk.Button(self.param_frame, text="确认所有参数", 
+        # 确认按钮
+        button_frame = ttk.Frame(self.param_frame)
+        button_frame.pack(pady=(10, 0))
+        ttk.Button(button_frame, text="确认所有参数", 
                   command=self.set_all_parameters,
-                  style="Medium.TButton").pack(pady=(10, 0))
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="导出面积csv", 
+                  command=self.save_sectional_area_to_csv,
+                  style="Medium.TButton").pack(side=tk.LEFT, padx=5)
     
-    def set_all_parameters(self):
-        """设置所有sheet的参数"""
-        success_count = 0
-        error_sheets = []
+    def refresh_parameter_table(self):
+        """按 param_table 重建表格行"""
+        self.param_tree.delete(*self.param_tree.get_children())
+        for sheet_name, row in zip(self.param_table.index, self.param_table.itertuples(index=False)):
+            self.param_tree.insert('', tk.END, iid=sheet_name,
+                                   values=(sheet_name, *row, self.param_errors.get(sheet_name, '')))
+    
+    def update_computed_areas(self):
+        """重新计算各行面积：由尺寸算出的面积填入面积列，错误信息显示在状态列"""
+        areas, errors = compute_cross_sectional_areas(self.param_table)
+        has_size = (self.param_table[['width', 'thickness', 'diameter']] != '').any(axis=1).to_numpy()
+        computed = has_size & (errors == '')
+        self.param_table.loc[computed, 'cross_sectional_area'] = [f"{area:.4g}" for area in areas[computed]]
+        self.param_errors = {name: error for name, error in zip(self.param_table.index, errors) if error}
+        return areas, errors
+    
+    def edit_parameter_cell(self, event):
+        """双击单元格时在其上放置一个输入框进行编辑"""
+        tree = self.param_tree
+        if tree.identify_region(event.x, event.y) != 'cell':
+            return
+        sheet_name = tree.identify_row(event.y)
+        column = tree.identify_column(event.x)
+        index = int(column[1:]) - 2  # 第1列为sheet名称
+        if not sheet_name or not 0 <= index < len(DIMENSION_FIELDS):
+            return
+        field = DIMENSION_FIELDS[index]
+        x, y, width, height = tree.bbox(sheet_name, column)
+        
+        entry_var = tk.StringVar(value=self.param_table.at[sheet_name, field])
+        entry = ttk.Entry(tree, textvariable=entry_var)
+        entry.place(x=x, y=y, width=width, height=height)
+        entry.focus_set()
+        entry.select_range(0, tk.END)
         
-        for sheet_name, entry in self.area_entries.items():
+        def commit(event=None):
+            if not entry.winfo_exists():
+                return
+            self.param_table.at[sheet_name, field] = entry_var.get().strip()
+            if field == 'cross_sectional_area':
+                # 直接输入面积时清除该行尺寸
+                self.param_table.loc[sheet_name, ['width', 'thickness', 'diameter']] = ''
+            entry.destroy()
+            self.update_computed_areas()
+            self.refresh_parameter_table()
+        
+        entry.bind("<Return>", commit)
+        entry.bind("<FocusOut>", commit)
+        entry.bind("<Escape>", lambda event: entry.destroy())
+    
+    def paste_parameters(self):
+        """从剪贴板粘贴试样尺寸（可直接从Excel复制）"""
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            messagebox.showinfo("提示", "剪贴板中没有文本")
+            return
+        self.import_parameter_text(text)
+    
+    def import_parameter_csv(self):
+        """从csv文件导入试样尺寸"""
+        file_path = filedialog.askopenfilename(
+            title="选择尺寸csv文件",
+            filetypes=[("CSV文件", "*.csv *.txt"), ("所有文件", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
             try:
-                area_text = entry.get().strip()
-                if not area_text:
-                    error_sheets.append(f"{sheet_name}: 未输入横截面积")
-                    continue
-                
-                area = float(area_text)
-                if area <= 0:
-                    error_sheets.append(f"{sheet_name}: 横截面积必须大于0")
-                    continue
-                
-                self.cross_sectional_areas[sheet_name] = area
-                success_count += 1
-                
-            except ValueError:
-                error_sheets.append(f"{sheet_name}: 无效的数值")
+                text = content.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                text = content.decode('gbk')
+        except Exception as e:
+            messagebox.showerror("错误", f"读取csv文件失败：{str(e)}")
+            return
+        self.import_parameter_text(text)
+    
+    def import_parameter_text(self, text):
+        """导入尺寸文本：有sheet名称列时按名称对应，否则从选中的第一行起依次填入"""
+        single_column = 'diameter' if self.single_column_combobox.get() == "直径" else 'cross_sectional_area'
+        try:
+            parsed = parse_dimension_text(text, single_column)
+        except ValueError as e:
+            messagebox.showerror("错误", f"无法导入尺寸数据：{str(e)}")
+            return
         
+        index = self.param_table.index
+        unknown = []
+        if 'sheet_name' in parsed:
+            names = parsed.pop('sheet_name').str.strip()
+            known = names.isin(index).to_numpy()
+            unknown = list(names[~known])
+            parsed = parsed[known]
+            parsed.index = names[known]
+        else:
+            selection = self.param_tree.selection()
+            start = index.get_loc(selection[0]) if selection else 0
+            targets = index[start:start + len(parsed)]
+            parsed = parsed.iloc[:len(targets)]
+            parsed.index = targets
+        
+        # 导入的行整体替换原有尺寸
+        self.param_table.loc[parsed.index, :] = ''
+        self.param_table.loc[parsed.index, list(parsed.columns)] = parsed.to_numpy()
+        self.update_computed_areas()
+        self.refresh_parameter_table()
+        
+        message = f"已导入 {len(parsed)} 个sheet的尺寸，请检查后点击\"确认所有参数\""
+        if unknown:
+            message += "\n以下名称不在当前工作簿中，已忽略: " + "，".join(map(str, unknown[:20]))
+            if len(unknown) > 20:
+                message += f" 等 {len(unknown)} 个"
+        messagebox.showinfo("导入尺寸", message)
+    
+    def set_all_parameters(self):
+        """设置所有sheet的参数（整张表一次计算和校验）"""
+        areas, errors = self.update_computed_areas()
+        self.refresh_parameter_table()
+        valid = errors == ''
+        names = self.param_table.index
+        
+        new_areas = pd.Series(areas[valid], index=names[valid])
+        old_areas = pd.Series(self.cross_sectional_areas, dtype=float).reindex(new_areas.index)
+        changed = {name: {'area': float(area), 'gauge_length': self.gauge_length}
+                   for name, area in new_areas[(old_areas != new_areas).to_numpy()].items()}
+        self.cross_sectional_areas.update(new_areas.to_dict())
+        success_count = int(valid.sum())
+        
+        error_sheets = [f"{name}: {error}" for name, error in zip(names[~valid], errors[~valid])]
         if error_sheets:
+            shown = error_sheets[:20]
+            if len(error_sheets) > 20:
+                shown.append(f"…… 共 {len(error_sheets)} 个")
             messagebox.showwarning("警告", 
                 f"成功设置 {success_count} 个sheet的参数\n"
-                f"以下sheet参数设置失败:\n" + "\n".join(error_sheets))
+                f"以下sheet参数设置失败:\n" + "\n".join(shown))
         else:
             messagebox.showinfo("成功", f"已成功设置 {success_count} 个sheet的参数")
         
-        # 生成同名csv文件保存截面尺寸数据
-        self.save_sectional_area_to_csv()
+        # 只把改动的sheet写入参数库
+        self.store_parameters(changed)
     
     def set_parameters(self):
         """设置测试参数"""
@@ -350,39 +4837,234 @@ class TensileTestAnalyzer:
                         self.cross_sectional_areas = config['cross_sectional_areas']
                     if 'legend_texts' in config:
                         self.legend_texts = config['legend_texts']
+                    if 'proof_offsets' in config:
+                        self.proof_offsets = [float(v) for v in config['proof_offsets']]
+                    if 'total_offsets' in config:
+                        self.total_offsets = [float(v) for v in config['total_offsets']]
+                    if 'plot_dpi' in config:
+                        self.plot_dpi = int(config['plot_dpi'])
+                    if 'report_rasterized' in config:
+                        self.report_rasterized = bool(config['report_rasterized'])
+                    if config.get('yield_method') in YIELD_METHODS:
+                        self.yield_method = config['yield_method']
+                    if 'yield_time_budget' in config:
+                        self.yield_time_budget = config['yield_time_budget']
+                    if 'qc_enabled' in config:
+                        self.qc_enabled = bool(config['qc_enabled'])
+                    if 'trim_test_range' in config:
+                        self.trim_enabled = bool(config['trim_test_range'])
+                    if 'prefetch_sheets' in config:
+                        self.prefetch_sheets = int(config['prefetch_sheets'])
+                    if 'plot_max_points' in config:
+                        self.plot_max_points = int(config['plot_max_points'])
+                    if 'preprocess' in config:
+                        try:
+                            self.preprocess = normalize_preprocess_spec(config['preprocess'])
+                        except ValueError as e:
+                            print(f"预处理配置有误，已忽略: {e}")
+                    if 'lot_pattern' in config:
+                        self.lot_pattern = config['lot_pattern']
+                    if 'spec_limits' in config:
+                        self.spec_limits = dict(config['spec_limits'] or {})
+                    if 'stat_resamples' in config:
+                        self.stat_resamples = int(config['stat_resamples'])
+                    if 'stat_confidence' in config:
+                        self.stat_confidence = float(config['stat_confidence'])
+                    if 'perf_trace_memory' in config:
+                        self.perf_trace_memory = bool(config['perf_trace_memory'])
+                    if 'perf_profile' in config:
+                        self.perf_profile = bool(config['perf_profile'])
+                    if 'perf_log' in config:
+                        self.perf_log_path = config['perf_log']
         except Exception as e:
             print(f"加载配置文件失败: {e}")
     
+    def open_config_store(self):
+        """打开试样参数库，并迁移旧版 json 配置中按sheet名称保存的面积和图例"""
+        try:
+            self.config_store = ConfigStore(self.config_db)
+            self.column_templates = self.config_store.load_templates()
+            if self.cross_sectional_areas or self.legend_texts:
+                count = self.config_store.migrate_legacy(self.cross_sectional_areas, self.legend_texts)
+                print(f"已将旧配置中 {count} 个sheet的参数迁移到 {self.config_db}")
+        except Exception as e:
+            print(f"打开参数库失败: {e}")
+            self.config_store = None
+        self.cross_sectional_areas = {}
+        self.legend_texts = {}
+    
+    def load_stored_parameters(self, excel_file_path):
+        """从参数库载入当前工作簿各sheet的面积、标距和图例文本，返回载入的sheet数
+        
+        按内容指纹查找；工作簿修改过时退回到同一路径上次的参数，再退回到旧版按sheet名称的参数。
+        """
+        self.workbook_fingerprint = None
+        if self.config_store is None:
+            return 0
+        try:
+            self.workbook_fingerprint = workbook_fingerprint(excel_file_path)
+            previous = self.config_store.previous_fingerprint(excel_file_path, self.workbook_fingerprint)
+            sources = [self.config_store.load(self.workbook_fingerprint)]
+            if previous:
+                sources.append(self.config_store.load(previous))
+            sources.append(self.config_store.load(ConfigStore.LEGACY_FINGERPRINT))
+            self.config_store.register_workbook(self.workbook_fingerprint, excel_file_path)
+        except Exception as e:
+            print(f"读取参数库失败: {e}")
+            return 0
+        
+        loaded_count = 0
+        gauge_lengths = set()
+        for sheet_name in self.excel_data:
+            # 逐个字段取第一个有值的来源
+            found = [rows[sheet_name] for rows in sources if sheet_name in rows]
+            row = {field: next((r[field] for r in found if r[field] is not None), None)
+                   for field in ConfigStore.FIELDS}
+            if row['area'] is not None:
+                self.cross_sectional_areas[sheet_name] = row['area']
+                loaded_count += 1
+            if row['legend']:
+                self.legend_texts[sheet_name] = row['legend']
+            if row['gauge_length']:
+                gauge_lengths.add(row['gauge_length'])
+        
+        # 标距对整个工作簿统一，只在各sheet记录一致时恢复
+        if len(gauge_lengths) == 1:
+            self.gauge_length = gauge_lengths.pop()
+        return loaded_count
+    
+    def store_parameters(self, rows):
+        """把 {sheet名称: {字段: 值}} 写入参数库中当前工作簿的行"""
+        if self.config_store is None or self.workbook_fingerprint is None or not rows:
+            return
+        try:
+            self.config_store.upsert_many(self.workbook_fingerprint, rows)
+        except Exception as e:
+            print(f"保存参数到参数库失败: {e}")
+    
+    def index_loaded_sheets(self, excel_file_path):
+        """计算各sheet的内容指纹，标记与本工作簿其他sheet或参数库中已登记试样内容相同或近似的sheet，并登记新试样
+        
+        指纹相同的试样保存的结果一并取出，计算条件相同时直接复用（见 indexed_results）；
+        指纹不同但内容轮廓近似的（见 profiles_match）只标出来源，结果仍重新计算。
+        """
+        self.sheet_hashes = {}
+        self.duplicate_sheets = {}
+        self.specimen_index = {}
+        profiles = {}
+        with self.perf.stage('content_hash', rows=sum(len(data) for data in self.excel_data.values()),
+                             specimens=len(self.excel_data)):
+            for sheet_name, data in self.excel_data.items():
+                load = data['Load_N'].values
+                displacement = data['Displacement_mm'].values
+                self.sheet_hashes[sheet_name] = specimen_content_hash(load, displacement)
+                profiles[sheet_name] = specimen_profile(load, displacement)
+        
+        first_sheets = {}
+        buckets = {}  # {轮廓桶: [sheet名称]}，本工作簿内的近似查找
+        for sheet_name, content_hash in self.sheet_hashes.items():
+            if content_hash in first_sheets:
+                self.duplicate_sheets[sheet_name] = f"与本工作簿 Sheet '{first_sheets[content_hash]}' 内容相同"
+                continue
+            first_sheets[content_hash] = sheet_name
+            profile = profiles[sheet_name]
+            similar = next((other for bucket in profile_buckets(profile, neighbours=True)
+                            for other in buckets.get(bucket, ()) if profiles_match(profile, profiles[other])), None)
+            if similar is not None:
+                self.duplicate_sheets[sheet_name] = f"与本工作簿 Sheet '{similar}' 内容近似"
+            buckets.setdefault(profile_buckets(profile), []).append(sheet_name)
+        if self.config_store is None:
+            return
+        try:
+            known = self.config_store.find_specimens(first_sheets)
+            similar = self.config_store.find_similar_specimens(
+                {content_hash: profiles[sheet_name] for content_hash, sheet_name in first_sheets.items()
+                 if content_hash not in known and sheet_name not in self.duplicate_sheets})
+            self.config_store.index_specimens(
+                [(content_hash, self.workbook_fingerprint, excel_file_path, sheet_name,
+                  len(self.excel_data[sheet_name]), profiles[sheet_name])
+                 for content_hash, sheet_name in first_sheets.items()])
+        except Exception as e:
+            print(f"查询试样索引失败: {e}")
+            return
+        for content_hash, entry in known.items():
+            sheet_name = first_sheets[content_hash]
+            if (entry['workbook'], entry['sheet']) != (self.workbook_fingerprint, sheet_name):
+                source = os.path.basename(entry['path']) if entry['path'] else "已处理的工作簿"
+                self.duplicate_sheets[sheet_name] = f"与 {source} 的 Sheet '{entry['sheet']}' 内容相同"
+            if entry['result_key'] and entry['results']:
+                self.specimen_index[content_hash] = (entry['result_key'], entry['results'])
+        for content_hash, entry in similar.items():
+            sheet_name = first_sheets[content_hash]
+            if (entry['workbook'], entry['sheet']) != (self.workbook_fingerprint, sheet_name):
+                source = os.path.basename(entry['path']) if entry['path'] else "已处理的工作簿"
+                self.duplicate_sheets[sheet_name] = f"与 {source} 的 Sheet '{entry['sheet']}' 内容近似"
+        if self.duplicate_sheets:
+            print(f"{len(self.duplicate_sheets)} 个sheet与已有试样内容相同或近似: {', '.join(self.duplicate_sheets)}")
+    
+    def index_key(self, sheet_name):
+        """内容索引中结果的计算条件：与 result_key 相同，但不含数据行数和有效区间位置
+        
+        指纹只覆盖有效区间，同一试样在不同工作簿中前后空载行数不同也能复用；
+        不截取有效区间时结果与空载行有关，返回 None，不复用也不登记。
+        """
+        if not self.trim_enabled:
+            return None
+        return specimen_result_key(None, self.cross_sectional_areas.get(sheet_name), self.gauge_length,
+                                   self.proof_offsets, self.total_offsets, self.yield_method,
+                                   self.yield_time_budget, self.qc_enabled, True, None,
+                                   self.sheet_preprocess(sheet_name))
+    
+    def indexed_results(self, sheet_name):
+        """内容相同的试样在相同计算条件下已有结果时返回其副本（有效区间换成本sheet的），否则返回 None"""
+        entry = self.specimen_index.get(self.sheet_hashes.get(sheet_name))
+        key = self.index_key(sheet_name)
+        if entry is None or key is None or entry[0] != key:
+            return None
+        self.perf.note('content_index', 'reused')
+        results = dict(entry[1])
+        results['test_range'] = self.test_ranges.get(sheet_name, results['test_range'])
+        return results
+    
+    def remember_results(self, computed):
+        """把新算出的 {sheet名称: 结果字典} 记入内容索引，并写入参数库供之后打开的工作簿复用"""
+        rows = []
+        for sheet_name, results in computed.items():
+            content_hash = self.sheet_hashes.get(sheet_name)
+            key = self.index_key(sheet_name)
+            if content_hash is None or key is None:
+                continue
+            self.specimen_index[content_hash] = (key, dict(results))
+            rows.append((content_hash, key, results))
+        if self.config_store is None or not rows:
+            return
+        try:
+            self.config_store.store_specimen_results(rows)
+        except Exception as e:
+            print(f"保存试样结果到参数库失败: {e}")
+    
     def check_for_csv_config(self, excel_file_path):
         """检查同文件夹下是否存在同名csv文件，并加载截面尺寸数据"""
         try:
-            # 获取Excel文件的目录和文件名
-            excel_dir = os.path.dirname(excel_file_path)
-            excel_filename = os.path.basename(excel_file_path)
-            
             # 生成同名csv文件路径
-            csv_filename = os.path.splitext(excel_filename)[0] + '.csv'
-            csv_file_path = os.path.join(excel_dir, csv_filename)
+            csv_file_path = area_csv_path(excel_file_path)
+            csv_filename = os.path.basename(csv_file_path)
             
             if os.path.exists(csv_file_path):
-                # 读取csv文件
-                df_config = pd.read_csv(csv_file_path)
+                # 加载截面尺寸数据
+                loaded_count = 0
+                imported = {}
+                for sheet_name, cross_sectional_area in read_area_csv(csv_file_path).items():
+                    # 只有当该sheet存在于当前加载的Excel文件中、且参数库中没有时，才使用这些数据
+                    if sheet_name in self.excel_data and sheet_name not in self.cross_sectional_areas:
+                        self.cross_sectional_areas[sheet_name] = cross_sectional_area
+                        imported[sheet_name] = {'area': cross_sectional_area,
+                                                'gauge_length': self.gauge_length}
+                        loaded_count += 1
+                self.store_parameters(imported)
                 
-                # 检查必要的列
-                if 'sheet_name' in df_config.columns and 'cross_sectional_area' in df_config.columns:
-                    # 加载截面尺寸数据
-                    loaded_count = 0
-                    for _, row in df_config.iterrows():
-                        sheet_name = str(row['sheet_name'])
-                        cross_sectional_area = float(row['cross_sectional_area'])
-                        
-                        # 只有当该sheet存在于当前加载的Excel文件中时，才使用这些数据
-                        if sheet_name in self.excel_data:
-                            self.cross_sectional_areas[sheet_name] = cross_sectional_area
-                            loaded_count += 1
-                    
-                    if loaded_count > 0:
-                        messagebox.showinfo("成功", f"已从 {csv_filename} 加载 {loaded_count} 个sheet的截面尺寸数据")
+                if loaded_count > 0:
+                    messagebox.showinfo("成功", f"已从 {csv_filename} 加载 {loaded_count} 个sheet的截面尺寸数据")
                 
         except Exception as e:
             print(f"检查csv配置文件时出错: {e}")
@@ -394,13 +5076,9 @@ class TensileTestAnalyzer:
                 print("未加载Excel文件或没有数据，跳过保存")
                 return
             
-            # 获取Excel文件的目录和文件名
-            excel_dir = os.path.dirname(self.current_excel_path)
-            excel_filename = os.path.basename(self.current_excel_path)
-            
             # 生成同名csv文件路径
-            csv_filename = os.path.splitext(excel_filename)[0] + '.csv'
-            csv_file_path = os.path.join(excel_dir, csv_filename)
+            csv_file_path = area_csv_path(self.current_excel_path)
+            csv_filename = os.path.basename(csv_file_path)
             
             # 准备保存的数据
             config_data = []
@@ -430,8 +5108,24 @@ class TensileTestAnalyzer:
         """保存配置文件"""
         try:
             config = {
-                'cross_sectional_areas': self.cross_sectional_areas,
-                'legend_texts': self.legend_texts
+                'proof_offsets': self.proof_offsets,
+                'total_offsets': self.total_offsets,
+                'plot_dpi': self.plot_dpi,
+                'report_rasterized': self.report_rasterized,
+                'yield_method': self.yield_method,
+                'yield_time_budget': self.yield_time_budget,
+                'qc_enabled': self.qc_enabled,
+                'trim_test_range': self.trim_enabled,
+                'preprocess': self.preprocess,
+                'prefetch_sheets': self.prefetch_sheets,
+                'plot_max_points': self.plot_max_points,
+                'lot_pattern': self.lot_pattern,
+                'spec_limits': self.spec_limits,
+                'stat_resamples': self.stat_resamples,
+                'stat_confidence': self.stat_confidence,
+                'perf_trace_memory': self.perf_trace_memory,
+                'perf_profile': self.perf_profile,
+                'perf_log': self.perf_log_path
             }
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
@@ -441,6 +5135,9 @@ class TensileTestAnalyzer:
     def on_close(self):
         """窗口关闭事件处理"""
         self.save_config()
+        self.prefetcher.stop()
+        if self.config_store is not None:
+            self.config_store.close()
         
         # 释放matplotlib资源
         if hasattr(self, 'fig'):
@@ -458,9 +5155,9 @@ class TensileTestAnalyzer:
         import gc
         gc.collect()
     
-    def load_excel_data(self):
-        """从Excel文件加载数据"""
-        file_path = filedialog.askopenfilename(
+    def load_excel_data(self, file_path=None):
+        """从Excel文件加载数据，未给出路径时弹出文件选择框"""
+        file_path = file_path or filedialog.askopenfilename(
             title="选择Excel数据文件",
             filetypes=[("Excel文件", "*.xlsx *.xls"), ("所有文件", "*.*")]
         )
@@ -479,102 +5176,58 @@ class TensileTestAnalyzer:
                 
                 # 清空之前的数据
                 self.excel_data.clear()
+                self.resample_cache.clear()
+                self.sheet_results.clear()
+                self.plot_cache.clear()
+                self.previous_sheet_name = None
+                self.data_generation += 1
+                self.workspace_path = None
                 
-                # 读取每个sheet的数据
-                for sheet_name in sheet_names:
-                    try:
-                        # 读取sheet数据
-                        df = pd.read_excel(file_path, sheet_name=sheet_name)
-                        
-                        # 查找所需的列
-                        load_col = None
-                        extensometer_col = None
-                        
-                        # 查找载荷列（可能包含'载荷'或'Load'）
-                        for col in df.columns:
-                            if isinstance(col, str):
-                                col_lower = col.lower()
-                                if '载荷' in col or 'load' in col_lower or 'force' in col_lower:
-                                    load_col = col
-                                elif '引伸' in col or 'extenso' in col_lower or 'strain' in col_lower:
-                                    extensometer_col = col
-                        
-                        # 如果没找到中文列名，尝试使用第一行数据作为列名
-                        if load_col is None or extensometer_col is None:
-                            # 使用第二行作为表头（假设第一行可能是单位）
-                            df_alternative = pd.read_excel(file_path, sheet_name=sheet_name, header=1)
-                            for col in df_alternative.columns:
-                                if isinstance(col, str):
-                                    col_lower = col.lower()
-                                    if '载荷' in col or 'load' in col_lower or 'force' in col_lower:
-                                        load_col = col
-                                    elif '引伸' in col or 'extenso' in col_lower or 'strain' in col_lower:
-                                        extensometer_col = col
-                            
-                            if load_col is not None and extensometer_col is not None:
-                                df = df_alternative
-                        
-                        # 如果还是没找到，尝试基于位置（假设第1列是载荷，第3列是引伸计）
-                        if load_col is None or extensometer_col is None:
-                            if len(df.columns) >= 4:
-                                # 尝试识别数据列
-                                for i, col in enumerate(df.columns):
-                                    if df[col].dtype in ['float64', 'int64']:
-                                        if load_col is None:
-                                            load_col = col
-                                        elif extensometer_col is None:
-                                            extensometer_col = col
-                                            break
-                        
-                        if load_col is not None and extensometer_col is not None:
-                            # 提取所需的两列数据
-                            extracted_data = pd.DataFrame({
-                                'Load_N': pd.to_numeric(df[load_col], errors='coerce'),
-                                'Displacement_mm': pd.to_numeric(df[extensometer_col], errors='coerce')
-                            })
-                            
-                            # 删除NaN值
-                            extracted_data = extracted_data.dropna()
-                            
-                            # 确保数据量足够
-                            if len(extracted_data) > 10:
-                                # 存储数据
-                                self.excel_data[sheet_name] = extracted_data
-                                print(f"Sheet '{sheet_name}': 找到 {len(extracted_data)} 行数据")
-                            else:
-                                print(f"Sheet '{sheet_name}': 数据量不足，已跳过")
-                        else:
-                            print(f"Sheet '{sheet_name}': 未找到所需的列")
-                        
-                    except Exception as e:
-                        print(f"读取sheet '{sheet_name}'时出错: {str(e)}")
+                # 读取每个sheet的数据（表头签名已有模板的sheet跳过列识别）
+                known_signatures = set(self.column_templates)
+                self.sheet_signatures = {}
+                with self.perf.stage('load_workbook', file=os.path.basename(file_path)) as info:
+                    self.excel_data.update(read_workbook_sheets(excel_file, self.perf, self.column_templates,
+                                                                self.sheet_signatures))
+                    info['rows'] = sum(len(data) for data in self.excel_data.values())
+                self.store_column_templates(known_signatures)
                 
                 if not self.excel_data:
                     messagebox.showerror("错误", "未在任何sheet中找到所需的载荷和引伸计数据列")
                     return
                 
+                # 识别试验有效区间并做质量预检（只用载荷和位移，不需要横截面积）
+                self.prepare_loaded_sheets()
+                
                 # 更新下拉框
                 self.sheet_combobox['values'] = list(self.excel_data.keys())
                 self.sheet_combobox.set(list(self.excel_data.keys())[0])
                 
-                # 检查同文件夹下是否存在同名csv文件
+                # 先从参数库载入，再用同文件夹下的同名csv文件补充参数库中没有的sheet
+                self.cross_sectional_areas.clear()
+                self.legend_texts.clear()
+                self.load_stored_parameters(file_path)
                 self.check_for_csv_config(file_path)
+                self.index_loaded_sheets(file_path)
                 
                 # 创建参数输入框
                 self.create_parameter_inputs()
                 
                 # 初始化图例文本
                 for sheet_name in self.excel_data.keys():
-                    self.legend_texts[sheet_name] = sheet_name
+                    self.legend_texts.setdefault(sheet_name, sheet_name)
                 
                 # 自动选择第一个sheet
                 self.on_sheet_select(None)
                 
                 # 更新预览信息
                 file_name = os.path.basename(file_path)
-                self.preview_info_label.config(
-                    text=f"已加载文件: {file_name}\n共 {len(self.excel_data)} 个sheet，总计 {sum(len(data) for data in self.excel_data.values())} 行数据"
-                )
+                info_text = f"已加载文件: {file_name}\n共 {len(self.excel_data)} 个sheet，总计 {sum(len(data) for data in self.excel_data.values())} 行数据"
+                if self.qc_flags:
+                    info_text += f"\n{len(self.qc_flags)} 个sheet未通过质量预检"
+                if self.duplicate_sheets:
+                    info_text += f"\n{len(self.duplicate_sheets)} 个sheet与已有试样内容相同或近似"
+                self.preview_info_label.config(text=info_text)
                 
                 messagebox.showinfo("成功", f"已成功加载 {len(self.excel_data)} 个sheet的数据")
                 
@@ -584,261 +5237,245 @@ class TensileTestAnalyzer:
     def on_sheet_select(self, event):
         """当选择不同的sheet时更新预览"""
         if self.sheet_combobox.get():
-            sheet_name = self.sheet_combobox.get()
-            self.current_sheet_name = sheet_name
-            
-            if sheet_name in self.excel_data:
-                data = self.excel_data[sheet_name]
-                
-                # 更新预览文本框
-                self.preview_text.delete(1.0, tk.END)
-                
-                # 显示前30行数据
-                preview_lines = min(30, len(data))
-                self.preview_text.insert(1.0, f"Sheet: {sheet_name}\n")
-                self.preview_text.insert(tk.END, f"数据行数: {len(data)}\n")
-                self.preview_text.insert(tk.END, "="*50 + "\n")
-                self.preview_text.insert(tk.END, "载荷(N)              位移(mm)\n")
-                self.preview_text.insert(tk.END, "-"*50 + "\n")
-                
-                for i in range(preview_lines):
-                    self.preview_text.insert(tk.END, f"{data.iloc[i, 0]:>12.2f}        {data.iloc[i, 1]:>12.4f}\n")
-                
-                if len(data) > preview_lines:
-                    self.preview_text.insert(tk.END, f"\n... 还有 {len(data) - preview_lines} 行数据\n")
-    
-    def calculate_yield_strength_robust(self, stress, strain):
-        """更鲁棒的屈服强度计算方法 (0.2% 偏移法)"""
-        if len(stress) < 20:
-            return None, None
-        
-        try:
-            # 方法1: 使用整体趋势，容忍局部波动
-            # 对数据进行平滑处理
-            # 增大移动平均窗口，使用更平滑的数据
-            window_size = min(15, len(stress) // 8)
-            if window_size < 5:
-                window_size = 5
-            
-            # 使用Savitzky-Golay滤波器进行平滑，保留更多特征
-            from scipy.signal import savgol_filter
-            try:
-                stress_smooth = savgol_filter(stress, window_length=window_size, polyorder=2)
-                strain_smooth = strain
-            except:
-                # 如果Savitzky-Golay失败，回退到移动平均
-                stress_smooth = np.convolve(stress, np.ones(window_size)/window_size, mode='valid')
-                strain_smooth = strain[window_size-1:]
-            
-            # 方法2: 使用应力增量法确定弹性阶段
-            # 寻找初始线性段（应力变化相对稳定的区域）
-            strain_increments = np.diff(strain_smooth)
-            stress_increments = np.diff(stress_smooth)
-            
-            # 计算应变-应力比（近似弹性模量）
-            ratios = stress_increments / (strain_increments + 1e-10)
-            
-            # 寻找比值相对稳定的区域 - 使用更大的初始窗口
-            initial_window = min(30, len(ratios) // 3)
-            ratio_mean = np.mean(ratios[:initial_window])
-            ratio_std = np.std(ratios[:initial_window])
-            
-            # 寻找弹性阶段的结束点 - 允许更大的波动，避免过早截断
-            elastic_end = len(ratios)
-            tolerance = 3.0  # 增加容忍度到3倍标准差
-            
-            # 滑动窗口检查弹性阶段
-            sliding_window = min(10, len(ratios) // 20)
-            if sliding_window < 3:
-                sliding_window = 3
-            
-            for i in range(initial_window, len(ratios) - sliding_window):
-                window_ratios = ratios[i:i+sliding_window]
-                window_mean = np.mean(window_ratios)
-                if abs(window_mean - ratio_mean) > tolerance * ratio_std:
-                    elastic_end = i
-                    break
-            
-            # 确保弹性阶段有足够的数据点
-            if elastic_end < 10:
-                elastic_end = min(30, len(stress_smooth) // 2)
-            
-            # 线性拟合弹性阶段
-            x_elastic = strain_smooth[:elastic_end]
-            y_elastic = stress_smooth[:elastic_end]
-            
-            if len(x_elastic) < 5:
-                return None, None
-            
-            A = np.vstack([x_elastic, np.ones(len(x_elastic))]).T
-            m, c = np.linalg.lstsq(A, y_elastic, rcond=None)[0]
-            
-            # 0.2% 塑性应变偏移线
-            offset_strain = strain + 0.002
-            offset_line = m * offset_strain + c
-            
-            # 寻找与偏移线的交点
-            # 从弹性阶段结束点开始找，但使用原始数据点
-            search_start = max(0, elastic_end - window_size + 1)
-            
-            for i in range(search_start, len(stress)-1):
-                if stress[i] <= offset_line[i] and stress[i+1] > offset_line[i+1]:
-                    # 线性插值找到精确交点
-                    x1, x2 = strain[i], strain[i+1]
-                    y1, y2 = stress[i] - offset_line[i], stress[i+1] - offset_line[i+1]
-                    
-                    if y1 * y2 < 0:  # 异号，说明有交点
-                        t = -y1 / (y2 - y1)
-                        yield_strain = x1 + t * (x2 - x1)
-                        yield_strength = m * (yield_strain + 0.002) + c
-                        return yield_strength, yield_strain
-            
-            # 如果没有找到交点，尝试使用更鲁棒的方法
-            # 方法1: 使用更大范围的数据重新拟合
-            # 使用前40%的数据进行拟合
-            second_try_end = min(len(stress_smooth) // 2, 100)
-            if second_try_end > elastic_end:
-                x_elastic_2 = strain_smooth[:second_try_end]
-                y_elastic_2 = stress_smooth[:second_try_end]
-                
-                if len(x_elastic_2) >= 5:
-                    A2 = np.vstack([x_elastic_2, np.ones(len(x_elastic_2))]).T
-                    m2, c2 = np.linalg.lstsq(A2, y_elastic_2, rcond=None)[0]
-                    
-                    offset_line_2 = m2 * (strain + 0.002) + c2
-                    
-                    # 重新寻找交点
-                    for i in range(search_start, len(stress)-1):
-                        if stress[i] <= offset_line_2[i] and stress[i+1] > offset_line_2[i+1]:
-                            x1, x2 = strain[i], strain[i+1]
-                            y1, y2 = stress[i] - offset_line_2[i], stress[i+1] - offset_line_2[i+1]
-                            
-                            if y1 * y2 < 0:
-                                t = -y1 / (y2 - y1)
-                                yield_strain = x1 + t * (x2 - x1)
-                                yield_strength = m2 * (yield_strain + 0.002) + c2
-                                return yield_strength, yield_strain
+            sheet_name = self.sheet_combobox.get()
+            self.current_sheet_name = sheet_name
             
-            # 方法2: 使用0.2%应变偏移法的标准实现
-            # 寻找弹性模量的最佳估计
-            # 计算整个曲线的弹性模量（使用初始线性部分）
-            if len(stress) > 50:
-                # 使用前20-30%的数据进行拟合
-                fit_end = min(int(len(stress) * 0.3), 100)
-                x_fit = strain[:fit_end]
-                y_fit = stress[:fit_end]
-                
-                A3 = np.vstack([x_fit, np.ones(len(x_fit))]).T
-                m3, c3 = np.linalg.lstsq(A3, y_fit, rcond=None)[0]
-                
-                # 创建偏移线
-                offset_line_3 = m3 * (strain + 0.002) + c3
+            if sheet_name in self.excel_data:
+                data = self.excel_data[sheet_name]
                 
-                # 寻找交点
-                for i in range(0, len(stress)-1):
-                    if stress[i] <= offset_line_3[i] and stress[i+1] > offset_line_3[i+1]:
-                        x1, x2 = strain[i], strain[i+1]
-                        y1, y2 = stress[i] - offset_line_3[i], stress[i+1] - offset_line_3[i+1]
-                        
-                        if y1 * y2 < 0:
-                            t = -y1 / (y2 - y1)
-                            yield_strain = x1 + t * (x2 - x1)
-                            yield_strength = m3 * (yield_strain + 0.002) + c3
-                            return yield_strength, yield_strain
-            
-            # 如果所有方法都失败，返回最大应力的90%作为近似
-            if len(stress) > 0:
-                max_stress = np.max(stress)
-                max_strain = strain[np.argmax(stress)]
-                return 0.9 * max_stress, max_strain * 0.9
-            
-            return None, None
-            
-        except Exception as e:
-            print(f"屈服强度计算错误: {e}")
-            # 如果scipy导入失败，尝试不使用它的版本
-            try:
-                # 简化版实现，不使用scipy
-                window_size = min(15, len(stress) // 8)
-                if window_size < 5:
-                    window_size = 5
+                # 更新预览文本框
+                self.preview_text.delete(1.0, tk.END)
                 
-                # 移动平均
-                stress_smooth = np.convolve(stress, np.ones(window_size)/window_size, mode='valid')
-                strain_smooth = strain[window_size-1:]
+                # 显示前30行数据
+                preview_lines = min(30, len(data))
+                self.preview_text.insert(1.0, f"Sheet: {sheet_name}\n")
+                self.preview_text.insert(tk.END, f"数据行数: {len(data)}\n")
+                if sheet_name in self.qc_flags:
+                    self.preview_text.insert(tk.END, describe_quality_flags(self.qc_flags[sheet_name]) + "\n")
+                if sheet_name in self.duplicate_sheets:
+                    self.preview_text.insert(tk.END, f"重复试样: {self.duplicate_sheets[sheet_name]}\n")
+                self.preview_text.insert(tk.END, "="*50 + "\n")
+                self.preview_text.insert(tk.END, "载荷(N)              位移(mm)\n")
+                self.preview_text.insert(tk.END, "-"*50 + "\n")
                 
-                # 使用更大的初始窗口和容忍度
-                initial_window = min(30, len(stress_smooth) // 3)
-                x_elastic = strain_smooth[:initial_window]
-                y_elastic = stress_smooth[:initial_window]
+                for i in range(preview_lines):
+                    self.preview_text.insert(tk.END, f"{data.iloc[i, 0]:>12.2f}        {data.iloc[i, 1]:>12.4f}\n")
                 
-                if len(x_elastic) >= 5:
-                    A = np.vstack([x_elastic, np.ones(len(x_elastic))]).T
-                    m, c = np.linalg.lstsq(A, y_elastic, rcond=None)[0]
-                    
-                    offset_line = m * (strain + 0.002) + c
-                    
-                    for i in range(0, len(stress)-1):
-                        if stress[i] <= offset_line[i] and stress[i+1] > offset_line[i+1]:
-                            x1, x2 = strain[i], strain[i+1]
-                            y1, y2 = stress[i] - offset_line[i], stress[i+1] - offset_line[i+1]
-                            
-                            if y1 * y2 < 0:
-                                t = -y1 / (y2 - y1)
-                                yield_strain = x1 + t * (x2 - x1)
-                                yield_strength = m * (yield_strain + 0.002) + c
-                                return yield_strength, yield_strain
+                if len(data) > preview_lines:
+                    self.preview_text.insert(tk.END, f"\n... 还有 {len(data) - preview_lines} 行数据\n")
                 
-                # 最后尝试：使用最大应力的85-90%作为近似
-                if len(stress) > 0:
-                    max_stress = np.max(stress)
-                    return 0.88 * max_stress, strain[np.argmax(stress)] * 0.88
-            except Exception as e2:
-                print(f"简化版计算也失败: {e2}")
-            
-            return None, None
+                # 显示该sheet的结果和曲线（已预取时直接取缓存），再预取接下来可能查看的sheet
+                self.collect_prefetched()
+                if sheet_name in self.cross_sectional_areas:
+                    self.process_current_sheet()
+                else:
+                    self.plot_sheet_data(data, sheet_name)
+                self.schedule_prefetch(self.previous_sheet_name)
+                self.previous_sheet_name = sheet_name
+    
+    def schedule_prefetch(self, previous=None):
+        """按当前sheet和切换方向预测接下来可能查看的sheet，交给后台线程计算结果和降采样曲线"""
+        if self.prefetch_sheets <= 0:
+            return
+        names = [name for name in self.excel_data if name in self.cross_sectional_areas]
+        keys = {name: self.result_key(name) for name in names}
+        cached = {name for name in names if self.sheet_results.get(name, (None,))[0] == keys[name]
+                  and self.plot_cache.get(name, (None,))[0] == keys[name]}
+        predicted = predict_next_sheets(names, self.current_sheet_name, previous, cached, self.prefetch_sheets)
+        self.prefetcher.schedule([(name, self.prefetch_job(name, keys[name])) for name in predicted])
+    
+    def prefetch_job(self, sheet_name, key):
+        """在界面线程中取出计算所需的数组和参数，返回在后台线程执行的任务"""
+        load, displacement = self.trimmed_arrays(sheet_name)
+        pipeline = PreprocessPipeline(self.sheet_preprocess(sheet_name), self.preprocess_cache,
+                                      {'gauge_length': self.gauge_length})
+        area = self.cross_sectional_areas[sheet_name]
+        gauge_length = self.gauge_length
+        options = (list(self.proof_offsets), list(self.total_offsets), self.yield_method, self.yield_time_budget,
+                   self.qc_enabled)
+        test_range = self.test_ranges.get(sheet_name)
+        max_points = self.plot_max_points
+        generation = self.data_generation
+        # 已有结果（结果缓存或内容索引）时后台只做预处理和降采样
+        cached = self.sheet_results.get(sheet_name)
+        known = dict(cached[1]) if cached is not None and cached[0] == key else self.indexed_results(sheet_name)
+        
+        def job():
+            with self.perf.stage('prefetch', sheet=sheet_name, rows=len(load)):
+                processed_load, processed_displacement, rows = pipeline.apply(load, displacement)
+                if known is not None:
+                    results = known
+                else:
+                    results = compute_specimen_properties(processed_load, processed_displacement, area,
+                                                          gauge_length, *options, trim=False)
+                    if test_range is not None:
+                        results['test_range'] = test_range
+                curve = downsample_minmax(processed_displacement / gauge_length, processed_load / area, max_points)
+            return generation, key, results, rows, curve
+        return job
+    
+    def collect_prefetched(self):
+        """取走后台预取完成的结果；计算条件已变的丢弃"""
+        while True:
+            try:
+                sheet_name, (generation, key, results, rows, curve) = self.prefetcher.results.get_nowait()
+            except queue.Empty:
+                return
+            if (generation != self.data_generation or sheet_name not in self.excel_data
+                    or key != self.result_key(sheet_name)):
+                continue
+            self.sheet_results[sheet_name] = (key, results)
+            if self.specimen_index.get(self.sheet_hashes.get(sheet_name), (None,))[0] != self.index_key(sheet_name):
+                self.remember_results({sheet_name: results})
+            self.plot_cache[sheet_name] = (key, *curve)
+            if rows is None:
+                self.preprocess_rows.pop(sheet_name, None)
+            else:
+                self.preprocess_rows[sheet_name] = rows
+    
+    def display_curve(self, sheet_name, strain, stress):
+        """绘图用的降采样应力-应变曲线，优先取预取的结果"""
+        key = self.result_key(sheet_name)
+        cached = self.plot_cache.get(sheet_name)
+        if cached is None or cached[0] != key:
+            cached = (key, *downsample_minmax(strain, stress, self.plot_max_points))
+            self.plot_cache[sheet_name] = cached
+        return cached[1], cached[2]
+    
+    def prepare_loaded_sheets(self):
+        """识别已加载sheet的试验有效区间（保存在 test_ranges 中），并在区间内做质量预检"""
+        self.test_ranges = {}
+        self.qc_flags = {}
+        rows = sum(len(data) for data in self.excel_data.values())
+        with self.perf.stage('trim', rows=rows, specimens=len(self.excel_data)) as info:
+            arrays = {sheet_name: self.sheet_arrays(sheet_name) for sheet_name in self.excel_data}
+            info['kept_rows'] = sum(len(load) for load, _ in arrays.values())
+        if not self.qc_enabled:
+            return
+        with self.perf.stage('quality_screen', rows=info['kept_rows'], specimens=len(arrays)):
+            for sheet_name, (load, displacement) in arrays.items():
+                codes = screen_curve_quality(load, displacement)
+                if codes:
+                    self.qc_flags[sheet_name] = codes
+    
+    def sheet_arrays(self, sheet_name):
+        """返回sheet截取到试验有效区间并经过预处理的 (载荷, 位移) 数组；未配置预处理时为原数据的视图"""
+        load, displacement = self.trimmed_arrays(sheet_name)
+        spec = self.sheet_preprocess(sheet_name)
+        if not spec:
+            self.preprocess_rows.pop(sheet_name, None)
+            return load, displacement
+        pipeline = PreprocessPipeline(spec, self.preprocess_cache, {'gauge_length': self.gauge_length})
+        load, displacement, rows = pipeline.apply(load, displacement, self.perf)
+        if rows is None:
+            self.preprocess_rows.pop(sheet_name, None)
+        else:
+            self.preprocess_rows[sheet_name] = rows
+        return load, displacement
+    
+    def sheet_preprocess(self, sheet_name):
+        """sheet的预处理配置：所用列映射模板自带的配置，否则为全局配置"""
+        template = self.column_templates.get(self.sheet_signatures.get(sheet_name), {})
+        return template.get('preprocess') or self.preprocess
+    
+    def trimmed_arrays(self, sheet_name):
+        """返回sheet截取到试验有效区间的 (载荷, 位移) 数组视图"""
+        data = self.excel_data[sheet_name]
+        load = data['Load_N'].values
+        displacement = data['Displacement_mm'].values
+        if not self.trim_enabled:
+            return load, displacement
+        if sheet_name not in self.test_ranges:
+            self.test_ranges[sheet_name] = detect_test_range(load)
+        start, stop = self.test_ranges[sheet_name]
+        return load[start:stop], displacement[start:stop]
+    
+    def calculate_yield_strength_robust(self, stress, strain):
+        """更鲁棒的屈服强度计算方法 (0.2% 偏移法)"""
+        proof_strengths = calculate_proof_strengths(stress, strain, offsets=[0.002], total_offsets=[])
+        return proof_strengths.get('Rp0.2', (None, None))
+    
+    def calculate_proof_strengths(self, stress, strain):
+        """按配置的偏移量一次计算所有规定塑性/总延伸强度"""
+        return calculate_proof_strengths(stress, strain, self.proof_offsets, self.total_offsets)
+    
+    def calculate_batch_properties(self):
+        """用批量内核一次计算所有已设置横截面积的sheet，逐个返回 (sheet名称, 结果字典)
+        
+        计算条件未变的sheet直接取结果缓存，内容相同的试样复用内容索引中的结果，只把其余的sheet交给批量内核。
+        """
+        sheet_names = [name for name in self.excel_data if name in self.cross_sectional_areas]
+        keys = {sheet_name: self.result_key(sheet_name) for sheet_name in sheet_names}
+        for sheet_name in sheet_names:
+            if self.sheet_results.get(sheet_name, (None,))[0] != keys[sheet_name]:
+                reused = self.indexed_results(sheet_name)
+                if reused is not None:
+                    self.sheet_results[sheet_name] = (keys[sheet_name], reused)
+        specimens = [(sheet_name, *self.sheet_arrays(sheet_name), self.cross_sectional_areas[sheet_name])
+                     for sheet_name in sheet_names
+                     if self.sheet_results.get(sheet_name, (None,))[0] != keys[sheet_name]]
+        if specimens:
+            table = compute_batch_properties(specimens, self.gauge_length, self.proof_offsets, self.total_offsets,
+                                             recorder=self.perf, yield_method=self.yield_method,
+                                             time_budget=self.yield_time_budget, qc=self.qc_enabled, trim=False)
+            computed = {}
+            for sheet_name, results in iter_batch_results(table):
+                # 计算用的是区间视图，记录相对原始数据的区间
+                results['test_range'] = self.test_ranges.get(sheet_name, results['test_range'])
+                self.sheet_results[sheet_name] = (keys[sheet_name], results)
+                computed[sheet_name] = results
+            self.remember_results(computed)
+        for sheet_name in sheet_names:
+            yield sheet_name, dict(self.sheet_results[sheet_name][1])
     
     def calculate_tensile_properties(self, data, sheet_name):
         """计算拉伸性能参数"""
+        results = self.calculate_all_properties(data, sheet_name)
+        return (results['yield_strength'], results['tensile_strength'],
+                results['elongation'], results['error_msg'])
+    
+    def calculate_all_properties(self, data, sheet_name):
+        """计算拉伸性能参数，返回包含规定延伸强度及扩展性能的结果字典"""
         if data is None or len(data) < 20:
-            return None, None, None, "数据量不足（至少需要20个数据点）"
+            return empty_results("数据量不足（至少需要20个数据点）")
         
-        load = data['Load_N'].values
-        displacement = data['Displacement_mm'].values
+        load, displacement = self.sheet_arrays(sheet_name)
         
         # 检查数据有效性
         if len(load) == 0 or len(displacement) == 0:
-            return None, None, None, "数据为空"
+            return empty_results("数据为空")
         
         # 检查是否设置了该sheet的横截面积
         if sheet_name not in self.cross_sectional_areas:
-            return None, None, None, f"未设置Sheet '{sheet_name}'的横截面积"
+            return empty_results(f"未设置Sheet '{sheet_name}'的横截面积")
         
-        cross_sectional_area = self.cross_sectional_areas[sheet_name]
+        key = self.result_key(sheet_name)
+        cached = self.sheet_results.get(sheet_name)
+        if cached is not None and cached[0] == key:
+            return dict(cached[1])
+        reused = self.indexed_results(sheet_name)
+        if reused is not None:
+            self.sheet_results[sheet_name] = (key, reused)
+            return dict(reused)
         
-        try:
-            # 计算工程应力和工程应变
-            stress = load / cross_sectional_area  # MPa
-            strain = displacement / self.gauge_length
-            
-            # 抗拉强度（最大应力）
-            tensile_strength = np.max(stress)
-            
-            # 屈服强度（使用鲁棒的方法）
-            yield_strength, yield_strain = self.calculate_yield_strength_robust(stress, strain)
-            
-            # 延伸率（最大应变对应的延伸率）
-            max_strain = np.max(strain)
-            elongation = max_strain * 100  # 转换为百分比
-            
-            error_msg = ""
-            if yield_strength is None:
-                error_msg = "屈服强度计算失败"
-            
-            return yield_strength, tensile_strength, elongation, error_msg
-            
-        except Exception as e:
-            return None, None, None, f"计算错误: {str(e)}"
+        with self.perf.stage('compute', sheet=sheet_name, rows=len(load)):
+            results = compute_specimen_properties(load, displacement, self.cross_sectional_areas[sheet_name],
+                                                  self.gauge_length, self.proof_offsets, self.total_offsets,
+                                                  self.yield_method, self.yield_time_budget, self.qc_enabled,
+                                                  trim=False)
+        results['test_range'] = self.test_ranges.get(sheet_name, results['test_range'])
+        self.perf.note('yield_method', results['yield_method'] or 'none')
+        self.sheet_results[sheet_name] = (key, dict(results))
+        self.remember_results({sheet_name: results})
+        return results
+    
+    def result_key(self, sheet_name):
+        """结果缓存的计算条件：面积、标距、偏移量、算法设置和有效区间都相同时直接复用结果"""
+        self.trimmed_arrays(sheet_name)
+        return specimen_result_key(len(self.excel_data[sheet_name]), self.cross_sectional_areas.get(sheet_name),
+                                   self.gauge_length, self.proof_offsets, self.total_offsets, self.yield_method,
+                                   self.yield_time_budget, self.qc_enabled, self.trim_enabled,
+                                   self.test_ranges.get(sheet_name), self.sheet_preprocess(sheet_name))
     
     def process_current_sheet(self):
         """处理当前选中的sheet数据"""
@@ -850,7 +5487,11 @@ class TensileTestAnalyzer:
         data = self.excel_data[self.current_sheet_name]
         
         # 计算性能参数
-        yield_strength, tensile_strength, elongation, error_msg = self.calculate_tensile_properties(data, self.current_sheet_name)
+        sheet_results = self.calculate_all_properties(data, self.current_sheet_name)
+        yield_strength = sheet_results['yield_strength']
+        tensile_strength = sheet_results['tensile_strength']
+        elongation = sheet_results['elongation']
+        error_msg = sheet_results['error_msg']
         
         # 显示结果
         self.results_text.config(state='normal')
@@ -875,11 +5516,41 @@ class TensileTestAnalyzer:
         if elongation:
             results += f"延伸率 (A): {elongation:.2f} %\n"
         
+        results += self.format_proof_strengths(sheet_results['proof_strengths'])
+        results += self.format_extended_properties(sheet_results)
+        
         self.results_text.insert(1.0, results)
         self.results_text.config(state='disabled')
         
         # 绘制曲线
-        self.plot_sheet_data(data, self.current_sheet_name)
+        with self.perf.stage('plot', sheet=self.current_sheet_name, rows=len(data)):
+            self.plot_sheet_data(data, self.current_sheet_name)
+    
+    def format_proof_strengths(self, proof_strengths):
+        """格式化规定延伸强度结果文本"""
+        text = ""
+        for label, value in proof_strengths.items():
+            if value is not None:
+                text += f"{label}: {value:.2f} MPa\n"
+        return text
+    
+    def format_extended_properties(self, results):
+        """格式化 Ag、At、拉伸韧性和 n 值结果文本"""
+        text = ""
+        if results['uniform_elongation'] is not None:
+            text += f"最大力塑性延伸率 (Ag): {results['uniform_elongation']:.2f} %\n"
+        if results['fracture_elongation'] is not None:
+            text += f"断裂总延伸率 (At): {results['fracture_elongation']:.2f} %\n"
+        if results['toughness'] is not None:
+            text += f"拉伸韧性: {results['toughness']:.2f} MJ/m³\n"
+        if results['n_value'] is not None:
+            text += f"应变硬化指数 (n): {results['n_value']:.3f}\n"
+        if results.get('yield_method'):
+            text += f"屈服计算方法: {YIELD_METHOD_NAMES.get(results['yield_method'], results['yield_method'])}"
+            if results.get('yield_elapsed') is not None:
+                text += f" ({results['yield_algorithm']}, {results['yield_elapsed'] * 1000:.1f} ms)"
+            text += "\n"
+        return text
     
     def process_all_sheets(self):
         """批量处理所有sheet数据"""
@@ -895,23 +5566,30 @@ class TensileTestAnalyzer:
                 f"以下sheet未设置横截面积:\n" + "\n".join(sheets_without_area) + 
                 "\n\n将跳过这些sheet的计算。")
         
-        # 处理所有sheet
+        # 处理所有sheet（批量内核一次计算）
         all_results = []
         
-        for sheet_name, data in self.excel_data.items():
-            if sheet_name not in self.cross_sectional_areas:
-                continue
-            
-            yield_strength, tensile_strength, elongation, error_msg = self.calculate_tensile_properties(data, sheet_name)
+        for sheet_name, sheet_results in self.calculate_batch_properties():
+            data = self.excel_data[sheet_name]
             
             all_results.append({
                 'sheet_name': sheet_name,
                 'data_points': len(data),
                 'cross_sectional_area': self.cross_sectional_areas[sheet_name],
-                'yield_strength': yield_strength,
-                'tensile_strength': tensile_strength,
-                'elongation': elongation,
-                'error_msg': error_msg
+                'yield_strength': sheet_results['yield_strength'],
+                'tensile_strength': sheet_results['tensile_strength'],
+                'elongation': sheet_results['elongation'],
+                'proof_strengths': sheet_results['proof_strengths'],
+                'uniform_elongation': sheet_results['uniform_elongation'],
+                'fracture_elongation': sheet_results['fracture_elongation'],
+                'toughness': sheet_results['toughness'],
+                'n_value': sheet_results['n_value'],
+                'yield_method': sheet_results['yield_method'],
+                'yield_algorithm': sheet_results['yield_algorithm'],
+                'yield_elapsed': sheet_results['yield_elapsed'],
+                'qc_flags': sheet_results['qc_flags'],
+                'test_range': sheet_results['test_range'],
+                'error_msg': sheet_results['error_msg']
             })
         
         if not all_results:
@@ -929,6 +5607,8 @@ class TensileTestAnalyzer:
             results_text += f"Sheet: {result['sheet_name']}\n"
             results_text += f"数据点数: {result['data_points']}\n"
             results_text += f"横截面积: {result['cross_sectional_area']} mm²\n"
+            if result['sheet_name'] in self.duplicate_sheets:
+                results_text += f"重复试样: {self.duplicate_sheets[result['sheet_name']]}\n"
             
             if result['yield_strength']:
                 results_text += f"屈服强度: {result['yield_strength']:.2f} MPa\n"
@@ -943,25 +5623,49 @@ class TensileTestAnalyzer:
             if result['elongation']:
                 results_text += f"延伸率: {result['elongation']:.2f} %\n"
             
+            results_text += self.format_proof_strengths(result['proof_strengths'])
+            results_text += self.format_extended_properties(result)
+            
             results_text += "-"*40 + "\n\n"
         
+        # 批次统计
+        self.lot_statistics = self.compute_lot_statistics(
+            [(result['sheet_name'], result) for result in all_results])
+        results_text += "批次统计:\n" + "="*60 + "\n"
+        results_text += format_lot_statistics(self.lot_statistics, self.stat_confidence)
+        
         self.multi_results_text.insert(1.0, results_text)
         self.multi_results_text.config(state='disabled')
         
         # 绘制所有sheet的曲线对比
-        self.plot_all_sheets()
+        with self.perf.stage('plot', rows=sum(result['data_points'] for result in all_results)):
+            self.plot_all_sheets()
         
         messagebox.showinfo("完成", f"已处理 {len(all_results)} 个sheet的数据")
     
+    def compute_lot_statistics(self, results):
+        """由 (sheet名称, 结果字典) 列表计算批次统计：按批号（lot_pattern）或工作簿分组"""
+        workbook = os.path.splitext(os.path.basename(self.current_excel_path or "当前数据"))[0]
+        table = pd.DataFrame([{
+            'sheet_name': sheet_name,
+            'group': lot_from_name(sheet_name, self.lot_pattern) or workbook,
+            **{column: sheet_results[column] for column, _, _ in LOT_STAT_PROPERTIES}
+        } for sheet_name, sheet_results in results])
+        with self.perf.stage('statistics', specimens=len(table), resamples=self.stat_resamples):
+            return compute_lot_statistics(table, 'group', self.spec_limits, self.stat_resamples,
+                                          self.stat_confidence)
+    
     def plot_sheet_data(self, data, sheet_name):
         """绘制单个sheet的载荷-位移曲线"""
         if data is None or len(data) < 2:
             return
         
+        self.plot_mode = 'sheet'
         self.ax.clear()
+        self.curve_cursor.reset()
         
-        load = data['Load_N'].values
-        displacement = data['Displacement_mm'].values
+        load, displacement = self.sheet_arrays(sheet_name)
+        row_offset = self.test_ranges.get(sheet_name, (0, 0))[0]
         
         # 计算应力和应变
         if sheet_name in self.cross_sectional_areas:
@@ -971,7 +5675,9 @@ class TensileTestAnalyzer:
             
             # 绘制应力-应变曲线
             legend_text = self.legend_texts.get(sheet_name, sheet_name)
-            self.ax.plot(strain, stress, 'b-', linewidth=2.5, label=legend_text)
+            self.ax.plot(*self.display_curve(sheet_name, strain, stress), 'b-', linewidth=2.5, label=legend_text)
+            curve_index = self.curve_cursor.add_curve(legend_text, strain, stress, load, row_offset=row_offset,
+                                                      rows=self.preprocess_rows.get(sheet_name))
             
             # 标记关键点
             max_stress_idx = np.argmax(stress)
@@ -979,21 +5685,13 @@ class TensileTestAnalyzer:
                 self.ax.plot(strain[max_stress_idx], stress[max_stress_idx], 'ro', 
                            markersize=10, label=f'抗拉强度: {stress[max_stress_idx]:.1f} MPa')
             
-            # 计算并标记屈服点（确保与计算结果一致）
-            yield_strength, yield_strain = self.calculate_yield_strength_robust(stress, strain)
-            if yield_strength and yield_strain:
-                # 确保屈服点在曲线上，找到最接近的点（同时考虑应变和应力）
-                # 首先找到最大应力点，屈服点应该在最大应力点之前
-                max_stress_idx = np.argmax(stress)
-                
-                # 只在最大应力点之前的区域搜索屈服点
-                search_region_strain = strain[:max_stress_idx+1]
-                search_region_stress = stress[:max_stress_idx+1]
-                
-                # 计算搜索区域内每个数据点到计算点的欧几里得距离
-                distances = np.sqrt((search_region_strain - yield_strain)**2 + (search_region_stress - yield_strength)**2)
-                closest_idx_in_region = np.argmin(distances)
-                closest_idx = closest_idx_in_region  # 转换回原始数组的索引
+            # 标记屈服点：取与结果表相同的 Rp0.2（按所选屈服算法），未通过质量预检的sheet不标记
+            sheet_results = self.calculate_all_properties(data, sheet_name)
+            yield_strength = sheet_results['yield_strength']
+            yield_strain = sheet_results['yield_strain']
+            if yield_strength and yield_strain and not sheet_results['qc_flags']:
+                # 确保屈服点在曲线上，在最大应力点之前找到最接近的点（同时考虑应变和应力）
+                closest_idx = locate_yield_marker(strain, stress, yield_strain, yield_strength, curve_index)
                 
                 closest_yield_strain = strain[closest_idx]
                 closest_yield_strength = stress[closest_idx]
@@ -1016,7 +5714,11 @@ class TensileTestAnalyzer:
         else:
             # 直接绘制载荷-位移曲线
             legend_text = self.legend_texts.get(sheet_name, sheet_name)
-            self.ax.plot(displacement, load, 'b-', linewidth=2.5, label=legend_text)
+            self.ax.plot(*downsample_minmax(displacement, load, self.plot_max_points), 'b-', linewidth=2.5,
+                         label=legend_text)
+            self.curve_cursor.add_curve(legend_text, displacement, load, x_label='位移 (mm)',
+                                        y_label='载荷 (N)', row_offset=row_offset,
+                                        rows=self.preprocess_rows.get(sheet_name))
             self.ax.set_xlabel('位移 (mm)', fontsize=14)
             self.ax.set_ylabel('载荷 (N)', fontsize=14)
             
@@ -1034,11 +5736,13 @@ class TensileTestAnalyzer:
         if not self.excel_data:
             return
         
+        self.plot_mode = 'all'
         self.ax.clear()
+        self.curve_cursor.reset()
         
         # 定义颜色和线型
-        colors = ['blue', 'green', 'red', 'cyan', 'magenta', 'orange', 'purple', 'brown']
-        linestyles = ['-', '--', '-.', ':']
+        colors = PLOT_COLORS
+        linestyles = PLOT_LINESTYLES
         
         # 绘制每个sheet的曲线
         for i, (sheet_name, data) in enumerate(self.excel_data.items()):
@@ -1048,8 +5752,7 @@ class TensileTestAnalyzer:
             if sheet_name not in self.cross_sectional_areas:
                 continue
             
-            load = data['Load_N'].values
-            displacement = data['Displacement_mm'].values
+            load, displacement = self.sheet_arrays(sheet_name)
             
             cross_sectional_area = self.cross_sectional_areas[sheet_name]
             stress = load / cross_sectional_area
@@ -1061,8 +5764,177 @@ class TensileTestAnalyzer:
             # 使用自定义的图例文本
             legend_text = self.legend_texts.get(sheet_name, sheet_name)
             
-            self.ax.plot(strain, stress, color=color, linestyle=linestyle, 
+            self.ax.plot(*self.display_curve(sheet_name, strain, stress), color=color, linestyle=linestyle, 
                        linewidth=2, label=legend_text, alpha=0.8)
+            self.curve_cursor.add_curve(legend_text, strain, stress, load,
+                                        row_offset=self.test_ranges.get(sheet_name, (0, 0))[0],
+                                        rows=self.preprocess_rows.get(sheet_name))
+        
+        # 设置图形属性 - 去除标题
+        self.ax.set_xlabel('应变', fontsize=14)
+        self.ax.set_ylabel('应力 (MPa)', fontsize=14)
+        
+        # 设置刻度字体
+        self.ax.tick_params(axis='both', which='major', labelsize=12)
+        
+        self.ax.grid(True, alpha=0.3, linestyle='--')
+        self.ax.legend(loc='best', fontsize=11)
+        
+        self.fig.tight_layout()
+        self.canvas.draw()
+    
+    def on_curve_pick(self, curve, row, text):
+        """单击拾取曲线点：把该点数值追加到计算结果区域"""
+        self.results_text.config(state='normal')
+        self.results_text.insert(tk.END, f"\n拾取点（第 {row + 1} 行）: " + "，".join(text.split("\n")) + "\n")
+        self.results_text.see(tk.END)
+        self.results_text.config(state='disabled')
+    
+    def toggle_live_acquisition(self):
+        """开始或停止实时采集"""
+        if self.live_reader is not None:
+            self.live_reader.stop()
+            return
+        
+        source = simpledialog.askstring("实时采集", "数据源 (udp://主机:端口、tcp://主机:端口 或命名管道路径):",
+                                        initialvalue=self.live_source, parent=self.root)
+        if not source:
+            return
+        area = simpledialog.askfloat("实时采集", "横截面积 (mm²):", minvalue=1e-9, parent=self.root)
+        if not area:
+            return
+        self.live_source = source
+        
+        self.live_stream = LiveTensileStream(area, self.gauge_length, self.proof_offsets, self.total_offsets)
+        self.live_queue = queue.Queue()
+        self.live_reader = LiveSourceReader(source, self.live_queue)
+        self.live_reader.start()
+        self.live_button.config(text="停止采集")
+        
+        # 准备实时曲线
+        self.ax.clear()
+        self.curve_cursor.reset()
+        self.live_line, = self.ax.plot([], [], 'b-', linewidth=2, label='实时曲线')
+        self.ax.set_xlabel('应变', fontsize=14)
+        self.ax.set_ylabel('应力 (MPa)', fontsize=14)
+        self.ax.tick_params(axis='both', which='major', labelsize=12)
+        self.ax.grid(True, alpha=0.3, linestyle='--')
+        self.ax.legend(loc='best', fontsize=12)
+        self.canvas.draw()
+        
+        self.root.after(self.live_frame_interval, self.update_live_view)
+    
+    def update_live_view(self):
+        """按固定帧率取出队列中的样本，增量更新指标并刷新曲线"""
+        finished = False
+        while True:
+            try:
+                samples = self.live_queue.get_nowait()
+            except queue.Empty:
+                break
+            if samples is None:
+                finished = True
+                break
+            self.live_stream.extend(samples)
+        
+        stream = self.live_stream
+        if stream.count:
+            # 点数过多时抽稀显示
+            step = max(1, stream.count // 5000)
+            self.live_line.set_data(stream.displacement[::step] / self.gauge_length,
+                                    stream.load[::step] / stream.cross_sectional_area)
+            self.ax.relim()
+            self.ax.autoscale_view()
+            self.canvas.draw_idle()
+            
+            snapshot = stream.snapshot()
+            text = f"实时采集: {self.live_source}\n"
+            text += f"数据点数: {snapshot['count']}\n"
+            text += "="*40 + "\n"
+            text += f"抗拉强度 (Rm): {snapshot['tensile_strength']:.2f} MPa\n"
+            text += f"延伸率 (A): {snapshot['elongation']:.2f} %\n"
+            if snapshot['modulus']:
+                text += f"弹性模量: {snapshot['modulus']:.0f} MPa\n"
+            text += self.format_proof_strengths(snapshot['proof_strengths'])
+            self.results_text.config(state='normal')
+            self.results_text.delete(1.0, tk.END)
+            self.results_text.insert(1.0, text)
+            self.results_text.config(state='disabled')
+        
+        if finished:
+            self.finish_live_acquisition()
+        else:
+            self.root.after(self.live_frame_interval, self.update_live_view)
+    
+    def finish_live_acquisition(self):
+        """数据流结束：将采集数据作为新sheet加入，并按常规流程计算最终结果"""
+        stream = self.live_stream
+        self.live_reader = None
+        self.live_button.config(text="实时采集")
+        
+        if stream.count < 20:
+            messagebox.showwarning("警告", f"实时采集结束，仅收到 {stream.count} 个数据点")
+            return
+        
+        sheet_name = f"实时采集_{time.strftime('%H%M%S')}"
+        self.excel_data[sheet_name] = stream.to_dataframe()
+        self.test_ranges.pop(sheet_name, None)
+        self.sheet_results.pop(sheet_name, None)
+        self.plot_cache.pop(sheet_name, None)
+        self.cross_sectional_areas[sheet_name] = stream.cross_sectional_area
+        self.legend_texts[sheet_name] = sheet_name
+        
+        self.sheet_combobox['values'] = list(self.excel_data.keys())
+        self.sheet_combobox.set(sheet_name)
+        self.on_sheet_select(None)
+        self.process_current_sheet()
+    
+    def get_resampled_curves(self):
+        """获取所有已设置横截面积的sheet在共享应变网格上的重采样结果（带缓存）"""
+        sheet_names = [name for name, data in self.excel_data.items()
+                       if name in self.cross_sectional_areas and len(data) >= 10]
+        if not sheet_names:
+            return None
+        
+        key = (self.current_excel_path, tuple(sheet_names),
+               tuple(self.cross_sectional_areas[name] for name in sheet_names),
+               tuple(len(self.excel_data[name]) for name in sheet_names),
+               self.gauge_length, self.envelope_grid_points, self.trim_enabled,
+               json.dumps([self.sheet_preprocess(name) for name in sheet_names]))
+        if key not in self.resample_cache:
+            curves = [(load / self.cross_sectional_areas[name], displacement / self.gauge_length)
+                      for name in sheet_names
+                      for load, displacement in [self.sheet_arrays(name)]]
+            grid, resampled = resample_to_strain_grid(curves, self.envelope_grid_points)
+            self.resample_cache[key] = {
+                'sheet_names': sheet_names,
+                'grid': grid,
+                'resampled': resampled,
+                'envelope': compute_envelope(resampled)
+            }
+        return self.resample_cache[key]
+    
+    def plot_envelope(self):
+        """绘制所有sheet的平均代表曲线及最小/最大、±σ包络"""
+        resampled = self.get_resampled_curves()
+        if resampled is None:
+            messagebox.showinfo("提示", "请先加载数据并设置横截面积")
+            return
+        
+        self.plot_mode = 'envelope'
+        self.ax.clear()
+        self.curve_cursor.reset()
+        
+        grid = resampled['grid']
+        envelope = resampled['envelope']
+        
+        self.ax.fill_between(grid, envelope['min'], envelope['max'], color='gray', alpha=0.15,
+                             label='最小/最大')
+        self.ax.fill_between(grid, envelope['lower'], envelope['upper'], color='blue', alpha=0.25,
+                             label='平均值 ± σ')
+        self.ax.plot(grid, envelope['mean'], 'b-', linewidth=2.5,
+                     label=f"平均曲线 (n={len(resampled['sheet_names'])})")
+        self.curve_cursor.add_curve("平均曲线", grid, envelope['mean'])
         
         # 设置图形属性 - 去除标题
         self.ax.set_xlabel('应变', fontsize=14)
@@ -1130,10 +6002,13 @@ class TensileTestAnalyzer:
     
     def save_legend_texts(self, edit_window):
         """保存图例文本"""
+        changed = {}
         for sheet_name, entry_var in self.legend_entries.items():
             new_text = entry_var.get().strip()
-            if new_text:
+            if new_text and new_text != self.legend_texts.get(sheet_name):
                 self.legend_texts[sheet_name] = new_text
+                changed[sheet_name] = {'legend': new_text}
+        self.store_parameters(changed)
         
         edit_window.destroy()
         
@@ -1147,6 +6022,7 @@ class TensileTestAnalyzer:
         """重置图例文本为sheet名称"""
         for sheet_name in self.excel_data.keys():
             self.legend_texts[sheet_name] = sheet_name
+        self.store_parameters({name: {'legend': name} for name in self.excel_data})
         
         # 重新绘制图形
         if self.current_sheet_name:
@@ -1158,7 +6034,7 @@ class TensileTestAnalyzer:
         """保存图表"""
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG文件", "*.png"), ("PDF文件", "*.pdf"), ("所有文件", "*.*")]
+            filetypes=[("PNG文件", "*.png"), ("PDF文件", "*.pdf"), ("SVG文件", "*.svg"), ("所有文件", "*.*")]
         )
         
         if file_path:
@@ -1170,14 +6046,16 @@ class TensileTestAnalyzer:
                 # 强制使用特定字体
                 rcParams['font.sans-serif'] = ['SimSun', 'DejaVu Sans']
                 
-                # 设置保存图形的DPI和质量
-                dpi = 1200
-                if file_path.endswith('.png'):
-                    self.fig.savefig(file_path, dpi=dpi, bbox_inches='tight', 
-                                   facecolor='white', edgecolor='none')
-                else:
-                    self.fig.savefig(file_path, dpi=dpi, bbox_inches='tight', 
+                # 设置保存图形的DPI；矢量格式中的曲线按配置栅格化
+                rasterize = self.report_rasterized and not file_path.lower().endswith('.png')
+                lines = self.ax.get_lines()
+                for line in lines:
+                    line.set_rasterized(rasterize)
+                with self.perf.stage('save_plot', format=os.path.splitext(file_path)[1], dpi=self.plot_dpi):
+                    self.fig.savefig(file_path, dpi=self.plot_dpi, bbox_inches='tight', 
                                    facecolor='white', edgecolor='none')
+                for line in lines:
+                    line.set_rasterized(False)
                 
                 # 恢复字体设置
                 rcParams['font.sans-serif'] = original_font
@@ -1187,6 +6065,433 @@ class TensileTestAnalyzer:
             except Exception as e:
                 messagebox.showerror("错误", f"保存图表失败：{str(e)}")
     
+    def generate_report(self):
+        """为所有已设置面积的sheet生成报告图（每个sheet一张图加对比图）和多页PDF"""
+        specimens = [(name, *self.sheet_arrays(name), self.cross_sectional_areas[name])
+                     for name in self.excel_data if name in self.cross_sectional_areas]
+        if not specimens:
+            messagebox.showerror("错误", "没有已设置横截面积的sheet")
+            return
+        
+        output_dir = filedialog.askdirectory(title="选择报告输出文件夹")
+        if not output_dir:
+            return
+        
+        stem = os.path.splitext(os.path.basename(self.current_excel_path or "报告"))[0]
+        pdf_path = os.path.join(output_dir, f"{safe_file_name(stem)}_报告.pdf")
+        formats = ['png', 'svg'] if self.report_rasterized else ['png']
+        legend_texts = dict(self.legend_texts)
+        # 屈服点标记取与结果表相同的计算结果，工作进程中不再计算
+        results = dict(self.calculate_batch_properties())
+        
+        def worker():
+            try:
+                with self.perf.stage('report', rows=sum(len(spec[1]) for spec in specimens),
+                                     specimens=len(specimens)):
+                    render_report(specimens, output_dir, self.gauge_length, legend_texts, formats,
+                                  self.plot_dpi, self.report_rasterized, pdf_path, results=results)
+                self.root.after(0, lambda: messagebox.showinfo("成功", f"报告已生成：{pdf_path}"))
+            except Exception as e:
+                # except 块结束后 e 即被解除绑定，先把消息取出再交给界面线程
+                message = f"生成报告失败：{str(e)}"
+                self.root.after(0, lambda message=message: messagebox.showerror("错误", message))
+        
+        # 渲染在后台进程池中进行，界面保持响应
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def save_workspace(self):
+        """把提取的数组、参数、计算结果、图例文本和图形状态保存为一个工作区文件"""
+        if not self.excel_data:
+            messagebox.showinfo("提示", "请先加载数据")
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".ttaw",
+            filetypes=[("工作区文件", "*.ttaw"), ("所有文件", "*.*")]
+        )
+        if not file_path:
+            return
+        
+        try:
+            if self.workspace_path and os.path.abspath(file_path) == os.path.abspath(self.workspace_path):
+                self.release_workspace_buffers()
+            
+            sheet_names = list(self.excel_data)
+            arrays = {}
+            for i, sheet_name in enumerate(sheet_names):
+                data = self.excel_data[sheet_name]
+                arrays[f"{i}/load"] = data['Load_N'].to_numpy(dtype=float)
+                arrays[f"{i}/displacement"] = data['Displacement_mm'].to_numpy(dtype=float)
+            header = {
+                'version': 1,
+                'saved': time.time(),
+                'source_path': self.current_excel_path,
+                'workbook_fingerprint': self.workbook_fingerprint,
+                'sheets': sheet_names,
+                'cross_sectional_areas': self.cross_sectional_areas,
+                'gauge_length': self.gauge_length,
+                'legend_texts': self.legend_texts,
+                'test_ranges': self.test_ranges,
+                'qc_flags': self.qc_flags,
+                'sheet_signatures': self.sheet_signatures,
+                'sheet_hashes': self.sheet_hashes,
+                'duplicate_sheets': self.duplicate_sheets,
+                'results': {name: list(entry) for name, entry in self.sheet_results.items() if name in self.excel_data},
+                'plot': self.plot_state()
+            }
+            with self.perf.stage('save_workspace', rows=sum(len(data) for data in self.excel_data.values())) as info:
+                info['bytes'] = write_workspace(file_path, header, arrays)
+            messagebox.showinfo("成功", f"工作区已保存到：{file_path}")
+        except Exception as e:
+            messagebox.showerror("错误", f"保存工作区失败：{str(e)}")
+    
+    def plot_state(self):
+        """当前图形的类型、sheet和坐标范围，保存在工作区中，由 restore_plot 恢复"""
+        return {
+            'mode': self.plot_mode,
+            'sheet': self.current_sheet_name,
+            'xlim': list(self.ax.get_xlim()),
+            'ylim': list(self.ax.get_ylim())
+        }
+    
+    def restore_plot(self, plot):
+        """按 plot_state 保存的状态重新绘图并恢复坐标范围"""
+        current_sheet = plot.get('sheet')
+        if plot.get('mode') == 'sheet' and current_sheet in self.excel_data:
+            self.plot_sheet_data(self.excel_data[current_sheet], current_sheet)
+        elif plot.get('mode') == 'all':
+            self.plot_all_sheets()
+        elif plot.get('mode') == 'envelope':
+            self.plot_envelope()
+        if plot.get('mode') in ('sheet', 'all', 'envelope') and plot.get('xlim') and plot.get('ylim'):
+            self.ax.set_xlim(plot['xlim'])
+            self.ax.set_ylim(plot['ylim'])
+            self.canvas.draw()
+    
+    def release_workspace_buffers(self):
+        """覆盖当前打开的工作区前释放对映射文件的全部引用（Windows 上仍被映射的文件不能替换）
+        
+        数组读入内存；丢弃预取任务和结果、绘图/重采样/预处理缓存以及光标登记的曲线，
+        再按原状态重新绘图，之后所有引用都指向内存中的副本。
+        """
+        plot = self.plot_state()
+        self.prefetcher.drain()
+        self.data_generation += 1
+        for sheet_name, data in self.excel_data.items():
+            self.excel_data[sheet_name] = data.copy()
+        self.plot_cache.clear()
+        self.resample_cache.clear()
+        self.preprocess_cache.clear()
+        self.curve_cursor.curves = []
+        self.restore_plot(plot)
+        gc.collect()
+    
+    def load_workspace(self, file_path=None):
+        """打开工作区文件：数组直接内存映射，参数和计算结果原样恢复，不读取原Excel文件"""
+        file_path = file_path or filedialog.askopenfilename(
+            title="选择工作区文件",
+            filetypes=[("工作区文件", "*.ttaw"), ("所有文件", "*.*")]
+        )
+        if not file_path:
+            return
+        
+        try:
+            with self.perf.stage('load_workspace', file=os.path.basename(file_path)) as info:
+                header, arrays = read_workspace(file_path)
+                info['rows'] = sum(len(array) for name, array in arrays.items() if name.endswith('/load'))
+        except Exception as e:
+            messagebox.showerror("错误", f"打开工作区失败：{str(e)}")
+            return
+        
+        self.excel_data = {
+            sheet_name: pd.DataFrame({'Load_N': arrays[f"{i}/load"],
+                                      'Displacement_mm': arrays[f"{i}/displacement"]}, copy=False)
+            for i, sheet_name in enumerate(header['sheets'])
+        }
+        self.workspace_path = file_path
+        self.current_excel_path = header.get('source_path')
+        self.workbook_fingerprint = header.get('workbook_fingerprint')
+        self.cross_sectional_areas = {name: float(area) for name, area in header['cross_sectional_areas'].items()}
+        self.gauge_length = header.get('gauge_length', self.gauge_length)
+        self.legend_texts = dict(header.get('legend_texts', {}))
+        self.test_ranges = {name: tuple(bounds) for name, bounds in header.get('test_ranges', {}).items()}
+        self.qc_flags = dict(header.get('qc_flags', {}))
+        self.sheet_signatures = dict(header.get('sheet_signatures', {}))
+        self.sheet_hashes = dict(header.get('sheet_hashes', {}))
+        self.duplicate_sheets = dict(header.get('duplicate_sheets', {}))
+        self.specimen_index = {}
+        # 计算条件与当前设置一致的结果直接复用，不一致的在下次计算时重算
+        self.sheet_results = {name: tuple(entry) for name, entry in header.get('results', {}).items()}
+        self.resample_cache.clear()
+        self.plot_cache.clear()
+        self.previous_sheet_name = None
+        self.data_generation += 1
+        
+        self.sheet_combobox['values'] = list(self.excel_data.keys())
+        plot = header.get('plot', {})
+        current_sheet = plot.get('sheet') if plot.get('sheet') in self.excel_data else next(iter(self.excel_data), None)
+        if current_sheet is not None:
+            self.sheet_combobox.set(current_sheet)
+        self.create_parameter_inputs()
+        for sheet_name in self.excel_data.keys():
+            self.legend_texts.setdefault(sheet_name, sheet_name)
+        self.on_sheet_select(None)
+        
+        # 恢复图形和坐标范围
+        self.restore_plot({**plot, 'sheet': current_sheet})
+        
+        info_text = (f"已打开工作区: {os.path.basename(file_path)}\n"
+                     f"共 {len(self.excel_data)} 个sheet，总计 {sum(len(data) for data in self.excel_data.values())} 行数据")
+        if self.qc_flags:
+            info_text += f"\n{len(self.qc_flags)} 个sheet未通过质量预检"
+        if self.duplicate_sheets:
+            info_text += f"\n{len(self.duplicate_sheets)} 个sheet与已有试样内容相同或近似"
+        self.preview_info_label.config(text=info_text)
+    
+    def edit_preprocess(self):
+        """编辑全局预处理配置（JSON 步骤列表），确认后重新截取、预检并刷新图形"""
+        edit_window = tk.Toplevel(self.root)
+        edit_window.title("预处理")
+        edit_window.geometry("620x460")
+        
+        stages_text = "\n".join(f"{name}: {description}  默认参数 {json.dumps(defaults, ensure_ascii=False)}"
+                                for name, (_, defaults, _, description) in PREPROCESS_STAGES.items())
+        ttk.Label(edit_window, text="按顺序执行的预处理步骤（JSON 列表，列映射模板自带配置时以模板为准）：\n"
+                  + stages_text, justify=tk.LEFT, wraplength=590).pack(fill=tk.X, padx=10, pady=(10, 5))
+        
+        spec_text = tk.Text(edit_window, height=12, font=("宋体", 11))
+        spec_text.insert(1.0, json.dumps(self.preprocess, ensure_ascii=False, indent=1))
+        spec_text.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        def save():
+            try:
+                self.preprocess = normalize_preprocess_spec(spec_text.get(1.0, tk.END).strip() or '[]')
+            except ValueError as e:
+                messagebox.showerror("错误", f"预处理配置有误：{str(e)}", parent=edit_window)
+                return
+            self.save_config()
+            edit_window.destroy()
+            if self.excel_data:
+                self.resample_cache.clear()
+                self.prepare_loaded_sheets()
+                if self.current_sheet_name in self.excel_data:
+                    self.plot_sheet_data(self.excel_data[self.current_sheet_name], self.current_sheet_name)
+        
+        button_frame = ttk.Frame(edit_window)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="确认", command=save).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="取消", command=edit_window.destroy).pack(side=tk.LEFT, padx=5)
+    
+    def store_column_templates(self, known_signatures):
+        """把新识别的列映射模板写入参数库，并累加本次用到的模板的使用次数"""
+        if self.config_store is None:
+            return
+        used = {self.sheet_signatures[name] for name in self.excel_data if name in self.sheet_signatures}
+        try:
+            self.config_store.save_templates([self.column_templates[signature] for signature in used
+                                              if signature not in known_signatures])
+            self.config_store.record_template_use(used)
+        except Exception as e:
+            print(f"保存列映射模板失败: {e}")
+    
+    def show_column_templates(self):
+        """列映射模板窗口：查看、修改和删除按表头签名保存的载荷/引伸计列映射"""
+        template_window = tk.Toplevel(self.root)
+        template_window.title("列映射模板")
+        template_window.geometry("820x360")
+        
+        columns = ('name', 'header_row', 'load', 'extensometer', 'units', 'source', 'uses', 'sheets')
+        headings = ('名称', '表头行', '载荷列', '引伸计列', '单位', '来源', '使用次数', '当前工作簿中的sheet')
+        tree = ttk.Treeview(template_window, columns=columns, show='headings', height=10, selectmode='browse')
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=180 if column in ('name', 'sheets') else 70, anchor=tk.W)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        
+        def refresh():
+            tree.delete(*tree.get_children())
+            for signature, template in self.column_templates.items():
+                sheets = [name for name, used in self.sheet_signatures.items() if used == signature]
+                tree.insert('', tk.END, iid=signature, values=(
+                    template.get('name', ''),
+                    template['header_row'] + 1,
+                    excel_column_name(template['load_column']),
+                    excel_column_name(template['extensometer_column']),
+                    f"{template.get('load_unit') or 'N'} / {template.get('displacement_unit') or 'mm'}",
+                    "手工" if template.get('source') == 'manual' else "自动",
+                    template.get('uses') or 0,
+                    "，".join(sheets)
+                ))
+            current = self.sheet_signatures.get(self.current_sheet_name)
+            if current in self.column_templates:
+                tree.selection_set(current)
+                tree.see(current)
+        
+        def edit():
+            selection = tree.selection()
+            if selection:
+                self.edit_column_template(selection[0], on_saved=refresh)
+        
+        def delete():
+            selection = tree.selection()
+            if not selection or not messagebox.askyesno("确认", "删除选中的列映射模板？下次读取该布局时将重新识别列"):
+                return
+            self.column_templates.pop(selection[0], None)
+            if self.config_store is not None:
+                self.config_store.delete_template(selection[0])
+            refresh()
+        
+        tree.bind("<Double-1>", lambda event: edit())
+        button_frame = ttk.Frame(template_window)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="修改", command=edit).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="删除", command=delete).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="关闭", command=template_window.destroy).pack(side=tk.LEFT, padx=5)
+        
+        refresh()
+    
+    def edit_column_template(self, signature, on_saved=None):
+        """修改一个列映射模板的表头行、载荷/引伸计列和单位；当前工作簿用到该模板时重新读取"""
+        template = self.column_templates[signature]
+        sample = template.get('sample') or []
+        
+        edit_window = tk.Toplevel(self.root)
+        edit_window.title("修改列映射模板")
+        edit_window.geometry("520x300")
+        
+        def column_choices(header_row):
+            width = max([len(row) for row in sample] + [template['load_column'] + 1,
+                                                         template['extensometer_column'] + 1])
+            labels = sample[header_row] if header_row < len(sample) else []
+            return [f"{excel_column_name(i)}: {labels[i] if i < len(labels) else ''}" for i in range(width)]
+        
+        row_choices = [f"第{i + 1}行" for i in range(max(len(sample), template['header_row'] + 1))]
+        fields = [("表头行", row_choices, row_choices[template['header_row']])]
+        choices = column_choices(template['header_row'])
+        fields.append(("载荷列", choices, choices[template['load_column']]))
+        fields.append(("引伸计列", choices, choices[template['extensometer_column']]))
+        fields.append(("载荷单位", list(LOAD_UNITS), template.get('load_unit') or 'N'))
+        fields.append(("位移单位", list(DISPLACEMENT_UNITS), template.get('displacement_unit') or 'mm'))
+        
+        comboboxes = []
+        for i, (label, values, value) in enumerate(fields):
+            ttk.Label(edit_window, text=label, width=10).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
+            combobox = ttk.Combobox(edit_window, values=values, width=40, state="readonly")
+            combobox.set(value)
+            combobox.grid(row=i, column=1, padx=10, pady=5, sticky=tk.W)
+            comboboxes.append(combobox)
+        header_box, load_box, extensometer_box, load_unit_box, displacement_unit_box = comboboxes
+        
+        # 模板自带的预处理配置（JSON，留空时使用全局配置）
+        ttk.Label(edit_window, text="预处理", width=10).grid(row=len(fields), column=0, padx=10, pady=5, sticky=tk.W)
+        preprocess_var = tk.StringVar(value=json.dumps(template.get('preprocess') or [], ensure_ascii=False)
+                                      if template.get('preprocess') else '')
+        ttk.Entry(edit_window, textvariable=preprocess_var, width=43).grid(row=len(fields), column=1, padx=10,
+                                                                          pady=5, sticky=tk.W)
+        
+        def on_header_row(event):
+            # 换表头行后列名随之更新，列位置保持不变
+            load_column, extensometer_column = load_box.current(), extensometer_box.current()
+            choices = column_choices(header_box.current())
+            load_box['values'] = extensometer_box['values'] = choices
+            load_box.set(choices[load_column])
+            extensometer_box.set(choices[extensometer_column])
+        header_box.bind("<<ComboboxSelected>>", on_header_row)
+        
+        def save():
+            if load_box.current() == extensometer_box.current():
+                messagebox.showerror("错误", "载荷列和引伸计列不能相同", parent=edit_window)
+                return
+            try:
+                preprocess = normalize_preprocess_spec(preprocess_var.get().strip())
+            except ValueError as e:
+                messagebox.showerror("错误", f"预处理配置有误：{str(e)}", parent=edit_window)
+                return
+            header_row = header_box.current()
+            labels = sample[header_row] if header_row < len(sample) else []
+            label_of = lambda i: labels[i] if i < len(labels) else excel_column_name(i)
+            template.update(header_row=header_row, load_column=load_box.current(),
+                            extensometer_column=extensometer_box.current(),
+                            load_unit=load_unit_box.get(), displacement_unit=displacement_unit_box.get(),
+                            name=f"{label_of(load_box.current())} / {label_of(extensometer_box.current())}",
+                            preprocess=preprocess, source='manual')
+            if self.config_store is not None:
+                try:
+                    self.config_store.save_templates([template], overwrite_manual=True)
+                except Exception as e:
+                    messagebox.showerror("错误", f"保存列映射模板失败：{str(e)}", parent=edit_window)
+                    return
+            edit_window.destroy()
+            if on_saved is not None:
+                on_saved()
+            if self.current_excel_path and signature in self.sheet_signatures.values():
+                if messagebox.askyesno("确认", "当前工作簿使用了该模板，是否按修改后的映射重新读取？"):
+                    self.load_excel_data(self.current_excel_path)
+        
+        button_frame = ttk.Frame(edit_window)
+        button_frame.grid(row=len(fields) + 1, column=0, columnspan=2, pady=10)
+        ttk.Button(button_frame, text="确认", command=save).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="取消", command=edit_window.destroy).pack(side=tk.LEFT, padx=5)
+    
+    def show_perf_panel(self):
+        """性能统计窗口：各阶段耗时、行数/秒、峰值内存，以及屈服强度计算方法分布"""
+        perf_window = tk.Toplevel(self.root)
+        perf_window.title("性能统计")
+        perf_window.geometry("760x420")
+        
+        columns = ('stage', 'count', 'total', 'mean', 'max', 'rate', 'peak')
+        headings = ('阶段', '次数', '总耗时 (s)', '平均 (ms)', '最大 (ms)', '行数/秒', '峰值内存 (MB)')
+        tree = ttk.Treeview(perf_window, columns=columns, show='headings', height=12)
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=100, anchor=tk.E if column != 'stage' else tk.W)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        
+        method_label = ttk.Label(perf_window, text="", style="Medium.TLabel")
+        method_label.pack(fill=tk.X, padx=10)
+        
+        def refresh():
+            tree.delete(*tree.get_children())
+            summary = self.perf.summary()
+            for stage, entry in summary['stages'].items():
+                tree.insert('', tk.END, values=(
+                    stage,
+                    entry['count'],
+                    f"{entry['total_s']:.3f}",
+                    f"{entry['mean_s'] * 1000:.1f}",
+                    f"{entry['max_s'] * 1000:.1f}",
+                    f"{entry['rows_per_s']:.0f}" if entry['rows_per_s'] else '',
+                    f"{entry['peak_mb']:.1f}" if entry['peak_mb'] is not None else ''
+                ))
+            methods = summary['counters'].get('yield_method', {})
+            method_label.config(text="屈服计算方法: " + "，".join(
+                f"{YIELD_METHOD_NAMES.get(method, method)} {count}" for method, count in methods.items()))
+        
+        def save_log():
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".json",
+                filetypes=[("JSON文件", "*.json"), ("所有文件", "*.*")]
+            )
+            if file_path:
+                try:
+                    self.perf.save(file_path)
+                    messagebox.showinfo("成功", f"性能日志已保存到：{file_path}")
+                except Exception as e:
+                    messagebox.showerror("错误", f"保存性能日志失败：{str(e)}")
+        
+        def clear():
+            self.perf.clear()
+            refresh()
+        
+        button_frame = ttk.Frame(perf_window)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="刷新", command=refresh).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="保存JSON日志", command=save_log).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="清空", command=clear).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="关闭", command=perf_window.destroy).pack(side=tk.LEFT, padx=5)
+        
+        refresh()
+    
     def export_all_results(self):
         """导出所有结果到文件"""
         if not self.excel_data:
@@ -1202,22 +6507,44 @@ class TensileTestAnalyzer:
             try:
                 # 收集所有结果
                 all_results = []
+                raw_results = []
                 
-                for sheet_name, data in self.excel_data.items():
-                    if sheet_name not in self.cross_sectional_areas:
-                        continue
+                for sheet_name, sheet_results in self.calculate_batch_properties():
+                    raw_results.append((sheet_name, sheet_results))
+                    data = self.excel_data[sheet_name]
+                    yield_strength = sheet_results['yield_strength']
+                    tensile_strength = sheet_results['tensile_strength']
+                    elongation = sheet_results['elongation']
+                    error_msg = sheet_results['error_msg']
                     
-                    yield_strength, tensile_strength, elongation, error_msg = self.calculate_tensile_properties(data, sheet_name)
-                    
-                    all_results.append({
+                    row = {
                         'Sheet名称': sheet_name,
                         '数据点数': len(data),
                         '横截面积_mm²': self.cross_sectional_areas[sheet_name],
                         '屈服强度_MPa': round(yield_strength, 2) if yield_strength else '',
                         '抗拉强度_MPa': round(tensile_strength, 2) if tensile_strength else '',
-                        '延伸率_%': round(elongation, 2) if elongation else '',
-                        '备注': error_msg if error_msg else '计算成功'
-                    })
+                        '延伸率_%': round(elongation, 2) if elongation else ''
+                    }
+                    for label, value in sheet_results['proof_strengths'].items():
+                        row[f'{label}_MPa'] = round(value, 2) if value is not None else ''
+                    for column, key, digits in (('Ag_%', 'uniform_elongation', 2),
+                                                ('At_%', 'fracture_elongation', 2),
+                                                ('拉伸韧性_MJ/m³', 'toughness', 2),
+                                                ('n值', 'n_value', 3)):
+                        value = sheet_results[key]
+                        row[column] = round(value, digits) if value is not None else ''
+                    row['屈服计算方法'] = YIELD_METHOD_NAMES.get(sheet_results['yield_method'], '')
+                    row['屈服算法'] = sheet_results['yield_algorithm']
+                    elapsed = sheet_results['yield_elapsed']
+                    row['屈服耗时_ms'] = round(elapsed * 1000, 3) if elapsed is not None else ''
+                    qc_codes = [code for code in sheet_results['qc_flags'].split(',') if code]
+                    test_range = sheet_results['test_range']
+                    row['有效数据区间'] = f"{test_range[0] + 1}-{test_range[1]}" if test_range else ''
+                    row['质量预检'] = ("；".join(QC_CHECKS.get(code, code) for code in qc_codes) or
+                                   ('通过' if self.qc_enabled else '未检查'))
+                    row['重复试样'] = self.duplicate_sheets.get(sheet_name, '')
+                    row['备注'] = error_msg if error_msg else '计算成功'
+                    all_results.append(row)
                 
                 if not all_results:
                     messagebox.showerror("错误", "没有可以导出的结果")
@@ -1225,51 +6552,90 @@ class TensileTestAnalyzer:
                 
                 # 创建DataFrame
                 results_df = pd.DataFrame(all_results)
+                statistics = self.compute_lot_statistics(raw_results)
+                statistics_df = statistics.rename(columns=LOT_STAT_COLUMNS)
                 
                 # 根据文件类型保存
-                if file_path.endswith('.csv'):
-                    results_df.to_csv(file_path, index=False, encoding='utf-8-sig')
-                elif file_path.endswith('.xlsx'):
-                    # 创建Excel写入器
-                    with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                        results_df.to_excel(writer, sheet_name='计算结果汇总', index=False)
-                        
-                        # 也可以保存原始数据
-                        for sheet_name, data in self.excel_data.items():
-                            if sheet_name not in self.cross_sectional_areas:
-                                continue
-                            # 只保存前1000行原始数据
-                            data_to_save = data.head(1000)
-                            data_to_save.to_excel(writer, sheet_name=f'{sheet_name[:30]}_原始数据', index=False)
-                else:
-                    # 保存为文本文件
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write("铍镍铜拉伸测试结果汇总\n")
-                        f.write("="*70 + "\n\n")
-                        f.write(f"引伸计标距: {self.gauge_length} mm\n")
-                        f.write(f"测试样本数: {len(all_results)}\n\n")
-                        
-                        for result in all_results:
-                            f.write(f"Sheet: {result['Sheet名称']}\n")
-                            f.write(f"数据点数: {result['数据点数']}\n")
-                            f.write(f"横截面积: {result['横截面积_mm²']} mm²\n")
-                            
-                            if result['屈服强度_MPa']:
-                                f.write(f"屈服强度: {result['屈服强度_MPa']:.2f} MPa\n")
-                            else:
-                                f.write("屈服强度: N/A\n")
-                            
-                            f.write(f"抗拉强度: {result['抗拉强度_MPa']:.2f} MPa\n")
-                            f.write(f"延伸率: {result['延伸率_%']:.2f} %\n")
-                            f.write(f"备注: {result['备注']}\n")
-                            f.write("-"*50 + "\n\n")
+                with self.perf.stage('export', rows=len(all_results), format=os.path.splitext(file_path)[1]):
+                    if file_path.endswith('.csv'):
+                        results_df.to_csv(file_path, index=False, encoding='utf-8-sig')
+                        # 批次统计另存为同名 _批次统计.csv
+                        statistics_df.to_csv(os.path.splitext(file_path)[0] + '_批次统计.csv', index=False,
+                                             encoding='utf-8-sig')
+                    elif file_path.endswith('.xlsx'):
+                        # 创建Excel写入器
+                        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+                            results_df.to_excel(writer, sheet_name='计算结果汇总', index=False)
+                            statistics_df.to_excel(writer, sheet_name='批次统计', index=False)
+                    
+                            # 代表曲线（共享应变网格上的平均值与包络）
+                            resampled = self.get_resampled_curves()
+                            if resampled is not None:
+                                envelope = resampled['envelope']
+                                pd.DataFrame({
+                                    '应变': resampled['grid'],
+                                    '平均应力_MPa': envelope['mean'],
+                                    '最小应力_MPa': envelope['min'],
+                                    '最大应力_MPa': envelope['max'],
+                                    '均值-σ_MPa': envelope['lower'],
+                                    '均值+σ_MPa': envelope['upper'],
+                                    '样本数': envelope['count']
+                                }).to_excel(writer, sheet_name='代表曲线', index=False)
+                    
+                            # 也可以保存原始数据
+                            for sheet_name, data in self.excel_data.items():
+                                if sheet_name not in self.cross_sectional_areas:
+                                    continue
+                                # 只保存前1000行原始数据
+                                data_to_save = data.head(1000)
+                                data_to_save.to_excel(writer, sheet_name=f'{sheet_name[:30]}_原始数据', index=False)
+                    else:
+                        # 保存为文本文件
+                        with open(file_path, 'w', encoding='utf-8') as f:
+                            f.write("铍镍铜拉伸测试结果汇总\n")
+                            f.write("="*70 + "\n\n")
+                            f.write(f"引伸计标距: {self.gauge_length} mm\n")
+                            f.write(f"测试样本数: {len(all_results)}\n\n")
+                    
+                            for result in all_results:
+                                f.write(f"Sheet: {result['Sheet名称']}\n")
+                                f.write(f"数据点数: {result['数据点数']}\n")
+                                f.write(f"横截面积: {result['横截面积_mm²']} mm²\n")
+                    
+                                if result['屈服强度_MPa']:
+                                    f.write(f"屈服强度: {result['屈服强度_MPa']:.2f} MPa\n")
+                                else:
+                                    f.write("屈服强度: N/A\n")
+                    
+                                f.write(f"抗拉强度: {result['抗拉强度_MPa']:.2f} MPa\n")
+                                f.write(f"延伸率: {result['延伸率_%']:.2f} %\n")
+                                for key, value in result.items():
+                                    if key.startswith(('Rp', 'Rt')) and value != '':
+                                        f.write(f"{key[:-4]}: {value:.2f} MPa\n")
+                                if result['Ag_%'] != '':
+                                    f.write(f"Ag: {result['Ag_%']:.2f} %\n")
+                                if result['At_%'] != '':
+                                    f.write(f"At: {result['At_%']:.2f} %\n")
+                                if result['拉伸韧性_MJ/m³'] != '':
+                                    f.write(f"拉伸韧性: {result['拉伸韧性_MJ/m³']:.2f} MJ/m³\n")
+                                if result['n值'] != '':
+                                    f.write(f"n值: {result['n值']:.3f}\n")
+                                if result['屈服计算方法']:
+                                    f.write(f"屈服计算方法: {result['屈服计算方法']}\n")
+                                f.write(f"备注: {result['备注']}\n")
+                                f.write("-"*50 + "\n\n")
+                    
+                            f.write("批次统计\n")
+                            f.write("="*70 + "\n")
+                            f.write(format_lot_statistics(statistics, self.stat_confidence))
                 
                 messagebox.showinfo("成功", f"结果已导出到：{file_path}")
                 
             except Exception as e:
                 messagebox.showerror("错误", f"导出失败：{str(e)}")
 
-def main():
+def run_gui():
+    """启动图形界面"""
     try:
         root = tk.Tk()
         
@@ -1288,5 +6654,176 @@ def main():
         traceback.print_exc()
         input("按任意键退出...")
 
+def build_arg_parser():
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(description="铍镍铜拉伸测试数据分析")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    subparsers.add_parser('gui', help="启动图形界面（默认）")
+    
+    simulate = subparsers.add_parser('simulate', help="实时采集模拟器")
+    simulate.add_argument('target', nargs='?', default="udp://127.0.0.1:9750",
+                          help="数据源地址: udp://主机:端口、tcp://主机:端口 或命名管道路径")
+    simulate.add_argument('--rate', type=float, default=500.0, help="采样率 (点/秒)")
+    simulate.add_argument('--points', type=int, default=2000, help="合成曲线点数")
+    simulate.add_argument('--seed', type=int, default=None, help="随机种子")
+    
+    report = subparsers.add_parser('report', help="批量生成报告图和多页PDF")
+    report.add_argument('paths', nargs='+', help="工作簿路径或通配符")
+    report.add_argument('-d', '--output-dir', default='report', help="输出文件夹")
+    report.add_argument('--areas', action='append', default=[], help="截面尺寸csv，可重复指定")
+    report.add_argument('--area', type=float, default=None, help="统一横截面积 (mm²)")
+    report.add_argument('--gauge-length', type=float, default=10.0, help="标距 (mm)")
+    report.add_argument('--dpi', type=int, default=200, help="图像分辨率")
+    report.add_argument('--format', dest='formats', action='append', choices=['png', 'pdf', 'svg'],
+                        help="单图格式，可重复指定（默认 png）")
+    report.add_argument('--rasterized', action='store_true', help="PDF/SVG 中的曲线栅格化")
+    report.add_argument('--pdf', action='store_true', help="同时合成多页PDF")
+    report.add_argument('--workers', type=int, default=None, help="渲染进程数（默认CPU核数）")
+    
+    bench = subparsers.add_parser('bench', help="基准测试（合成曲线）")
+    bench.add_argument('--suite', choices=sorted(BENCH_SUITES), default='smoke', help="测试规模")
+    bench.add_argument('--repeat', type=int, default=3, help="每项重复次数（取最短）")
+    bench.add_argument('--seed', type=int, default=0, help="随机种子")
+    bench.add_argument('-o', '--output', default=None, help="结果 JSON 文件")
+    bench.add_argument('--baseline', default=None, help="与该基线 JSON 比较，发现回归时退出码为 1")
+    bench.add_argument('--save-baseline', default=None, help="将本次结果保存为基线")
+    bench.add_argument('--tolerance', type=float, default=0.25, help="允许的耗时增加比例")
+    
+    compare = subparsers.add_parser('compare', help="比较两种屈服强度算法的精度和速度")
+    compare.add_argument('paths', nargs='*', help="真实曲线工作簿路径或通配符")
+    compare.add_argument('--reference', default='legacy', help="参照算法（默认当前算法 legacy）")
+    compare.add_argument('--candidate', default='batch',
+                         help=f"候选算法: batch、{', '.join(YIELD_METHODS)}，或 模块:函数 / 文件.py:函数")
+    compare.add_argument('--areas', action='append', default=[], help="截面尺寸csv，可重复指定")
+    compare.add_argument('--area', type=float, default=None, help="统一横截面积 (mm²)")
+    compare.add_argument('--gauge-length', type=float, default=10.0, help="标距 (mm)")
+    compare.add_argument('--synthetic', type=int, default=0, help="附加的合成曲线数量")
+    compare.add_argument('--synthetic-points', type=int, default=5000, help="每条合成曲线的点数")
+    compare.add_argument('--seed', type=int, default=0, help="合成曲线随机种子")
+    compare.add_argument('--abs-tol', type=float, default=0.5, help="允许的绝对偏差 (MPa)")
+    compare.add_argument('--rel-tol', type=float, default=1e-3, help="允许的相对偏差")
+    compare.add_argument('--repeat', type=int, default=3, help="每条曲线计时重复次数（取最短）")
+    compare.add_argument('--workers', type=int, default=None, help="进程数（默认CPU核数）")
+    compare.add_argument('-o', '--output', default=None, help="逐曲线结果表（.csv 或 .xlsx）")
+    
+    serve = subparsers.add_parser('serve', help="本地 HTTP/JSON 分析服务")
+    serve.add_argument('--host', default='127.0.0.1', help="监听地址")
+    serve.add_argument('--port', type=int, default=8765, help="监听端口")
+    serve.add_argument('--workers', type=int, default=None, help="计算进程数（默认CPU核数）")
+    serve.add_argument('--max-pending', type=int, default=None, help="最大在途计算任务数（默认进程数×4）")
+    serve.add_argument('--gauge-length', type=float, default=10.0, help="默认标距 (mm)")
+    serve.add_argument('--verbose', action='store_true', help="输出访问日志")
+    serve.add_argument('--yield-method', default='legacy', help=f"默认屈服算法: {', '.join(YIELD_METHODS)}")
+    serve.add_argument('--time-budget', type=float, default=None, help="每个试样屈服算法的默认时间预算 (秒)")
+    serve.add_argument('--no-qc', action='store_true', help="默认跳过曲线质量预检")
+    serve.add_argument('--preprocess', default=None, help="默认预处理配置（JSON 字符串或文件）")
+    
+    batch = subparsers.add_parser('batch', help="批量计算工作簿，逐个试样输出 JSON 行")
+    batch.add_argument('paths', nargs='+', help="工作簿路径或通配符（如 data/**/*.xlsx）")
+    batch.add_argument('--areas', action='append', default=[],
+                       help="截面尺寸csv（sheet_name, cross_sectional_area），可重复指定")
+    batch.add_argument('--area', type=float, default=None, help="未在csv中给出的sheet使用的统一横截面积 (mm²)")
+    batch.add_argument('--gauge-length', type=float, default=10.0, help="标距 (mm)")
+    batch.add_argument('--workers', type=int, default=None, help="计算进程数（默认CPU核数）")
+    batch.add_argument('--offsets', type=float, nargs='+', default=None, help="规定塑性延伸偏移量，如 0.001 0.002")
+    batch.add_argument('-o', '--output', default=None, help="输出文件（默认标准输出）")
+    batch.add_argument('--perf-log', default=None, help="性能记录 JSON 行文件（各阶段耗时、行数/秒）")
+    batch.add_argument('--trace-memory', action='store_true', help="用 tracemalloc 记录各阶段峰值内存")
+    batch.add_argument('--yield-method', default='legacy', help=f"屈服算法: {', '.join(YIELD_METHODS)}")
+    batch.add_argument('--time-budget', type=float, default=None, help="每个试样屈服算法的时间预算 (秒)")
+    batch.add_argument('--no-qc', action='store_true', help="跳过曲线质量预检")
+    batch.add_argument('--stats', default=None, help="批次统计csv（均值、标准差、bootstrap置信区间、Cpk）")
+    batch.add_argument('--lot-pattern', default=None, help="从sheet名称中取批号的正则（默认按工作簿分组）")
+    batch.add_argument('--preprocess', default=None,
+                       help="预处理配置：JSON 字符串或文件，如 '[\"zero_offset\", {\"stage\": \"smooth\", \"window\": 21}]'")
+    batch.add_argument('--config-db', default=None,
+                       help="参数库路径（如 tensile_test_config.db），使用并保存其中的列映射模板")
+    
+    
+    work_queue = subparsers.add_parser('queue', help="共享目录批量队列：多个进程（可在不同机器上）协同计算")
+    work_queue.add_argument('action', choices=['submit', 'work', 'status', 'merge'],
+                            help="submit 加入工作簿，work 启动工作进程，status 查看进度，merge 合并结果")
+    work_queue.add_argument('queue_dir', help="队列目录（各机器挂载的同一共享目录）")
+    work_queue.add_argument('paths', nargs='*', help="submit: 工作簿路径或通配符")
+    work_queue.add_argument('--areas', action='append', default=[], help="submit: 截面尺寸csv，可重复指定")
+    work_queue.add_argument('--area', type=float, default=None, help="submit: 统一横截面积 (mm²)")
+    work_queue.add_argument('--gauge-length', type=float, default=10.0, help="submit: 标距 (mm)")
+    work_queue.add_argument('--offsets', type=float, nargs='+', default=None, help="submit: 规定塑性延伸偏移量")
+    work_queue.add_argument('--yield-method', default='legacy', help=f"submit: 屈服算法: {', '.join(YIELD_METHODS)}")
+    work_queue.add_argument('--time-budget', type=float, default=None, help="submit: 每个试样屈服算法的时间预算 (秒)")
+    work_queue.add_argument('--no-qc', action='store_true', help="submit: 跳过曲线质量预检")
+    work_queue.add_argument('--preprocess', default=None, help="submit: 预处理配置（JSON 字符串或文件）")
+    work_queue.add_argument('--worker-id', default=None, help="work: 工作进程名称（默认 主机名-进程号）")
+    work_queue.add_argument('--workers', type=int, default=None, help="work: 每个工作进程的计算进程数")
+    work_queue.add_argument('--config-db', default=None, help="work: 本机参数库路径（列映射模板、重复试样）")
+    work_queue.add_argument('--heartbeat', type=float, default=10.0, help="work: 心跳间隔 (秒)")
+    work_queue.add_argument('--stale-after', type=float, default=60.0, help="work: 认领超过该时间无心跳即回收 (秒)")
+    work_queue.add_argument('--max-attempts', type=int, default=3, help="work: 每个工作簿最多认领次数")
+    work_queue.add_argument('--no-wait', action='store_true', help="work: 没有待处理项即退出，不等待其他进程手中的项")
+    work_queue.add_argument('-o', '--output', default=None, help="merge: 合并后的 JSON 行文件（默认标准输出）")
+    work_queue.add_argument('--stats', default=None, help="merge: 批次统计csv")
+    work_queue.add_argument('--lot-pattern', default=None, help="merge: 从sheet名称中取批号的正则")
+    
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    
+    if args.command == 'simulate':
+        run_live_simulator(args.target, generate_synthetic_curve(n_points=args.points, seed=args.seed),
+                           rate=args.rate)
+        return 0
+    
+    if args.command == 'batch':
+        options = dict(perf_log=args.perf_log, trace_memory=args.trace_memory,
+                       yield_method=args.yield_method, time_budget=args.time_budget, qc=not args.no_qc,
+                       stats=args.stats, lot_pattern=args.lot_pattern, config_db=args.config_db,
+                       preprocess=args.preprocess)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                return run_batch(args.paths, args.areas, args.area, args.gauge_length, args.workers,
+                                 args.offsets, output=f, **options)
+        return run_batch(args.paths, args.areas, args.area, args.gauge_length, args.workers, args.offsets,
+                         **options)
+    
+    if args.command == 'queue':
+        if args.action == 'submit':
+            return submit_queue(args.queue_dir, args.paths, args.areas, args.area, args.gauge_length, args.offsets,
+                                args.yield_method, args.time_budget, not args.no_qc, args.preprocess)
+        if args.action == 'work':
+            return run_queue_worker(args.queue_dir, args.worker_id, args.workers, args.config_db, args.heartbeat,
+                                    args.stale_after, args.max_attempts, not args.no_wait)
+        if load_queue_settings(args.queue_dir) is None:
+            print(f"不是队列目录（缺少 queue.json）: {args.queue_dir}", file=sys.stderr)
+            return 2
+        if args.action == 'status':
+            queue_status(args.queue_dir)
+            return 0
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                return merge_queue_results(args.queue_dir, f, args.stats, args.lot_pattern)
+        return merge_queue_results(args.queue_dir, stats=args.stats, lot_pattern=args.lot_pattern)
+    
+    if args.command == 'report':
+        return run_report(args.paths, args.output_dir, args.areas, args.area, args.gauge_length,
+                          args.formats or ['png'], args.dpi, args.rasterized, args.pdf, args.workers)
+    
+    if args.command == 'bench':
+        return run_benchmarks(args.suite, args.repeat, args.seed, args.output, args.baseline,
+                              args.save_baseline, args.tolerance)
+    
+    if args.command == 'compare':
+        return run_compare(args.paths, args.reference, args.candidate, args.areas, args.area, args.gauge_length,
+                           args.synthetic, args.synthetic_points, args.seed, args.abs_tol, args.rel_tol,
+                           args.repeat, args.workers, args.output)
+    
+    if args.command == 'serve':
+        return run_service(args.host, args.port, args.workers, args.max_pending, args.gauge_length, args.verbose,
+                           args.yield_method, args.time_budget, not args.no_qc, args.preprocess)
+    
+    run_gui()
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file